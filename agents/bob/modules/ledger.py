@@ -1,21 +1,36 @@
 """
 Ledger operations for Bob's ingestion pipeline.
 Handles safe read/write to the trades ledger with duplicate detection.
+
+New events are appended to a JSONL journal next to trades.json and folded
+into the canonical trades.json snapshot by compact_ledger() (end of each
+ingestion run, or once COMPACT_AFTER events are pending). Duplicate checks
+use an in-memory id set seeded from a persistent index of snapshot ids, so
+an append never parses or rewrites the whole ledger.
+
+All writers serialize on an flock of trades.json.lock.
 """
 import fcntl
 import hashlib
 import json
 import os
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, List, Set, Tuple
 
 LEDGER_PATH = Path("~/.openclaw/workspace/data/options/trades.json").expanduser()
+JOURNAL_PATH = LEDGER_PATH.with_name("trades.journal.jsonl")
+INDEX_PATH = LEDGER_PATH.with_name("trades.ids")
+LOCK_PATH = LEDGER_PATH.with_name("trades.json.lock")
+
+# Fold the journal into trades.json once it holds this many events
+COMPACT_AFTER = 500
 
 
 def generate_trade_id(event: Dict[str, Any]) -> str:
     """
     Generate deterministic ID from trade parameters (excluding timestamp for duplicate detection).
-    
+
     Normalization rules:
     - ticker: uppercase + stripped
     - strike: float
@@ -36,73 +51,264 @@ def generate_trade_id(event: Dict[str, Any]) -> str:
     event_type = str(event.get('event_type', ''))
     option_type = str(event.get('option_type', ''))
     account = str(event.get('account', ''))
-    
+
     # Build signature (excluding timestamp)
     event_id_input = f"{account}|{ticker}|{option_type}|{strike}|{expiration}|{contracts}|{price}|{event_type}"
-    
+
     return hashlib.sha1(event_id_input.encode()).hexdigest()[:16]
 
 
-def load_ledger() -> Dict[str, Any]:
-    """Load the ledger from disk."""
+# =============================================================================
+# STORAGE
+# =============================================================================
+
+@contextmanager
+def _ledger_lock():
+    """Exclusive cross-process lock for journal appends and compaction."""
+    LOCK_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(LOCK_PATH, "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _snapshot_signature() -> str:
+    try:
+        st = LEDGER_PATH.stat()
+    except OSError:
+        return "missing"
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+
+def _journal_size() -> int:
+    try:
+        return JOURNAL_PATH.stat().st_size
+    except OSError:
+        return 0
+
+
+def _read_snapshot() -> Dict[str, Any]:
+    """trades.json as written; raises JSONDecodeError if it is corrupt."""
     if not LEDGER_PATH.exists():
         return {"events": []}
-    
+    with open(LEDGER_PATH, "r") as f:
+        content = f.read()
+    return json.loads(content) if content.strip() else {"events": []}
+
+
+def _read_journal() -> List[Dict[str, Any]]:
+    """
+    Events appended since the last compaction, in order. Each journal line is
+    one event or one batch (a JSON list), so a batch lands all-or-nothing.
+    """
+    events = []
     try:
-        with open(LEDGER_PATH, "r") as f:
-            return json.load(f)
-    except (json.JSONDecodeError, IOError):
-        return {"events": []}
+        with open(JOURNAL_PATH, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # torn final line from an interrupted append
+                events.extend(record if isinstance(record, list) else [record])
+    except FileNotFoundError:
+        pass
+    return events
 
 
-def save_ledger(ledger: Dict[str, Any]) -> None:
-    """Save the ledger to disk."""
+def _write_snapshot(ledger: Dict[str, Any]) -> None:
+    """Atomically replace trades.json (temp file + rename)."""
     LEDGER_PATH.parent.mkdir(parents=True, exist_ok=True)
-    with open(LEDGER_PATH, "w") as f:
+    tmp = LEDGER_PATH.with_name(f".trades.json.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
         json.dump(ledger, f, indent=2)
+    os.replace(tmp, LEDGER_PATH)
+
+
+def _write_index(snapshot_ids: Set[str]) -> None:
+    """Persist the snapshot's ids, tagged with the snapshot they came from."""
+    tmp = INDEX_PATH.with_name(f".trades.ids.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        f.write(f"# snapshot {_snapshot_signature()}\n")
+        f.writelines(f"{trade_id}\n" for trade_id in sorted(snapshot_ids))
+    os.replace(tmp, INDEX_PATH)
+
+
+def _snapshot_ids() -> Set[str]:
+    """Ids in trades.json, from the persistent index unless the snapshot changed."""
+    header = f"# snapshot {_snapshot_signature()}"
+    try:
+        lines = INDEX_PATH.read_text().splitlines()
+        if lines and lines[0] == header:
+            return set(lines[1:])
+    except OSError:
+        pass
+
+    # trades.json was edited elsewhere (e.g. Mission Control): rebuild
+    try:
+        events = _read_snapshot().get("events", [])
+    except (json.JSONDecodeError, IOError):
+        return set()
+    ids = {event.get("id") for event in events if event.get("id")}
+    try:
+        _write_index(ids)
+    except OSError:
+        pass
+    return ids
+
+
+# In-process id set and journal length, valid while the snapshot and journal
+# are unchanged (keyed by their signatures)
+_id_cache: Dict[str, Any] = {"key": None, "ids": set(), "pending": 0}
+
+
+def _current_ids() -> Set[str]:
+    key = (_snapshot_signature(), _journal_size())
+    if _id_cache["key"] != key:
+        journal = _read_journal()
+        ids = _snapshot_ids()
+        ids.update(e.get("id") for e in journal if e.get("id"))
+        _id_cache.update(key=key, ids=ids, pending=len(journal))
+    return _id_cache["ids"]
+
+
+# =============================================================================
+# PUBLIC API
+# =============================================================================
+
+def load_ledger(strict: bool = False) -> Dict[str, Any]:
+    """
+    Load the ledger from disk: trades.json plus any journaled events.
+
+    With strict=True a missing or corrupt trades.json raises
+    (FileNotFoundError / JSONDecodeError) instead of reading as empty.
+    """
+    if strict:
+        if not LEDGER_PATH.exists():
+            raise FileNotFoundError(LEDGER_PATH)
+        ledger = _read_snapshot()
+    else:
+        try:
+            ledger = _read_snapshot()
+        except (json.JSONDecodeError, IOError):
+            ledger = {"events": []}
+
+    ledger.setdefault("events", []).extend(_read_journal())
+    return ledger
+
+
+def save_ledger(ledger: Dict[str, Any]) -> None:
+    """Save the ledger to disk (replaces trades.json and clears the journal)."""
+    with _ledger_lock():
+        _write_snapshot(ledger)
+        JOURNAL_PATH.unlink(missing_ok=True)
+        _write_index({e.get("id") for e in ledger.get("events", []) if e.get("id")})
 
 
 def get_existing_trade_ids() -> set:
     """Get all existing trade IDs from the ledger."""
-    ledger = load_ledger()
-    return {event.get("id") for event in ledger.get("events", []) if event.get("id")}
+    return set(_current_ids())
+
+
+def compact_ledger() -> int:
+    """
+    Fold journaled events into trades.json in one atomic rewrite.
+    Returns the number of events folded (0 if the journal was empty).
+    If trades.json is corrupt it raises JSONDecodeError and keeps the journal.
+    """
+    with _ledger_lock():
+        return _compact_locked()
+
+
+def _compact_locked() -> int:
+    journal = _read_journal()
+    if not journal:
+        return 0
+
+    ledger = _read_snapshot()
+    ledger.setdefault("events", []).extend(journal)
+    _write_snapshot(ledger)
+    JOURNAL_PATH.unlink(missing_ok=True)
+    _write_index({e.get("id") for e in ledger["events"] if e.get("id")})
+    return len(journal)
+
+
+def _journal_append(events: List[Dict[str, Any]]) -> None:
+    """
+    Append events to the journal and the id set (caller holds the ledger
+    lock), then compact if the journal has grown past COMPACT_AFTER.
+    """
+    ids = _current_ids()
+    JOURNAL_PATH.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(JOURNAL_PATH, "ab") as f:
+        # Terminate a torn line left by an interrupted append so it stays isolated
+        if f.tell() and _last_byte(JOURNAL_PATH) != b"\n":
+            f.write(b"\n")
+        record = events[0] if len(events) == 1 else events
+        f.write((json.dumps(record) + "\n").encode())
+        f.flush()
+        os.fsync(f.fileno())
+
+    ids.update(event["id"] for event in events)
+    _id_cache["key"] = (_snapshot_signature(), _journal_size())
+    _id_cache["pending"] += len(events)
+
+    if _id_cache["pending"] >= COMPACT_AFTER:
+        try:
+            _compact_locked()
+        except (json.JSONDecodeError, OSError):
+            pass  # events are safe in the journal; compaction retries next time
+
+
+def _last_byte(path: Path) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1)
 
 
 def append_trade(event: Dict[str, Any]) -> Tuple[bool, str]:
     """
     Safely append trade to ledger with duplicate detection.
-    
+
     Returns: (success: bool, message: str)
     """
-    # Generate trade ID
-    trade_id = generate_trade_id(event)
-    event["id"] = trade_id
-    
-    # Check for duplicate
-    existing_ids = get_existing_trade_ids()
-    if trade_id in existing_ids:
-        return False, f"Duplicate skipped: {event.get('ticker', '?')} {event.get('contracts', 0)} contracts"
-    
-    # Load, append, save with file locking
+    return append_trades([event])[0]
+
+
+def append_trades(events: List[Dict[str, Any]]) -> List[Tuple[bool, str]]:
+    """
+    Append many trades under one lock with one journal write.
+
+    Every event gets its deterministic id; the batch is deduped in one pass
+    against the ledger's id set and against itself.
+
+    Returns: one (success: bool, message: str) per event, in order
+    """
+    if not events:
+        return []
+
+    for event in events:
+        event["id"] = generate_trade_id(event)
+
     try:
-        with open(LEDGER_PATH, "r+") as f:
-            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
-            try:
-                f.seek(0)
-                content = f.read()
-                if content.strip():
-                    ledger = json.loads(content)
-                else:
-                    ledger = {"events": []}
-                
-                ledger["events"].append(event)
-                
-                f.seek(0)
-                f.truncate()
-                json.dump(ledger, f, indent=2)
-                
-                return True, f"Added trade: {event.get('ticker', '?')} {event.get('contracts', 0)} contracts @ ${event.get('price', 0)}"
-            finally:
-                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        with _ledger_lock():
+            # Id set is refreshed if another process wrote since last time
+            seen = set(_current_ids())
+            outcomes = []
+            new_events = []
+
+            for event in events:
+                if event["id"] in seen:
+                    outcomes.append((False, f"Duplicate skipped: {event.get('ticker', '?')} {event.get('contracts', 0)} contracts"))
+                    continue
+                seen.add(event["id"])
+                new_events.append(event)
+                outcomes.append((True, f"Added trade: {event.get('ticker', '?')} {event.get('contracts', 0)} contracts @ ${event.get('price', 0)}"))
+
+            if new_events:
+                _journal_append(new_events)
+            return outcomes
     except Exception as e:
-        return False, f"Write error: {str(e)}"
+        return [(False, f"Write error: {str(e)}")] * len(events)
@@ -27,7 +27,9 @@ from typing import Any, Dict, List, Optional
 
 # Import Bob's modules
 sys.path.insert(0, str(Path(__file__).parent))
-from ledger import append_trade, load_ledger
+sys.path.insert(1, str(Path(__file__).resolve().parents[3]))
+from ledger import LEDGER_PATH, append_trades, compact_ledger, load_ledger
+from lib.position_engine import get_book
 from events import emit_trade_detected, emit_ledger_updated, emit_ingestion_error
 
 # Configure logging
@@ -273,6 +275,11 @@ def parse_email_for_trade(msg: Message) -> Optional[Dict[str, Any]]:
         return None
 
 
+def _strict_ledger_events() -> List[Dict[str, Any]]:
+    """Ledger events (snapshot plus journal); raises on a missing or corrupt trades.json."""
+    return load_ledger(strict=True).get("events", [])
+
+
 def check_and_create_expirations() -> int:
     """
     Check for expired Robinhood options and create EXPIRE_WORTHLESS events.
@@ -280,6 +287,7 @@ def check_and_create_expirations() -> int:
     Rules:
     - Only process Robinhood positions (not Schwab)
     - Open position = SELL_TO_OPEN exists + no BUY_TO_CLOSE + no ASSIGNMENT + no EXPIRE_WORTHLESS
+      (per ticker/strike/expiration/option type, from the shared position engine)
     - Expiration condition: expiration_date < today
     - Idempotent: never create duplicate expiration events
     
@@ -290,16 +298,13 @@ def check_and_create_expirations() -> int:
     from datetime import date, datetime, timezone, timedelta
     from pathlib import Path
     
-    HOME_DIR = Path.home()
-    LEDGER_PATH = HOME_DIR / ".openclaw" / "workspace" / "data" / "options" / "trades.json"
-    
     today = date.today()
     
     try:
-        # Load ledger
+        # Shared position state for trades.json plus journaled events not yet
+        # compacted; only rebuilt when the ledger changed since the last query
         try:
-            with open(LEDGER_PATH) as f:
-                ledger = json.load(f)
+            book = get_book(LEDGER_PATH, loader=_strict_ledger_events)
         except FileNotFoundError:
             logger.error(f"Ledger not found: {LEDGER_PATH}. Cannot continue ingestion.")
             return {"error": "Ledger file not found", "status": "failed"}
@@ -307,60 +312,23 @@ def check_and_create_expirations() -> int:
             logger.error(f"Ledger corrupted (invalid JSON): {LEDGER_PATH}. Error: {e}. Manual restore required.")
             return {"error": f"Ledger JSON corrupted: {e}", "status": "failed"}
         
-        events = ledger.get("events", [])
-        
-        # Build position map: key -> {opens, closes, expirations, account}
-        # Key: ticker|strike|expiration
-        position_map = {}
-        
-        for event in events:
-            account = event.get("account", "")
-            if account != "Robinhood":
-                continue
-            
-            ticker = event.get("ticker", "")
-            strike = event.get("strike", 0)
-            expiration = event.get("expiration", "")
-            event_type = event.get("event_type", "")
-            contracts = event.get("contracts", 0)
-            option_type = event.get("option_type", "PUT")  # Default to PUT for expirations
-            
-            key = f"{ticker}|{strike}|{expiration}"
-            
-            if key not in position_map:
-                position_map[key] = {
-                    "ticker": ticker,
-                    "strike": strike,
-                    "expiration": expiration,
-                    "account": account,
-                    "option_type": option_type,
-                    "opens": 0,
-                    "closes": 0,
-                    "assignments": 0,
-                    "expired": 0
-                }
-            
-            if event_type == "SELL_TO_OPEN":
-                position_map[key]["opens"] += contracts
-                position_map[key]["option_type"] = option_type  # Capture from opening event
-            elif event_type == "BUY_TO_CLOSE":
-                position_map[key]["closes"] += contracts
-            elif event_type == "ASSIGNMENT":
-                position_map[key]["assignments"] += contracts
-            elif event_type == "EXPIRE_WORTHLESS":
-                position_map[key]["expired"] += contracts
-        
         # Find open positions that have expired
         expirations_to_create = []
         
-        for key, pos in position_map.items():
-            opens = pos["opens"]
-            closes = pos["closes"]
-            assignments = pos["assignments"]
-            expired = pos["expired"]
+        for position in book.positions.values():
+            if position.account != "Robinhood":
+                continue
+            
+            pos = {
+                "ticker": position.ticker,
+                "strike": position.strike,
+                "expiration": position.expiration,
+                "account": position.account,
+                "option_type": position.option_type
+            }
             
             # Check if position is open
-            net_position = opens - closes - assignments - expired
+            net_position = position.sell_to_open - position.buy_to_close - position.assigned - position.expired
             if net_position <= 0:
                 continue
             
@@ -388,13 +356,8 @@ def check_and_create_expirations() -> int:
             event_id_input = f"{pos['ticker']}{pos['strike']}{pos['expiration']}{pos.get('option_type', 'PUT')}EXPIRE_WORTHLESS{pos['account']}"
             trade_id = hashlib.sha1(event_id_input.encode()).hexdigest()[:16]
             
-            # Check if already expired (include option_type in key)
-            existing = any(
-                e.get("id") == trade_id 
-                for e in events 
-                if e.get("event_type") == "EXPIRE_WORTHLESS"
-                and f"{e.get('ticker')}|{e.get('strike')}|{e.get('expiration')}|{e.get('option_type', 'PUT')}" == f"{pos['ticker']}|{pos['strike']}|{pos['expiration']}|{pos.get('option_type', 'PUT')}"
-            )
+            # Check if already expired (the position holds its own EXPIRE_WORTHLESS events)
+            existing = any(e.get("id") == trade_id for e in position.expire_events)
             
             if existing:
                 continue
@@ -414,11 +377,9 @@ def check_and_create_expirations() -> int:
                 "source": "expiration_engine",
             })
         
-        # Write expirations to ledger via append_trade() for thread-safety
+        # Write expirations to ledger in one batch (one lock, one write, deduped)
         created_count = 0
-        for exp_event in expirations_to_create:
-            # Use append_trade which handles duplicate detection and file locking
-            success, message = append_trade(exp_event)
+        for success, message in append_trades(expirations_to_create):
             if success:
                 created_count += 1
                 logger.info(f"Expiration created: {message}")
@@ -463,10 +424,9 @@ def run(schedule: str) -> Dict[str, Any]:
         
         logger.info(f"Parsed {len(trades)} trades from {len(emails)} emails")
         
-        # 5. Write to ledger
+        # 5. Write to ledger (one batch: one lock, one write, deduped)
         new_count = 0
-        for trade in trades:
-            success, message = append_trade(trade)
+        for trade, (success, message) in zip(trades, append_trades(trades)):
             if success:
                 new_count += 1
                 # Emit TRADE_DETECTED (non-blocking)
@@ -481,6 +441,12 @@ def run(schedule: str) -> Dict[str, Any]:
         # 6. Run expiration checker (always runs, even if no new emails)
         expirations_created = check_and_create_expirations()
         
+        # 7. Fold this run's journaled events into trades.json (one rewrite)
+        try:
+            compact_ledger()
+        except Exception as e:
+            logger.warning(f"Ledger compaction deferred: {e}")
+        
         runtime_ms = int((time.time() - start_time) * 1000)
         
         # 6. Emit LEDGER_UPDATED (non-blocking)
@@ -2,113 +2,57 @@
 Ledger Validation
 Detects issues in the trades ledger without modifying it.
 """
-import json
-from datetime import datetime
+import sys
 from pathlib import Path
-from collections import defaultdict
-from typing import Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lib.position_engine import get_book, read_ledger_events
 
 LEDGER_PATH = Path("~/.openclaw/workspace/data/options/trades.json").expanduser()
 
 
 def load_ledger() -> dict:
-    """Load the ledger data."""
-    if not LEDGER_PATH.exists():
-        return {"events": []}
-    
-    with open(LEDGER_PATH, "r") as f:
-        return json.load(f)
+    """Load the ledger data (trades.json plus journaled events)."""
+    return {"events": read_ledger_events(LEDGER_PATH)}
 
 
 def validate_ledger() -> dict:
     """
     Validate the ledger and return a report of issues.
     
+    Positions come from the shared PositionBook (one pass, cached per ledger
+    version), keyed by ticker, strike, expiration, option type and account.
+    
     Returns dict with:
     - orphan_buy_to_close: list of BUY_TO_CLOSE without matching SELL_TO_OPEN
     - orphan_expire_worthless: list of EXPIRE_WORTHLESS without position
     - negative_balances: list of positions with negative contract counts
     """
-    data = load_ledger()
-    events = data.get("events", [])
-    
-    # Track positions: key -> {sells: int, buys: int, opens: int, closes: int}
-    positions = defaultdict(lambda: {"sells": 0, "buys": 0, "opens": 0, "closes": 0})
+    book = get_book(LEDGER_PATH)
     
-    # First pass: categorize events
-    for event in events:
-        key = _make_key(event)
-        
-        if event.get("event_type") == "SELL_TO_OPEN":
-            positions[key]["sells"] += event.get("contracts", 0)
-            positions[key]["opens"] += event.get("contracts", 0)
-        elif event.get("event_type") == "BUY_TO_CLOSE":
-            positions[key]["buys"] += event.get("contracts", 0)
-            positions[key]["closes"] += event.get("contracts", 0)
-        elif event.get("event_type") == "SELL_TO_CLOSE":
-            positions[key]["sells"] += event.get("contracts", 0)
-            positions[key]["closes"] += event.get("contracts", 0)
-        elif event.get("event_type") == "BUY_TO_OPEN":
-            positions[key]["buys"] += event.get("contracts", 0)
-            positions[key]["opens"] += event.get("contracts", 0)
-    
-    # Second pass: find orphan BUY_TO_CLOSE events
     orphan_buy_to_close = []
-    for event in events:
-        if event.get("event_type") != "BUY_TO_CLOSE":
-            continue
-        
-        key = _make_key(event)
-        position = positions[key]
-        
-        # If we have more closes than opens for this position, it's an orphan
-        if position["closes"] > position["opens"]:
-            orphan_buy_to_close.append({
-                "ticker": event.get("ticker"),
-                "strike": event.get("strike"),
-                "expiration": event.get("expiration"),
-                "option_type": event.get("option_type"),
-                "contracts": event.get("contracts"),
-                "timestamp": event.get("timestamp"),
-                "account": event.get("account"),
-                "id": event.get("id")
-            })
-    
-    # Find orphan EXPIRE_WORTHLESS (position never opened)
     orphan_expire_worthless = []
-    for event in events:
-        if event.get("event_type") != "EXPIRE_WORTHLESS":
-            continue
+    negative_balances = []
+    
+    for position in book.positions.values():
+        # More closes than opens: every BUY_TO_CLOSE on this position is suspect
+        if position.closes > position.opens:
+            orphan_buy_to_close.extend(_event_summary(e) for e in position.close_events)
         
-        key = _make_key(event)
-        position = positions[key]
+        # Expired without ever being opened
+        if position.opens == 0:
+            orphan_expire_worthless.extend(_event_summary(e) for e in position.expire_events)
         
-        # If no opens for this position, it's an orphan
-        if position["opens"] == 0:
-            orphan_expire_worthless.append({
-                "ticker": event.get("ticker"),
-                "strike": event.get("strike"),
-                "expiration": event.get("expiration"),
-                "option_type": event.get("option_type"),
-                "contracts": event.get("contracts"),
-                "timestamp": event.get("timestamp"),
-                "account": event.get("account"),
-                "id": event.get("id")
-            })
-    
-    # Find negative balances
-    negative_balances = []
-    for key, position in positions.items():
-        # Net position = sells - buys (for shorts) or buys - sells (for longs)
-        # A negative balance means we closed more than we opened
-        net = position["sells"] - position["buys"]
+        # Net position = sells - buys; negative means we closed more than we opened
+        net = (position.sell_to_open + position.sell_to_close) - (position.buy_to_close + position.buy_to_open)
         if net < 0:
-            ticker, strike, expiration, account = key.split("|")
             negative_balances.append({
-                "ticker": ticker,
-                "strike": float(strike),
-                "expiration": expiration,
-                "account": account,
+                "ticker": position.ticker,
+                "strike": float(position.strike or 0),
+                "expiration": position.expiration,
+                "option_type": position.option_type,
+                "account": position.account,
                 "net_contracts": net
             })
     
@@ -116,13 +60,21 @@ def validate_ledger() -> dict:
         "orphan_buy_to_close": orphan_buy_to_close,
         "orphan_expire_worthless": orphan_expire_worthless,
         "negative_balances": negative_balances,
-        "total_events": len(events)
+        "total_events": book.events_applied
     }
 
 
-def _make_key(event: dict) -> str:
-    """Create a unique key for a position."""
-    return f"{event.get('ticker')}|{event.get('strike')}|{event.get('expiration')}|{event.get('account', 'Unknown')}"
+def _event_summary(event: dict) -> dict:
+    return {
+        "ticker": event.get("ticker"),
+        "strike": event.get("strike"),
+        "expiration": event.get("expiration"),
+        "option_type": event.get("option_type"),
+        "contracts": event.get("contracts"),
+        "timestamp": event.get("timestamp"),
+        "account": event.get("account"),
+        "id": event.get("id")
+    }
 
 
 def print_validation_report():
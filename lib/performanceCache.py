@@ -3,21 +3,46 @@ Performance Cache Library
 
 Provides caching functionality for the performance-v2 API endpoint.
 Cache key includes context + date range: weekly, monthly, yearly, custom-START-END
+
+The cache is a bounded LRU (MAX_ENTRIES). Entries covering only past dates
+keep for HISTORICAL_TTL_SECONDS; all others expire after TTL_SECONDS or as
+soon as the quote cache timestamp moves on. get_or_compute() serves expired
+entries immediately and recomputes them in the background
+(stale-while-revalidate). Persistence appends changed keys to a JSONL
+journal that is folded into performance_cache.json by atomic rewrite.
 """
 
 import json
 import os
 import threading
-from datetime import datetime, date
-from typing import Dict, Any, Optional
+import time
+from collections import OrderedDict
+from datetime import datetime, date, timedelta
+from typing import Callable, Dict, Any, Iterable, Optional, Tuple
+
+# Cache bounds
+MAX_ENTRIES = 256
+TTL_SECONDS = 300
+HISTORICAL_TTL_SECONDS = 24 * 3600
 
-# Cache storage
-_performance_cache: Dict[str, Dict[str, Any]] = {}
+# Cache storage (least recently used first)
+_performance_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
 _cache_lock = threading.Lock()
+# Serializes saves so journal appends and compaction never interleave
+_persist_lock = threading.Lock()
+_stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'evictions': 0, 'revalidations': 0, 'revalidation_errors': 0}
+_revalidating: set = set()
+
+# Keys changed (None = deleted) since the last save
+_dirty: Dict[str, Optional[Dict[str, Any]]] = {}
 
-# Cache file path
+# Cache file paths
 CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
 CACHE_FILE = os.path.join(CACHE_DIR, 'performance_cache.json')
+JOURNAL_FILE = os.path.join(CACHE_DIR, 'performance_cache.journal.jsonl')
+
+# Fold the journal into CACHE_FILE once it holds this many records
+COMPACT_AFTER = 200
 
 
 def generate_cache_key(context: str, start_date: Optional[str] = None, end_date: Optional[str] = None, month_offset: int = 0) -> str:
@@ -51,6 +76,43 @@ def generate_cache_key(context: str, start_date: Optional[str] = None, end_date:
         return context
 
 
+def _key_ttl(key: str, today: date) -> int:
+    """Entries whose whole range is in the past only change when trades do."""
+    key_range = cache_key_range(key, today)
+    if key_range and key_range[1] < today:
+        return HISTORICAL_TTL_SECONDS
+    return TTL_SECONDS
+
+
+def _is_fresh(entry: Dict[str, Any], now: float) -> bool:
+    if now - entry.get('stored_at', 0) > entry.get('ttl', TTL_SECONDS):
+        return False
+    # Live entries are tied to the quotes they were computed against
+    if entry.get('ttl', TTL_SECONDS) < HISTORICAL_TTL_SECONDS:
+        return entry.get('quote_timestamp') == _quote_version()
+    return True
+
+
+def _lookup(key: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """(entry, fresh) for key, marking it most recently used. Caller holds the lock."""
+    entry = _performance_cache.get(key)
+    if entry is None:
+        return None, False
+    _performance_cache.move_to_end(key)
+    return entry, _is_fresh(entry, time.time())
+
+
+def _store(key: str, entry: Dict[str, Any]) -> None:
+    """Insert and evict least recently used entries past MAX_ENTRIES. Caller holds the lock."""
+    _performance_cache[key] = entry
+    _performance_cache.move_to_end(key)
+    _dirty[key] = entry
+    while len(_performance_cache) > MAX_ENTRIES:
+        evicted, _ = _performance_cache.popitem(last=False)
+        _dirty[evicted] = None
+        _stats['evictions'] += 1
+
+
 def get_performance_cache(key: str) -> Optional[Dict[str, Any]]:
     """
     Get cached performance data for the given key.
@@ -59,10 +121,12 @@ def get_performance_cache(key: str) -> Optional[Dict[str, Any]]:
         key: Cache key (weekly, monthly-YYYY-MM, yearly, custom-YYYY-MM-DD-YYYY-MM-DD)
     
     Returns:
-        Cached data dict or None if not found
+        Cached data dict or None if not found or expired
     """
     with _cache_lock:
-        return _performance_cache.get(key)
+        entry, fresh = _lookup(key)
+        _stats['hits' if fresh else 'misses'] += 1
+        return entry if fresh else None
 
 
 def set_performance_cache(key: str, data: Dict[str, Any]) -> None:
@@ -73,10 +137,76 @@ def set_performance_cache(key: str, data: Dict[str, Any]) -> None:
         key: Cache key
         data: Performance data to cache
     """
+    entry = {
+        'data': data,
+        'timestamp': datetime.now().isoformat(),
+        'stored_at': time.time(),
+        'ttl': _key_ttl(key, date.today()),
+        'quote_timestamp': _quote_version()
+    }
+    with _cache_lock:
+        _store(key, entry)
+
+
+def get_or_compute(key: str, compute: Callable[[], Dict[str, Any]],
+                   is_valid: Optional[Callable[[Dict[str, Any]], bool]] = None) -> Dict[str, Any]:
+    """
+    Cached data for key, computing it on a miss.
+    
+    An expired entry is returned as-is while compute() refreshes it on a
+    background thread (one revalidation per key at a time), so readers
+    only block when nothing usable is cached. is_valid(data) can reject
+    an entry outright (treated as a miss).
+    """
     with _cache_lock:
-        _performance_cache[key] = {
-            'data': data,
-            'timestamp': datetime.now().isoformat()
+        entry, fresh = _lookup(key)
+        if entry is not None and is_valid and not is_valid(entry['data']):
+            entry = None
+        if entry is not None and fresh:
+            _stats['hits'] += 1
+            return entry['data']
+        if entry is not None:
+            _stats['stale_hits'] += 1
+            revalidate = key not in _revalidating
+            if revalidate:
+                _revalidating.add(key)
+        else:
+            _stats['misses'] += 1
+
+    if entry is None:
+        data = compute()
+        set_performance_cache(key, data)
+        return data
+
+    if revalidate:
+        threading.Thread(target=_revalidate, args=(key, compute), daemon=True,
+                         name=f"perf-cache-{key}").start()
+    return entry['data']
+
+
+def _revalidate(key: str, compute: Callable[[], Dict[str, Any]]) -> None:
+    try:
+        set_performance_cache(key, compute())
+        with _cache_lock:
+            _stats['revalidations'] += 1
+    except Exception:
+        with _cache_lock:
+            _stats['revalidation_errors'] += 1  # keep serving the stale entry
+    finally:
+        with _cache_lock:
+            _revalidating.discard(key)
+
+
+def get_performance_cache_stats() -> Dict[str, Any]:
+    """Hit/miss/eviction counters and current size."""
+    with _cache_lock:
+        lookups = _stats['hits'] + _stats['stale_hits'] + _stats['misses']
+        return {
+            **_stats,
+            'size': len(_performance_cache),
+            'max_entries': MAX_ENTRIES,
+            'hit_rate': round((_stats['hits'] + _stats['stale_hits']) / lookups * 100, 2) if lookups else 0.0,
+            'revalidating': sorted(_revalidating)
         }
 
 
@@ -86,28 +216,167 @@ def clear_performance_cache() -> None:
     Called when trade events are added/deleted.
     """
     with _cache_lock:
+        for key in _performance_cache:
+            _dirty[key] = None
         _performance_cache.clear()
 
 
+def cache_key_range(key: str, today: Optional[date] = None) -> Optional[Tuple[date, date]]:
+    """
+    Date range covered by a cache key, or None if it covers all dates
+    (lifetime and unrecognised keys).
+    """
+    today = today or date.today()
+    try:
+        if key == 'daily':
+            return today, today
+        if key == 'weekly':
+            start = today - timedelta(days=today.weekday())
+            return start, start + timedelta(days=6)
+        if key == 'yearly':
+            return today.replace(month=1, day=1), today.replace(month=12, day=31)
+        if key.startswith('monthly-'):
+            year, month = int(key[8:12]), int(key[13:15])
+            start = date(year, month, 1)
+            next_month = date(year + month // 12, month % 12 + 1, 1)
+            return start, next_month - timedelta(days=1)
+        if key.startswith('custom-'):
+            return date.fromisoformat(key[7:17]), date.fromisoformat(key[18:28])
+    except ValueError:
+        pass
+    return None
+
+
+def invalidate_performance_cache(dates: Iterable[date]) -> int:
+    """
+    Drop only the cache entries whose date range covers any of the given
+    trade dates. Returns the number of entries removed.
+    """
+    dates = sorted(set(dates))
+    if not dates:
+        return 0
+
+    with _cache_lock:
+        stale = []
+        for key in _performance_cache:
+            key_range = cache_key_range(key)
+            if key_range is None or any(key_range[0] <= d <= key_range[1] for d in dates):
+                stale.append(key)
+        for key in stale:
+            del _performance_cache[key]
+            _dirty[key] = None
+        return len(stale)
+
+
+def invalidate_performance_cache_before(epoch: float) -> int:
+    """
+    Drop the cache entries computed before epoch (seconds). Returns the
+    number of entries removed.
+    """
+    with _cache_lock:
+        stale = [key for key, entry in _performance_cache.items() if entry.get('stored_at', 0) < epoch]
+        for key in stale:
+            del _performance_cache[key]
+            _dirty[key] = None
+        return len(stale)
+
+
 def load_performance_cache_from_file() -> None:
-    """Load cache from persistent file if available."""
+    """Load cache from persistent file (snapshot plus journal) if available."""
+    entries: Dict[str, Any] = {}
     if os.path.exists(CACHE_FILE):
         try:
             with open(CACHE_FILE, 'r') as f:
-                _performance_cache.update(json.load(f))
+                entries.update(json.load(f))
         except (json.JSONDecodeError, IOError):
             pass  # Start with empty cache if file is invalid
+    try:
+        with open(JOURNAL_FILE, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # torn final line from an interrupted save
+                entries.pop(record['key'], None)
+                if record.get('entry') is not None:
+                    entries[record['key']] = record['entry']
+    except (IOError, KeyError):
+        pass
+
+    with _cache_lock:
+        for key, entry in entries.items():
+            if isinstance(entry, dict) and 'data' in entry:
+                _performance_cache[key] = entry
+                _performance_cache.move_to_end(key)
+        while len(_performance_cache) > MAX_ENTRIES:
+            _performance_cache.popitem(last=False)
+
+
+def has_unsaved_changes() -> bool:
+    """Whether any key changed since the last save."""
+    with _cache_lock:
+        return bool(_dirty)
 
 
 def save_performance_cache_to_file() -> None:
-    """Save cache to persistent file."""
+    """
+    Persist keys changed since the last save by appending them to the
+    journal; fold the journal into CACHE_FILE (atomic rewrite) once it
+    holds COMPACT_AFTER records. Concurrent saves run one at a time, so a
+    compaction never writes an older snapshot over a newer one.
+    """
+    with _persist_lock:
+        _save_locked()
+
+
+def _save_locked() -> None:
+    with _cache_lock:
+        if not _dirty:
+            return
+        records = [{'key': key, 'entry': entry} for key, entry in _dirty.items()]
+        _dirty.clear()
+        snapshot = dict(_performance_cache)
+
     try:
-        with open(CACHE_FILE, 'w') as f:
-            json.dump(_performance_cache, f, indent=2)
-    except IOError:
+        with open(JOURNAL_FILE, 'a') as f:
+            f.write(''.join(json.dumps(r, separators=(',', ':')) + '\n' for r in records))
+            f.flush()
+            os.fsync(f.fileno())
+
+        with open(JOURNAL_FILE, 'r') as f:
+            journal_records = sum(1 for _ in f)
+        if journal_records >= COMPACT_AFTER:
+            tmp = f"{CACHE_FILE}.{os.getpid()}.tmp"
+            with open(tmp, 'w') as f:
+                json.dump(snapshot, f, separators=(',', ':'))
+            os.replace(tmp, CACHE_FILE)
+            os.remove(JOURNAL_FILE)
+    except (IOError, OSError):
         pass  # Silently fail if unable to write
 
 
+_quote_version_cache: Dict[str, Any] = {'signature': None, 'value': None}
+
+
+def _quote_version() -> Optional[str]:
+    """lastQuoteUpdate of the quote cache (None if unavailable), re-read only when the file changes."""
+    quote_cache_file = os.path.join(CACHE_DIR, 'quote_cache.json')
+    try:
+        st = os.stat(quote_cache_file)
+    except OSError:
+        return None
+
+    signature = (st.st_mtime_ns, st.st_size)
+    if _quote_version_cache['signature'] != signature:
+        try:
+            with open(quote_cache_file, 'r') as f:
+                value = json.load(f).get('lastQuoteUpdate')
+        except (json.JSONDecodeError, IOError, AttributeError):
+            value = None
+        _quote_version_cache.update(signature=signature, value=value)
+    return _quote_version_cache['value']
+
+
 def get_quote_timestamp() -> str:
     """
     Get the quote timestamp from quote cache.
@@ -115,12 +384,4 @@ def get_quote_timestamp() -> str:
     Returns:
         ISO format timestamp string from quote cache
     """
-    quote_cache_file = os.path.join(CACHE_DIR, 'quote_cache.json')
-    try:
-        if os.path.exists(quote_cache_file):
-            with open(quote_cache_file, 'r') as f:
-                quote_data = json.load(f)
-                return quote_data.get('lastQuoteUpdate', datetime.now().isoformat())
-    except (json.JSONDecodeError, IOError):
-        pass
-    return datetime.now().isoformat()
+    return _quote_version() or datetime.now().isoformat()
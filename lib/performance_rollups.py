@@ -0,0 +1,171 @@
+"""
+Performance Rollups
+
+Daily per-ticker realized P/L aggregates for the performance-v2 API endpoint.
+Each trade is bucketed once by its date; any context (daily, weekly, monthly,
+yearly, lifetime, custom range) is answered by summing the buckets in range.
+
+The rollup follows trades.json by signature (mtime + size). When the file has
+only grown (new trades appended), just the new tail is bucketed and the
+performance cache entries whose ranges cover the new trades' dates are
+invalidated; any other change rebuilds the rollup and clears the cache.
+The first build in a process keeps persisted cache entries computed after
+trades.json last changed.
+"""
+
+import bisect
+import json
+import os
+import threading
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from lib.performanceCache import (
+    clear_performance_cache, invalidate_performance_cache, invalidate_performance_cache_before
+)
+
+# Per-ticker cell: [realized P/L, wins, losses, total trades]
+Cell = List[float]
+
+_lock = threading.Lock()
+_state: Dict[str, Any] = {
+    "path": None,
+    "signature": None,
+    "applied": 0,
+    "last_trade": None,  # JSON of the last bucketed trade, to detect edits
+    "days": {},          # ISO date -> {ticker: Cell}
+    "day_keys": [],      # sorted ISO dates
+    "undated": {},       # trades without a parseable date count in every context
+}
+
+
+def trade_pnl(trade: Dict[str, Any]) -> float:
+    """Realized P/L of a trade (realized_pnl, falling back to premium for CSPs)."""
+    pnl = trade.get('realized_pnl')
+    if pnl is None:
+        pnl = trade.get('premium', 0) or 0
+    return pnl
+
+
+def trade_day(trade: Dict[str, Any]) -> Optional[str]:
+    """ISO date of a trade, or None if it has no parseable date."""
+    day = trade.get('date') or (trade.get('timestamp') or '')[:10]
+    try:
+        return date.fromisoformat(day).isoformat()
+    except (TypeError, ValueError):
+        return None
+
+
+def _signature(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _reset(path: str) -> None:
+    _state.update(path=path, signature=None, applied=0, last_trade=None,
+                  days={}, day_keys=[], undated={})
+
+
+def _bucket(trades: Iterable[Dict[str, Any]]) -> set:
+    """Add trades to the daily buckets. Returns the set of days touched (None = undated)."""
+    touched = set()
+    days = _state["days"]
+    for trade in trades:
+        day = trade_day(trade)
+        if day is None:
+            bucket = _state["undated"]
+        else:
+            bucket = days.get(day)
+            if bucket is None:
+                bucket = days[day] = {}
+                bisect.insort(_state["day_keys"], day)
+        touched.add(day)
+
+        ticker = trade.get('ticker', 'UNKNOWN')
+        cell = bucket.get(ticker)
+        if cell is None:
+            cell = bucket[ticker] = [0.0, 0, 0, 0]
+
+        pnl = trade_pnl(trade)
+        cell[0] += pnl
+        cell[3] += 1
+        if pnl > 0:
+            cell[1] += 1
+        elif pnl < 0:
+            cell[2] += 1
+        # pnl == 0 is neither win nor loss
+    return touched
+
+
+def refresh(trades_file: str) -> None:
+    """Bring the rollup up to date with trades_file (cheap stat when unchanged)."""
+    with _lock:
+        signature = _signature(trades_file)
+        if _state["path"] == trades_file and _state["signature"] == signature:
+            return
+
+        trades = []
+        if signature is not None:
+            try:
+                with open(trades_file, 'r') as f:
+                    trades = json.load(f).get('trades', [])
+            except (json.JSONDecodeError, IOError):
+                return  # keep serving the last good rollup (e.g. mid-write)
+
+        applied = _state["applied"]
+        appended = (
+            _state["path"] == trades_file
+            and len(trades) >= applied
+            and (applied == 0 or json.dumps(trades[applied - 1], sort_keys=True) == _state["last_trade"])
+        )
+
+        if appended:
+            touched = _bucket(trades[applied:])
+            if None in touched:
+                clear_performance_cache()
+            elif touched:
+                invalidate_performance_cache(date.fromisoformat(day) for day in touched)
+        else:
+            initial = _state["path"] is None
+            _reset(trades_file)
+            _bucket(trades)
+            if initial and signature is not None:
+                # First build in this process: entries loaded from the persisted
+                # cache stay valid if computed after trades_file last changed
+                invalidate_performance_cache_before(signature[0] / 1e9)
+            else:
+                clear_performance_cache()
+
+        _state["signature"] = signature
+        _state["applied"] = len(trades)
+        _state["last_trade"] = json.dumps(trades[-1], sort_keys=True) if trades else None
+
+
+def ticker_stats(start: Optional[date] = None, end: Optional[date] = None) -> Tuple[Dict[str, Dict[str, Any]], int]:
+    """
+    Per-ticker {ticker, realizedPl, wins, losses, total} summed over days in
+    [start, end] (open-ended when None), plus the number of trades counted.
+    """
+    with _lock:
+        day_keys = _state["day_keys"]
+        lo = bisect.bisect_left(day_keys, start.isoformat()) if start else 0
+        hi = bisect.bisect_right(day_keys, end.isoformat()) if end else len(day_keys)
+        buckets = [_state["days"][day] for day in day_keys[lo:hi]]
+        buckets.append(_state["undated"])
+
+        stats: Dict[str, Dict[str, Any]] = {}
+        total_trades = 0
+        for bucket in buckets:
+            for ticker, cell in bucket.items():
+                row = stats.get(ticker)
+                if row is None:
+                    row = stats[ticker] = {'ticker': ticker, 'realizedPl': 0.0, 'wins': 0, 'losses': 0, 'total': 0}
+                row['realizedPl'] += cell[0]
+                row['wins'] += cell[1]
+                row['losses'] += cell[2]
+                row['total'] += cell[3]
+                total_trades += cell[3]
+        return stats, total_trades
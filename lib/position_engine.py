@@ -0,0 +1,527 @@
+"""
+Position Engine
+Incremental FIFO lot matching over ledger events.
+
+A PositionBook indexes lots by (ticker, strike, expiration, option_type,
+account) in one pass. Closes consume the oldest lots first, so partial
+closes realize P&L against the premiums actually paid. New events can be
+applied to an existing book without replaying the ledger; positions,
+realized P&L and grades are read off the book in linear time.
+
+Accepts both ledger schemas: options/trades.json events (event_type,
+contracts, price, timestamp) and legacy trades (action, quantity, premium, date).
+
+get_book() is the shared entry point for ledger consumers (calc_positions,
+ledger_validation, Bob's expiration engine): the book is materialised once
+per ledger version, keyed by the mtime and size of trades.json and its
+journal, and extended in place when only the journal has grown.
+"""
+
+import json
+import threading
+from collections import deque
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+LEDGER_PATH = Path("~/.openclaw/workspace/data/options/trades.json").expanduser()
+
+# Opening actions and the side of the book they add to
+OPEN_SIDES = {"SELL_TO_OPEN": "short", "BUY_TO_OPEN": "long"}
+
+# Closing actions and the side they consume (None: whichever side is open)
+CLOSE_SIDES = {
+    "BUY_TO_CLOSE": "short",
+    "SELL_TO_CLOSE": "long",
+    "ASSIGNMENT": "short",
+    "EXPIRED": None,
+    "EXPIRE_WORTHLESS": None,
+}
+
+# Closes that realize P&L and get a trade grade (assignment does not)
+GRADED_ACTIONS = {"BUY_TO_CLOSE", "SELL_TO_CLOSE", "EXPIRED", "EXPIRE_WORTHLESS"}
+EXPIRY_ACTIONS = {"EXPIRED", "EXPIRE_WORTHLESS"}
+
+PositionKey = Tuple[str, Any, str, str, str]
+
+
+def normalize(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Map either ledger schema onto one set of fields."""
+    action = event.get("event_type") or event.get("action") or ""
+    quantity = event.get("contracts")
+    if quantity is None:
+        quantity = event.get("quantity", 0)
+    price = event.get("price")
+    if price is None:
+        price = event.get("premium", 0)
+    trade_date = event.get("date") or str(event.get("timestamp") or "")[:10]
+
+    return {
+        "ticker": event.get("ticker", ""),
+        "strike": event.get("strike"),
+        "expiration": event.get("expiration", ""),
+        "option_type": event.get("option_type", "PUT"),
+        "account": event.get("account", "Unknown"),
+        "action": action,
+        "quantity": quantity or 0,
+        "price": price or 0,
+        "date": trade_date,
+    }
+
+
+def position_key(trade: Dict[str, Any]) -> PositionKey:
+    return (trade["ticker"], trade["strike"], trade["expiration"], trade["option_type"], trade["account"])
+
+
+def grade_close(pnl_pct: Optional[float]) -> str:
+    """Letter grade for a closed trade from its return on entry premium."""
+    if pnl_pct is None:
+        return "C"
+    if pnl_pct >= 90:
+        return "A"
+    if pnl_pct >= 50:
+        return "B"
+    if pnl_pct >= 0:
+        return "C"
+    if pnl_pct >= -50:
+        return "D"
+    return "F"
+
+
+def grade_win_rate(win_rate: float) -> str:
+    if win_rate >= 80:
+        return "A"
+    if win_rate >= 60:
+        return "B"
+    if win_rate >= 40:
+        return "C"
+    if win_rate >= 20:
+        return "D"
+    return "F"
+
+
+class Position:
+    """
+    State of one option leg. Lots are FIFO deques of [quantity, premium, date];
+    the contract counters are raw per-event-type totals used for validation.
+    """
+
+    __slots__ = (
+        "ticker", "strike", "expiration", "option_type", "account",
+        "total_premium", "open_date", "short_lots", "long_lots", "open_short", "open_long",
+        "sell_to_open", "buy_to_open", "buy_to_close", "sell_to_close", "assigned", "expired",
+        "close_events", "expire_events",
+    )
+
+    def __init__(self, ticker, strike, expiration, option_type, account):
+        self.ticker = ticker
+        self.strike = strike
+        self.expiration = expiration
+        self.option_type = option_type
+        self.account = account
+        self.total_premium = 0
+        self.open_date = ""
+        self.short_lots = deque()
+        self.long_lots = deque()
+        self.open_short = 0
+        self.open_long = 0
+        self.sell_to_open = 0
+        self.buy_to_open = 0
+        self.buy_to_close = 0
+        self.sell_to_close = 0
+        self.assigned = 0
+        self.expired = 0
+        # Raw BUY_TO_CLOSE / EXPIRE_WORTHLESS events, for orphan reports
+        self.close_events = []
+        self.expire_events = []
+
+    @property
+    def net_quantity(self) -> int:
+        """Open short contracts minus open long contracts (after FIFO matching)."""
+        return self.open_short - self.open_long
+
+    @property
+    def opens(self) -> int:
+        return self.sell_to_open + self.buy_to_open
+
+    @property
+    def closes(self) -> int:
+        return self.buy_to_close + self.sell_to_close
+
+
+class PositionBook:
+    """
+    Open lots, realized closes and per-ticker stats for a ledger.
+
+    positions maps PositionKey -> Position.
+    """
+
+    def __init__(self, events: Iterable[Dict[str, Any]] = ()):
+        self.positions: Dict[PositionKey, Position] = {}
+        self.closes: List[Dict[str, Any]] = []
+        self.tickers: Dict[str, Dict[str, Any]] = {}
+        self.events_applied = 0
+        self.apply(events)
+
+    # -------------------------------------------------------------------------
+    # Updates
+    # -------------------------------------------------------------------------
+
+    def apply(self, events: Iterable[Dict[str, Any]]) -> "PositionBook":
+        """Apply events in ledger order. Safe to call again with newly appended events."""
+        for event in events:
+            self._apply_one(normalize(event), event)
+        return self
+
+    def _position(self, key: PositionKey) -> Position:
+        pos = self.positions.get(key)
+        if pos is None:
+            pos = self.positions[key] = Position(*key)
+        return pos
+
+    def _ticker(self, ticker: str) -> Dict[str, Any]:
+        stats = self.tickers.get(ticker)
+        if stats is None:
+            stats = self.tickers[ticker] = {
+                "ticker": ticker,
+                "total_pnl": 0,
+                "trades": 0,
+                "wins": 0,
+                "win_rate": 0,
+                "premium_collected": 0,
+                "largest_win": 0,
+                "largest_loss": 0,
+                "open_now": False,
+                "grade": "C",
+            }
+        return stats
+
+    def _apply_one(self, trade: Dict[str, Any], event: Dict[str, Any]) -> None:
+        self.events_applied += 1
+        action = trade["action"]
+        qty = trade["quantity"]
+        price = trade["price"]
+
+        stats = self._ticker(trade["ticker"])
+        stats["trades"] += 1
+
+        if action in OPEN_SIDES:
+            pos = self._position(position_key(trade))
+            if OPEN_SIDES[action] == "short":
+                pos.sell_to_open += qty
+                pos.open_short += qty
+                pos.short_lots.append([qty, price, trade["date"]])
+                # Premium is in decimal format (0.65 = $65 per contract)
+                pos.total_premium += price * qty * 100
+                stats["premium_collected"] += price * qty * 100
+                if pos.open_date == "" or pos.open_date > trade["date"]:
+                    pos.open_date = trade["date"]
+            else:
+                pos.buy_to_open += qty
+                pos.open_long += qty
+                pos.long_lots.append([qty, price, trade["date"]])
+            return
+
+        if action not in CLOSE_SIDES:
+            return
+
+        pos = self._position(position_key(trade))
+        if action == "BUY_TO_CLOSE":
+            pos.buy_to_close += qty
+            pos.close_events.append(event)
+        elif action == "SELL_TO_CLOSE":
+            pos.sell_to_close += qty
+        elif action == "ASSIGNMENT":
+            pos.assigned += qty
+        else:
+            pos.expired += qty
+            pos.expire_events.append(event)
+
+        side = CLOSE_SIDES[action]
+        if side is None:
+            side = "short" if pos.open_short or not pos.open_long else "long"
+
+        matched_qty, entry_cost = self._consume(pos, side, qty)
+        if action in GRADED_ACTIONS:
+            self._record_close(trade, side, matched_qty, entry_cost, stats)
+
+    def _consume(self, pos: Position, side: str, qty: int) -> Tuple[int, float]:
+        """Close up to qty contracts FIFO. Returns (matched contracts, sum of entry premium * contracts)."""
+        lots = pos.short_lots if side == "short" else pos.long_lots
+        matched = 0
+        cost = 0.0
+        while qty > 0 and lots:
+            lot = lots[0]
+            take = min(qty, lot[0])
+            matched += take
+            cost += take * lot[1]
+            qty -= take
+            lot[0] -= take
+            if lot[0] == 0:
+                lots.popleft()
+        if side == "short":
+            pos.open_short -= matched
+        else:
+            pos.open_long -= matched
+        return matched, cost
+
+    def _record_close(self, trade: Dict[str, Any], side: str, matched: int,
+                      entry_cost: float, stats: Dict[str, Any]) -> None:
+        action = trade["action"]
+        exit_premium = trade["price"]
+        entry_premium = entry_cost / matched if matched else 0
+        sign = 1 if side == "short" else -1
+
+        if action in EXPIRY_ACTIONS:
+            # Expired worthless: the short keeps (the long loses) the full entry premium
+            pnl = sign * entry_cost * 100 if matched else exit_premium * trade["quantity"] * 100
+            grade = "A" if side == "short" else "F"
+        elif matched:
+            pnl = sign * (entry_cost - exit_premium * matched) * 100
+            grade = grade_close(pnl / (entry_cost * 100) * 100) if entry_cost > 0 else "C"
+        else:
+            pnl = 0
+            grade = "C"
+
+        self.closes.append({
+            "ticker": trade["ticker"],
+            "date": trade["date"],
+            "action": action,
+            "quantity": trade["quantity"],
+            "strike": trade["strike"],
+            "expiration": trade["expiration"],
+            "entry_premium": round(entry_premium, 4),
+            "exit_premium": exit_premium,
+            "realized_pnl": pnl,
+            "grade": grade,
+        })
+
+        stats["total_pnl"] += pnl
+        if pnl > 0:
+            stats["wins"] += 1
+            stats["largest_win"] = max(stats["largest_win"], pnl)
+        elif pnl < 0:
+            stats["largest_loss"] = min(stats["largest_loss"], pnl)
+        stats["closed_trades"] = stats.get("closed_trades", 0) + 1
+
+    # -------------------------------------------------------------------------
+    # Reads
+    # -------------------------------------------------------------------------
+
+    def open_positions(self, today: Optional[date] = None) -> List[Dict[str, Any]]:
+        """Positions with open short contracts in excess of long ones (net > 0)."""
+        today = today or date.today()
+        result = []
+        for pos in self.positions.values():
+            net = pos.net_quantity
+            if net <= 0:
+                continue
+            try:
+                days_open = (today - datetime.strptime(pos.open_date, "%Y-%m-%d").date()).days
+            except ValueError:
+                days_open = 0
+            result.append({
+                "ticker": pos.ticker,
+                "strike": pos.strike,
+                "expiration": pos.expiration,
+                "option_type": pos.option_type,
+                "net_quantity": net,
+                "total_premium": pos.total_premium,
+                "open_date": pos.open_date,
+                "days_open": days_open,
+                "account": pos.account,
+            })
+        return result
+
+    def pnl_summary(self, today: Optional[date] = None) -> Dict[str, Any]:
+        """Period P&L, per-ticker stats (sorted by P&L) and trade grades."""
+        today = today or date.today()
+        week_start = (today - timedelta(days=today.weekday())).isoformat()
+        month_start = today.replace(day=1).isoformat()
+        year_start = today.replace(month=1, day=1).isoformat()
+
+        ytd_pnl = month_pnl = week_pnl = 0
+        for close in self.closes:
+            # ISO dates compare correctly as strings
+            close_date = close["date"]
+            if len(close_date) != 10:
+                continue
+            if close_date >= year_start:
+                ytd_pnl += close["realized_pnl"]
+            if close_date >= month_start:
+                month_pnl += close["realized_pnl"]
+            if close_date >= week_start:
+                week_pnl += close["realized_pnl"]
+
+        open_tickers = {p["ticker"] for p in self.open_positions(today)}
+        by_ticker = []
+        for ticker, stats in self.tickers.items():
+            row = dict(stats)
+            row["open_now"] = ticker in open_tickers
+            closed = row.get("closed_trades", row["trades"])
+            if closed > 0:
+                row["win_rate"] = round((row["wins"] / closed) * 100)
+            row["grade"] = grade_win_rate(row["win_rate"])
+            by_ticker.append(row)
+        by_ticker.sort(key=lambda x: x["total_pnl"], reverse=True)
+
+        return {
+            "ytd_pnl": ytd_pnl,
+            "month_pnl": month_pnl,
+            "week_pnl": week_pnl,
+            "by_ticker": by_ticker,
+            "trade_grades": list(self.closes),
+        }
+
+
+# =============================================================================
+# SHARED BOOK
+# =============================================================================
+
+def _signature(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def journal_path(ledger_path: Path) -> Path:
+    """JSONL journal written next to the ledger by Bob's ledger module."""
+    return ledger_path.with_name(f"{ledger_path.stem}.journal.jsonl")
+
+
+def read_ledger_events(ledger_path: Path = LEDGER_PATH) -> List[Dict[str, Any]]:
+    """
+    Snapshot events (or a legacy "trades" list) followed by journaled events
+    (one event or batch per line).
+    """
+    events = []
+    try:
+        with open(ledger_path) as f:
+            content = f.read()
+        if content.strip():
+            snapshot = json.loads(content)
+            events.extend(snapshot.get("events") or snapshot.get("trades", []))
+    except FileNotFoundError:
+        pass
+
+    try:
+        with open(journal_path(ledger_path)) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # torn final line from an interrupted append
+                events.extend(record if isinstance(record, list) else [record])
+    except FileNotFoundError:
+        pass
+    return events
+
+
+# (ledger path, loader) -> (snapshot signature, journal signature, PositionBook)
+_books: Dict[Tuple[str, Any], Tuple[Any, Any, PositionBook]] = {}
+_books_lock = threading.Lock()
+
+
+def get_book(ledger_path: Path = LEDGER_PATH,
+             loader: Optional[Callable[[], List[Dict[str, Any]]]] = None) -> PositionBook:
+    """
+    PositionBook for the ledger, rebuilt only when the ledger changes.
+
+    loader returns the full event list, snapshot plus journal (default:
+    read_ledger_events); its exceptions propagate. If trades.json is unchanged and only the journal
+    grew, the new tail is applied to the cached book instead of replaying.
+    Callers must treat the returned book as read-only.
+    """
+    ledger_path = Path(ledger_path)
+    snapshot_sig = _signature(ledger_path)
+    journal_sig = _signature(journal_path(ledger_path))
+    # Books built by different loaders may hold different events
+    cache_key = (str(ledger_path), loader)
+
+    with _books_lock:
+        cached = _books.get(cache_key)
+        if cached and cached[0] == snapshot_sig and cached[1] == journal_sig:
+            return cached[2]
+
+        events = loader() if loader else read_ledger_events(ledger_path)
+        journal_grew = journal_sig and journal_sig[1] > (cached[1][1] if cached and cached[1] else 0)
+        if (cached and cached[0] == snapshot_sig and journal_grew
+                and len(events) >= cached[2].events_applied):
+            book = cached[2].apply(events[cached[2].events_applied:])
+        else:
+            book = PositionBook(events)
+
+        _books[cache_key] = (snapshot_sig, journal_sig, book)
+        return book
+
+
+# =============================================================================
+# BENCHMARK
+# =============================================================================
+
+def synthetic_ledger(n: int, seed: int = 7) -> List[Dict[str, Any]]:
+    """n ledger events: short opens with partial FIFO closes and expirations."""
+    import random
+
+    rng = random.Random(seed)
+    tickers = [f"T{i:03d}" for i in range(200)]
+    start = date(2025, 1, 1)
+    open_keys = []
+    events = []
+
+    for i in range(n):
+        day = (start + timedelta(days=i * 365 // max(n, 1))).isoformat()
+        if not open_keys or rng.random() < 0.55:
+            key = (rng.choice(tickers), float(rng.randrange(20, 400)),
+                   (start + timedelta(days=rng.randrange(0, 400))).isoformat())
+            open_keys.append(key)
+            action, price = "SELL_TO_OPEN", round(rng.uniform(0.2, 5.0), 2)
+        else:
+            key = open_keys[rng.randrange(len(open_keys))]
+            action = "EXPIRE_WORTHLESS" if rng.random() < 0.3 else "BUY_TO_CLOSE"
+            price = 0 if action == "EXPIRE_WORTHLESS" else round(rng.uniform(0.01, 6.0), 2)
+        events.append({
+            "event_type": action, "ticker": key[0], "strike": key[1], "expiration": key[2],
+            "option_type": "PUT", "account": "Robinhood", "contracts": rng.randint(1, 5),
+            "price": price, "timestamp": f"{day}T15:00:00.000Z",
+        })
+    return events
+
+
+def benchmark(sizes: Iterable[int] = (10_000, 100_000)) -> List[Dict[str, Any]]:
+    """Full build and incremental-append timings on synthetic ledgers."""
+    import time
+
+    results = []
+    for n in sizes:
+        events = synthetic_ledger(n)
+        started = time.perf_counter()
+        book = PositionBook(events[:-100])
+        build_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        book.apply(events[-100:])
+        append_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        positions = book.open_positions()
+        summary = book.pnl_summary()
+        report_s = time.perf_counter() - started
+
+        results.append({
+            "events": n,
+            "build_seconds": round(build_s, 3),
+            "append_100_ms": round(append_s * 1000, 2),
+            "report_seconds": round(report_s, 3),
+            "open_positions": len(positions),
+            "graded_closes": len(summary["trade_grades"]),
+        })
+    return results
+
+
+if __name__ == "__main__":
+    import json
+
+    print(json.dumps(benchmark(), indent=2))
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+PositionBook tests
+Checks the FIFO lot engine against the matcher it replaced (the old
+calc_positions loops, kept below as legacy_*) and incremental apply()
+against a full rebuild.
+"""
+
+import json
+import random
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lib.position_engine import PositionBook, get_book, journal_path, synthetic_ledger
+
+
+# =============================================================================
+# LEGACY MATCHER (calc_positions before the position engine)
+# =============================================================================
+
+def legacy_positions(trades):
+    """Open positions (net > 0) by summing contracts per leg and account."""
+    positions = {}
+    for trade in trades:
+        key = f"{trade['ticker']}_{trade['strike']}_{trade['expiration']}_{trade.get('account', 'Unknown')}"
+        if key not in positions:
+            positions[key] = {
+                "ticker": trade['ticker'],
+                "strike": trade['strike'],
+                "expiration": trade['expiration'],
+                "option_type": trade.get('option_type', 'PUT'),
+                "net_quantity": 0,
+                "total_premium": 0,
+                "open_date": trade['date'],
+                "days_open": 0,
+                "account": trade.get('account', 'Unknown')
+            }
+        action = trade['action']
+        qty = trade['quantity']
+        if action == 'SELL_TO_OPEN':
+            positions[key]['net_quantity'] += qty
+            positions[key]['total_premium'] += trade['premium'] * qty * 100
+            if positions[key]['open_date'] == "" or positions[key]['open_date'] > trade['date']:
+                positions[key]['open_date'] = trade['date']
+        elif action in ('BUY_TO_CLOSE', 'BUY_TO_OPEN'):
+            positions[key]['net_quantity'] -= qty
+        elif action == 'SELL_TO_CLOSE':
+            positions[key]['net_quantity'] += qty
+
+    open_positions = [p for p in positions.values() if p['net_quantity'] > 0]
+    today = datetime.now().date()
+    for p in open_positions:
+        p['days_open'] = (today - datetime.strptime(p['open_date'], "%Y-%m-%d").date()).days
+    return open_positions
+
+
+def legacy_closes(trades):
+    """(realized_pnl, entry_premium) per close, matched to the first SELL_TO_OPEN of the leg."""
+    closes = []
+    for trade in trades:
+        if trade['action'] not in ('BUY_TO_CLOSE', 'SELL_TO_CLOSE', 'EXPIRED'):
+            continue
+        open_trades = [t for t in trades
+                       if t['ticker'] == trade['ticker'] and t['strike'] == trade['strike']
+                       and t['expiration'] == trade['expiration'] and t['action'] == 'SELL_TO_OPEN']
+        if open_trades and trade['action'] != 'EXPIRED':
+            pnl = (open_trades[0]['premium'] - trade['premium']) * trade['quantity'] * 100
+        elif trade['action'] == 'EXPIRED':
+            pnl = trade['premium'] * trade['quantity'] * 100
+        else:
+            pnl = 0
+        closes.append((pnl, open_trades[0]['premium'] if open_trades else 0))
+    return closes
+
+
+def trade(action, quantity, premium, day, ticker="AAPL", strike=150, expiration="2026-03-20"):
+    return {"ticker": ticker, "strike": strike, "expiration": expiration, "option_type": "PUT",
+            "account": "Main", "action": action, "quantity": quantity, "premium": premium, "date": day}
+
+
+def book_closes(book):
+    return [(close["realized_pnl"], close["entry_premium"]) for close in book.closes]
+
+
+# =============================================================================
+# TESTS
+# =============================================================================
+
+class TestLegacyParity(unittest.TestCase):
+    """Ledgers where FIFO matching and the old matcher should agree."""
+
+    def assert_parity(self, trades):
+        book = PositionBook(trades)
+        self.assertEqual(book.open_positions(), legacy_positions(trades))
+        for (pnl, entry), (old_pnl, old_entry) in zip(book_closes(book), legacy_closes(trades)):
+            self.assertAlmostEqual(pnl, old_pnl)
+            self.assertAlmostEqual(entry, old_entry)
+        return book
+
+    def test_partial_close(self):
+        trades = [
+            trade("SELL_TO_OPEN", 3, 2.00, "2026-02-02"),
+            trade("BUY_TO_CLOSE", 1, 0.50, "2026-02-09"),
+        ]
+        book = self.assert_parity(trades)
+        self.assertEqual(book.open_positions()[0]["net_quantity"], 2)
+        self.assertAlmostEqual(book.closes[0]["realized_pnl"], 150.0)
+
+    def test_partial_closes_to_flat(self):
+        trades = [
+            trade("SELL_TO_OPEN", 2, 1.20, "2026-02-02"),
+            trade("BUY_TO_CLOSE", 1, 0.40, "2026-02-05"),
+            trade("BUY_TO_CLOSE", 1, 1.50, "2026-02-10"),
+        ]
+        book = self.assert_parity(trades)
+        self.assertEqual(book.open_positions(), [])
+        self.assertEqual([c["grade"] for c in book.closes], ["B", "D"])
+
+    def test_orphan_close(self):
+        trades = [
+            trade("SELL_TO_OPEN", 1, 1.00, "2026-02-02", ticker="MSFT"),
+            trade("BUY_TO_CLOSE", 2, 0.30, "2026-02-04"),
+        ]
+        book = self.assert_parity(trades)
+        self.assertEqual(book.closes[0]["realized_pnl"], 0)
+        self.assertEqual(book.closes[0]["grade"], "C")
+        self.assertEqual([p["ticker"] for p in book.open_positions()], ["MSFT"])
+
+    def test_over_close(self):
+        # 2 opened, 3 closed: the old net goes negative, neither reports a position
+        trades = [
+            trade("SELL_TO_OPEN", 2, 1.00, "2026-02-02"),
+            trade("BUY_TO_CLOSE", 3, 0.25, "2026-02-06"),
+        ]
+        book = PositionBook(trades)
+        self.assertEqual(book.open_positions(), legacy_positions(trades))
+        self.assertEqual(book.open_positions(), [])
+
+        # FIFO realizes only the 2 matched contracts; the old matcher booked all 3
+        self.assertAlmostEqual(book.closes[0]["realized_pnl"], 150.0)
+        self.assertAlmostEqual(legacy_closes(trades)[0][0], 225.0)
+
+        # The excess contract does not open a long that later opens could offset
+        book.apply([trade("SELL_TO_OPEN", 1, 0.80, "2026-02-09")])
+        self.assertEqual(book.open_positions()[0]["net_quantity"], 1)
+
+    def test_fifo_uses_consumed_lot_premiums(self):
+        # Documented change: the old matcher priced every close off the first open
+        trades = [
+            trade("SELL_TO_OPEN", 1, 1.00, "2026-02-02"),
+            trade("SELL_TO_OPEN", 1, 3.00, "2026-02-03"),
+            trade("BUY_TO_CLOSE", 2, 0.50, "2026-02-10"),
+        ]
+        book = PositionBook(trades)
+        self.assertAlmostEqual(book.closes[0]["realized_pnl"], 300.0)
+        self.assertAlmostEqual(book.closes[0]["entry_premium"], 2.0)
+        self.assertAlmostEqual(legacy_closes(trades)[0][0], 100.0)
+
+
+class TestIncrementalApply(unittest.TestCase):
+    """apply() on a journal tail must match replaying the whole ledger."""
+
+    def assert_same_book(self, book, rebuilt):
+        self.assertEqual(book.events_applied, rebuilt.events_applied)
+        self.assertEqual(book.open_positions(), rebuilt.open_positions())
+        self.assertEqual(book.pnl_summary(), rebuilt.pnl_summary())
+
+    def test_apply_tail_matches_rebuild(self):
+        events = synthetic_ledger(2000)
+        rng = random.Random(3)
+        for split in [0, 1, 999, 1999, 2000] + rng.sample(range(2000), 5):
+            with self.subTest(split=split):
+                book = PositionBook(events[:split]).apply(events[split:])
+                self.assert_same_book(book, PositionBook(events))
+
+    def test_apply_in_batches_matches_rebuild(self):
+        events = synthetic_ledger(1000, seed=11)
+        book = PositionBook()
+        for start in range(0, len(events), 37):
+            book.apply(events[start:start + 37])
+        self.assert_same_book(book, PositionBook(events))
+
+    def test_get_book_applies_journal_tail(self):
+        events = synthetic_ledger(500, seed=5)
+        with tempfile.TemporaryDirectory() as tmp:
+            ledger = Path(tmp) / "trades.json"
+            ledger.write_text(json.dumps({"events": events[:400]}))
+            self.assertEqual(get_book(ledger).events_applied, 400)
+
+            with open(journal_path(ledger), "a") as f:
+                f.write(json.dumps(events[400:450]) + "\n")
+                for event in events[450:]:
+                    f.write(json.dumps(event) + "\n")
+            self.assert_same_book(get_book(ledger), PositionBook(events))
+
+
+if __name__ == "__main__":
+    unittest.main()
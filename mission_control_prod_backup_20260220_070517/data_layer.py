@@ -3,18 +3,24 @@ Mission Control Data Layer Module
 
 Provides structured data loading with validation for Mission Control dashboard.
 Supports JSON data sources with fallback to markdown files.
+
+Parsed and validated file contents are memoized on (path, mtime_ns, size);
+loaders return private copies, so callers may mutate what they get back.
 """
 
 import json
 import os
 import re
+import threading
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 from datetime import datetime
 
 # Try to import jsonschema for validation
 try:
-    from jsonschema import validate, ValidationError as JSONSchemaValidationError
+    from jsonschema import validate
+    from jsonschema.exceptions import best_match
+    from jsonschema.validators import validator_for
     HAS_JSONSCHEMA = True
 except ImportError:
     HAS_JSONSCHEMA = False
@@ -218,6 +224,20 @@ SCHEMAS = {
 # UTILITY FUNCTIONS
 # ============================================================================
 
+# Compiled validators: schema key -> validator (schema checked once)
+_validators: dict = {}
+
+
+def _compiled_validator(key: Any, schema: dict):
+    """Validator for schema, built and schema-checked once per key."""
+    validator = _validators.get(key)
+    if validator is None:
+        cls = validator_for(schema)
+        cls.check_schema(schema)
+        validator = _validators[key] = cls(schema)
+    return validator
+
+
 def _validate_data(data: Any, schema_name: str) -> tuple[bool, Optional[str]]:
     """
     Validate data against a schema.
@@ -233,12 +253,13 @@ def _validate_data(data: Any, schema_name: str) -> tuple[bool, Optional[str]]:
         return True, None  # No schema found, skip validation
     
     try:
-        validate(instance=data, schema=schema)
-        return True, None
-    except JSONSchemaValidationError as e:
-        return False, f"Validation error: {e.message} at {list(e.path)}"
+        # Same error jsonschema.validate() would raise, without rebuilding the validator
+        error = best_match(_compiled_validator(schema_name, schema).iter_errors(data))
     except Exception as e:
         return False, f"Unexpected validation error: {str(e)}"
+    if error is not None:
+        return False, f"Validation error: {error.message} at {list(error.path)}"
+    return True, None
 
 
 def _load_json_file(filepath: Path) -> tuple[Optional[Any], Optional[str]]:
@@ -269,6 +290,71 @@ def _load_json_file(filepath: Path) -> tuple[Optional[Any], Optional[str]]:
         return None, f"Error loading {filepath}: {str(e)}"
 
 
+# ============================================================================
+# LOADER CACHE
+# ============================================================================
+
+# (path, kind) -> (signature, result)
+_file_cache: dict = {}
+_file_cache_lock = threading.Lock()
+
+
+def _file_signature(filepath: Path) -> Optional[tuple]:
+    try:
+        st = filepath.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _copy_json(value: Any) -> Any:
+    """Copy of a JSON-shaped value (much cheaper than copy.deepcopy)."""
+    if isinstance(value, dict):
+        return {k: _copy_json(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy_json(v) for v in value]
+    if isinstance(value, tuple):
+        return tuple(_copy_json(v) for v in value)
+    return value
+
+
+def _cached_file(filepath: Path, kind: str, build: Callable[[Path], Any]) -> Any:
+    """
+    build(filepath), recomputed only when the file's mtime or size changes.
+    Returns a private copy of the result.
+    """
+    key = (str(filepath), kind)
+    signature = _file_signature(filepath)
+    with _file_cache_lock:
+        cached = _file_cache.get(key)
+    if cached is None or cached[0] != signature:
+        cached = (signature, build(filepath))
+        with _file_cache_lock:
+            _file_cache[key] = cached
+    return _copy_json(cached[1])
+
+
+def _load_validated(filepath: Path, schema_name: Optional[str] = None) -> tuple:
+    """
+    Cached (data, error, validation_error) for a JSON file; validation_error
+    is None when the data is valid or no schema_name is given.
+    """
+    def build(path):
+        data, error = _load_json_file(path)
+        validation_error = None
+        if data is not None and schema_name:
+            _, validation_error = _validate_data(data, schema_name)
+        return data, error, validation_error
+
+    return _cached_file(filepath, f"json:{schema_name}", build)
+
+
+def clear_loader_cache() -> None:
+    """Drop all memoized file contents."""
+    with _file_cache_lock:
+        _file_cache.clear()
+
+
 def _parse_markdown_holdings(md_content: str) -> dict:
     """
     Parse holdings data from unified_portfolio_tracker.md format.
@@ -433,11 +519,10 @@ def load_holdings(use_markdown_fallback: bool = True) -> dict:
     md_path = PORTFOLIO_DIR / "unified_portfolio_tracker.md"
     
     # Try JSON first
-    data, error = _load_json_file(json_path)
+    data, error, validation_error = _load_validated(json_path, "holdings")
     
     if data is not None:
-        is_valid, validation_error = _validate_data(data, "holdings")
-        if is_valid:
+        if validation_error is None:
             return data
         else:
             return {
@@ -449,9 +534,8 @@ def load_holdings(use_markdown_fallback: bool = True) -> dict:
     # Fallback to markdown
     if use_markdown_fallback and md_path.exists():
         try:
-            with open(md_path, 'r', encoding='utf-8') as f:
-                md_content = f.read()
-            data = _parse_markdown_holdings(md_content)
+            data = _cached_file(md_path, "holdings-md",
+                                lambda path: _parse_markdown_holdings(path.read_text(encoding='utf-8')))
             return {
                 **data,
                 "_warning": "Parsed from markdown (JSON not found)",
@@ -484,11 +568,11 @@ def load_analyses(use_markdown_fallback: bool = True) -> list:
     
     # Try individual JSON files in analyses/ directory
     if ANALYSES_DIR.exists():
+        # Per-file cache: only files whose mtime/size changed are re-parsed
         for json_file in sorted(ANALYSES_DIR.glob("*.json")):
-            data, error = _load_json_file(json_file)
+            data, error, validation_error = _load_validated(json_file, "analyses")
             if data is not None:
-                is_valid, validation_error = _validate_data(data, "analyses")
-                if is_valid:
+                if validation_error is None:
                     analyses.append({
                         **data,
                         "_source": str(json_file.name)
@@ -506,9 +590,8 @@ def load_analyses(use_markdown_fallback: bool = True) -> list:
         md_path = PORTFOLIO_DIR / "analysis_history.md"
         if md_path.exists():
             try:
-                with open(md_path, 'r', encoding='utf-8') as f:
-                    md_content = f.read()
-                analyses = _parse_markdown_analyses(md_content)
+                analyses = _cached_file(md_path, "analyses-md",
+                                        lambda path: _parse_markdown_analyses(path.read_text(encoding='utf-8')))
                 if analyses:
                     return {
                         "_analyses": analyses,
@@ -534,9 +617,11 @@ def load_arnings() -> list:
     _ensure_dirs()
     
     json_path = DATA_DIR / "earnings.json"
-    data, error = _load_json_file(json_path)
     
-    if data is not None:
+    def build(path):
+        data, error = _load_json_file(path)
+        if data is None:
+            return None, error
         # Handle both list and dict with 'earnings' key
         earnings = data if isinstance(data, list) else data.get('earnings', [])
         
@@ -544,7 +629,11 @@ def load_arnings() -> list:
             is_valid, validation_error = _validate_data(item, "earnings")
             if not is_valid:
                 item['_validation_error'] = validation_error
-        
+        return earnings, None
+    
+    earnings, error = _cached_file(json_path, "earnings", build)
+    
+    if earnings is not None:
         return earnings
     
     # Return empty list with error info
@@ -561,11 +650,10 @@ def load_schedule() -> dict:
     _ensure_dirs()
     
     json_path = DATA_DIR / "schedule.json"
-    data, error = _load_json_file(json_path)
+    data, error, validation_error = _load_validated(json_path, "schedule")
     
     if data is not None:
-        is_valid, validation_error = _validate_data(data, "schedule")
-        if is_valid:
+        if validation_error is None:
             return data
         else:
             return {
@@ -589,11 +677,10 @@ def load_ideas() -> dict:
     _ensure_dirs()
     
     json_path = DATA_DIR / "ideas.json"
-    data, error = _load_json_file(json_path)
+    data, error, validation_error = _load_validated(json_path, "ideas")
     
     if data is not None:
-        is_valid, validation_error = _validate_data(data, "ideas")
-        if is_valid:
+        if validation_error is None:
             return data
         else:
             return {
@@ -617,11 +704,10 @@ def load_corporate() -> dict:
     _ensure_dirs()
     
     json_path = DATA_DIR / "corporate.json"
-    data, error = _load_json_file(json_path)
+    data, error, validation_error = _load_validated(json_path, "corporate")
     
     if data is not None:
-        is_valid, validation_error = _validate_data(data, "corporate")
-        if is_valid:
+        if validation_error is None:
             return data
         else:
             return {
@@ -645,22 +731,31 @@ def load_api_usage() -> list:
     _ensure_dirs()
     
     json_path = DATA_DIR / "api_usage.json"
-    data, error = _load_json_file(json_path)
+    schema_path = SCHEMAS_DIR / "api_usage.schema.json"
+    schema_signature = _file_signature(schema_path)
     
-    if data is not None:
-        # Load schema for validation if available
-        schema_path = SCHEMAS_DIR / "api_usage.schema.json"
-        if HAS_JSONSCHEMA and schema_path.exists():
+    def build(path):
+        data, error = _load_json_file(path)
+        # Validate against the schema file if available
+        if data is not None and HAS_JSONSCHEMA and schema_signature is not None:
             try:
                 with open(schema_path, 'r', encoding='utf-8') as f:
                     schema = json.load(f)
-                validate(instance=data, schema=schema)
+                validator = _compiled_validator((str(schema_path), schema_signature), schema)
+                error_found = best_match(validator.iter_errors(data))
+                if error_found is not None:
+                    raise error_found
             except Exception as e:
                 # Don't fail on validation error, just add warning
                 if isinstance(data, list):
                     for item in data:
                         item['_validation_warning'] = f"Schema validation: {str(e)}"
-        
+        return data, error
+    
+    # Re-validated when either the data or the schema file changes
+    data, error = _cached_file(json_path, f"api_usage:{schema_signature}", build)
+    
+    if data is not None:
         return data
     
     # Return empty list with error info
@@ -677,7 +772,7 @@ def load_team() -> dict:
     _ensure_dirs()
     
     json_path = DATA_DIR / "corporate.json"
-    data, error = _load_json_file(json_path)
+    data, error, _ = _load_validated(json_path)
     
     if data is not None:
         # Build hierarchy
@@ -866,7 +961,83 @@ def get_open_positions(trades):
     """Get open positions from trades"""
     return [t for t in trades if t.get("status") == "OPEN"]
 
+def benchmark_loaders(analysis_files: int = 500, rounds: int = 20) -> dict:
+    """
+    Per-request cost (ms) of loading holdings.json and an analyses directory
+    of analysis_files files in a temp portfolio:
+    - uncompiled: parse + jsonschema.validate() (rebuilds the validator each call)
+    - compiled:   parse + compiled validator
+    - cached:     loader with the mtime cache warm (no parse, no validation)
+    """
+    import tempfile
+    import time
+    
+    global PORTFOLIO_DIR, DATA_DIR, SCHEMAS_DIR, ANALYSES_DIR
+    saved = (PORTFOLIO_DIR, DATA_DIR, SCHEMAS_DIR, ANALYSES_DIR)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        PORTFOLIO_DIR = Path(tmp)
+        DATA_DIR = PORTFOLIO_DIR / "data"
+        SCHEMAS_DIR = PORTFOLIO_DIR / "schemas"
+        ANALYSES_DIR = PORTFOLIO_DIR / "analyses"
+        try:
+            _ensure_dirs()
+            accounts = [{
+                "name": f"Account {i}", "type": "brokerage", "broker": "Schwab", "cash": 1000.0,
+                "holdings": [{"ticker": f"T{j}", "shares": j + 1, "cost_basis": 100.0 * j} for j in range(60)],
+                "options": [{"ticker": f"T{j}", "type": "PUT", "strike": 50.0, "expiration": "2026-12-18",
+                             "contracts": 1, "premium": 1.5} for j in range(10)]
+            } for i in range(6)]
+            with open(DATA_DIR / "holdings.json", 'w') as f:
+                json.dump({"accounts": accounts}, f)
+            for i in range(analysis_files):
+                with open(ANALYSES_DIR / f"T{i}.json", 'w') as f:
+                    json.dump({"ticker": f"T{i}", "date": "2026-02-01", "grade": "B", "summary": "x" * 200,
+                               "content": "y" * 4000, "price_target": 100.0,
+                               "scenarios": [{"name": "base", "probability": 0.5, "target": "100", "return": "5%"}]}, f)
+            
+            files = [(DATA_DIR / "holdings.json", "holdings")] + \
+                [(p, "analyses") for p in sorted(ANALYSES_DIR.glob("*.json"))]
+            
+            def per_request(fn):
+                started = time.perf_counter()
+                for _ in range(rounds):
+                    fn()
+                return round((time.perf_counter() - started) / rounds * 1000, 2)
+            
+            def uncompiled():
+                for path, name in files:
+                    data, _ = _load_json_file(path)
+                    validate(instance=data, schema=SCHEMAS[name])
+            
+            def compiled():
+                for path, name in files:
+                    data, _ = _load_json_file(path)
+                    _validate_data(data, name)
+            
+            def cached():
+                load_holdings()
+                load_analyses()
+            
+            clear_loader_cache()
+            cached()  # warm
+            return {
+                "files": len(files),
+                "uncompiled_ms": per_request(uncompiled),
+                "compiled_ms": per_request(compiled),
+                "cached_ms": per_request(cached)
+            }
+        finally:
+            PORTFOLIO_DIR, DATA_DIR, SCHEMAS_DIR, ANALYSES_DIR = saved
+            clear_loader_cache()
+
+
 if __name__ == "__main__":
+    import sys
+    if "--benchmark" in sys.argv:
+        print(json.dumps(benchmark_loaders(), indent=2))
+        sys.exit(0)
+    
     print("=" * 60)
     print("Mission Control Data Layer - Test Suite")
     print("=" * 60)
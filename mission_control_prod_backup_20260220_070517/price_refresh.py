@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Concurrent price refresh for Mission Control.
+
+Stock quotes are fetched in parallel with a concurrency cap per provider
+(Finnhub, Yahoo Finance for mutual funds); all crypto comes from a single
+batched CoinGecko call. Results are merged into the price cache file as
+they arrive, so refresh latency is bounded by the slowest quote rather
+than the sum of all of them.
+
+PriceRefresher runs refreshes on a background thread on a market-hours
+schedule and publishes changed prices to subscribers (the server's
+Server-Sent Events stream).
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+# Max in-flight requests per provider (Finnhub allows 30 calls/second)
+PROVIDER_CONCURRENCY = {
+    'finnhub': 30,
+    'yahoo_finance': 4,
+}
+
+# Yahoo Finance for these (Finnhub has no mutual fund quotes)
+MUTUAL_FUNDS = ['VSEQX', 'VTCLX', 'VTMSX', 'VIG', 'VYM', 'VXUS']
+
+COINGECKO_IDS = {'ETH': 'ethereum', 'BTC': 'bitcoin', 'SOL': 'solana'}
+
+# Minimum seconds between partial writes of the price file
+PARTIAL_WRITE_INTERVAL = 0.5
+
+# Background refresh interval (seconds) by US market session
+MARKET_TZ = ZoneInfo('America/New_York')
+REFRESH_INTERVALS = {
+    'regular': 60,       # 9:30-16:00 ET, weekdays
+    'extended': 300,     # 4:00-9:30 and 16:00-20:00 ET, weekdays
+    'closed': 1800,      # nights and weekends (crypto still moves)
+}
+
+
+# ============================================================================
+# PROVIDERS
+# ============================================================================
+
+def fetch_finnhub_price(ticker, token, timeout=5):
+    """Fetch stock price from Finnhub"""
+    try:
+        import requests
+        url = f'https://finnhub.io/api/v1/quote?symbol={ticker}&token={token}'
+        resp = requests.get(url, timeout=timeout)
+        if resp.status_code == 200:
+            return resp.json().get('c', 0) or 0
+    except Exception as e:
+        print(f"Finnhub error for {ticker}: {e}")
+    return 0
+
+
+def fetch_yahoo_price(ticker):
+    """Fetch mutual fund price from Yahoo Finance"""
+    try:
+        url = f'https://query1.finance.yahoo.com/v8/finance/chart/{ticker}'
+        req = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0'})
+        with urllib.request.urlopen(req, timeout=10) as response:
+            data = json.loads(response.read().decode())
+            result = data.get('chart', {}).get('result', [{}])[0]
+            return result.get('meta', {}).get('regularMarketPrice', 0)
+    except Exception as e:
+        print(f"Yahoo error for {ticker}: {e}")
+        return 0
+
+
+def fetch_coingecko_prices(assets):
+    """Fetch prices for many crypto assets in one CoinGecko call: {asset: usd}"""
+    ids = {asset: COINGECKO_IDS.get(asset, asset.lower()) for asset in assets}
+    if not ids:
+        return {}
+    try:
+        query = urllib.parse.urlencode({'ids': ','.join(sorted(set(ids.values()))), 'vs_currencies': 'usd'})
+        url = f'https://api.coingecko.com/api/v3/simple/price?{query}'
+        req = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0'})
+        with urllib.request.urlopen(req, timeout=10) as response:
+            data = json.loads(response.read().decode())
+        return {asset: data.get(asset_id, {}).get('usd', 0) for asset, asset_id in ids.items()}
+    except Exception as e:
+        print(f"CoinGecko error for {sorted(ids)}: {e}")
+        return {}
+
+
+def fetch_coingecko_price(asset):
+    """Fetch crypto price from CoinGecko"""
+    return fetch_coingecko_prices([asset]).get(asset, 0)
+
+
+# ============================================================================
+# REFRESH ENGINE
+# ============================================================================
+
+def _write_price_file(price_file, prices):
+    """Atomic replace so readers never see a half-written cache."""
+    tmp = f"{price_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(prices, f, indent=2)
+    os.replace(tmp, price_file)
+
+
+def _load_price_file(price_file):
+    try:
+        with open(price_file, 'r') as f:
+            data = json.load(f)
+        if isinstance(data.get('prices'), dict):
+            return data
+    except (OSError, ValueError, AttributeError):
+        pass
+    return {'version': '2.0', 'prices': {}}
+
+
+def _stamp(prices):
+    """Set the file-level last_updated to the oldest held price's, so failing symbols show as stale."""
+    stamps = [entry.get('last_updated') for entry in prices['prices'].values() if entry.get('last_updated')]
+    if stamps:
+        prices['last_updated'] = min(stamps)
+
+
+def refresh_prices(stock_tickers: Iterable[str], misc_assets: Iterable[str], price_file: str,
+                   finnhub_key: str, on_price: Optional[Callable[[str, Dict], None]] = None) -> Dict:
+    """
+    Refresh stock and crypto prices concurrently into price_file.
+
+    Symbols no longer held are dropped. Symbols that fail to refresh keep
+    their previous price, marked 'stale': True with its original
+    last_updated; the file-level last_updated is the oldest held price's
+    (see _stamp). The file is rewritten (atomically, at most every
+    PARTIAL_WRITE_INTERVAL seconds) as results arrive, then once more at
+    the end. on_price(symbol, entry) is called for each refreshed price.
+
+    Returns {'prices': written cache dict, 'updated': {symbol: entry}}
+    """
+    stock_tickers = [t for t in stock_tickers if t]
+    misc_assets = list(misc_assets)
+    held = set(stock_tickers) | set(misc_assets)
+
+    previous = _load_price_file(price_file)
+    prices = {
+        'version': '2.0',
+        'prices': {symbol: {**entry, 'stale': True}
+                   for symbol, entry in previous['prices'].items() if symbol in held}
+    }
+    if previous.get('last_updated'):
+        prices['last_updated'] = previous['last_updated']
+    updated = {}
+    lock = threading.Lock()
+    last_write = [0.0]
+
+    def record(symbol, price, source):
+        if not price or price <= 0:
+            return
+        entry = {'price': price, 'source': source, 'last_updated': datetime.now().isoformat()}
+        with lock:
+            prices['prices'][symbol] = entry
+            updated[symbol] = entry
+            if time.monotonic() - last_write[0] >= PARTIAL_WRITE_INTERVAL:
+                _stamp(prices)
+                _write_price_file(price_file, prices)
+                last_write[0] = time.monotonic()
+        if on_price:
+            on_price(symbol, entry)
+
+    semaphores = {name: threading.Semaphore(n) for name, n in PROVIDER_CONCURRENCY.items()}
+
+    def fetch_stock(ticker):
+        source = 'yahoo_finance' if ticker in MUTUAL_FUNDS else 'finnhub'
+        with semaphores[source]:
+            if source == 'yahoo_finance':
+                price = fetch_yahoo_price(ticker)
+            else:
+                price = fetch_finnhub_price(ticker, finnhub_key)
+        record(ticker, price, source)
+
+    def fetch_crypto(assets):
+        for asset, price in fetch_coingecko_prices(assets).items():
+            record(asset, price, 'coingecko')
+
+    workers = min(sum(PROVIDER_CONCURRENCY.values()), len(stock_tickers)) + 1
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='price-refresh') as pool:
+        futures = {pool.submit(fetch_stock, t): t for t in stock_tickers}
+        if misc_assets:
+            futures[pool.submit(fetch_crypto, misc_assets)] = 'coingecko'
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                print(f"Error fetching {futures[future]}: {e}")
+
+    with lock:
+        _stamp(prices)
+        _write_price_file(price_file, prices)
+    return {'prices': prices, 'updated': updated}
+
+
+# ============================================================================
+# BACKGROUND REFRESHER
+# ============================================================================
+
+def market_session(now: Optional[datetime] = None) -> str:
+    """'regular', 'extended' or 'closed' for US equities (holidays not modelled)."""
+    now = (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ)
+    if now.weekday() >= 5:
+        return 'closed'
+    minutes = now.hour * 60 + now.minute
+    if 9 * 60 + 30 <= minutes < 16 * 60:
+        return 'regular'
+    if 4 * 60 <= minutes < 20 * 60:
+        return 'extended'
+    return 'closed'
+
+
+class PriceRefresher:
+    """
+    Background thread that refreshes prices on a market-hours schedule.
+
+    symbols_fn() returns (stock_tickers, misc_assets) from current holdings.
+    Subscribers get ('price', {symbol, price, source, last_updated}) for each
+    price that changed and ('refresh', summary) after every cycle; on_cycle
+    (if given) runs after each cycle, before subscribers are told.
+    """
+
+    def __init__(self, symbols_fn: Callable[[], Tuple[Iterable[str], Iterable[str]]], price_file: str,
+                 finnhub_key: str, on_cycle: Optional[Callable[[Dict], None]] = None):
+        self.symbols_fn = symbols_fn
+        self.price_file = price_file
+        self.finnhub_key = finnhub_key
+        self.on_cycle = on_cycle
+        self.last_result: Optional[Dict] = None
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._cycle_done = threading.Condition()
+        self._started = 0    # cycles begun
+        self._cycles = 0     # cycles finished
+        self._thread = None
+        self._sync_lock = threading.Lock()  # one on-demand cycle at a time when not running
+
+    # -- subscribers ---------------------------------------------------------
+
+    def subscribe(self) -> 'queue.Queue':
+        q = queue.Queue(maxsize=500)
+        with self._lock:
+            self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q) -> None:
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def publish(self, event: str, data: Dict) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait((event, data))
+            except queue.Full:
+                pass  # slow client; it resyncs from the next 'refresh' event
+
+    # -- lifecycle -----------------------------------------------------------
+
+    def start(self) -> 'PriceRefresher':
+        if not self.running():
+            self._thread = threading.Thread(target=self._run, name='price-refresher', daemon=True)
+            self._thread.start()
+        return self
+
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def refresh_now(self, timeout: float = 60) -> Optional[Dict]:
+        """
+        Wake the refresher and wait for a cycle started after this call to
+        finish. If the background thread was never started (e.g.
+        MC_BACKGROUND_REFRESH=0), run one cycle here instead of starting it.
+        """
+        if not self.running():
+            with self._sync_lock:
+                return self.run_cycle()
+
+        with self._cycle_done:
+            target = self._started + 1
+        self._wake.set()
+        with self._cycle_done:
+            if not self._cycle_done.wait_for(lambda: self._cycles >= target, timeout=timeout):
+                return None
+        return self.last_result
+
+    def _run(self) -> None:
+        while True:
+            self._wake.clear()
+            with self._cycle_done:
+                self._started += 1
+            try:
+                self.run_cycle()
+            except Exception as e:
+                print(f"Price refresher error: {e}")
+            with self._cycle_done:
+                self._cycles += 1
+                self._cycle_done.notify_all()
+            self._wake.wait(REFRESH_INTERVALS[market_session()])
+
+    def run_cycle(self) -> Dict:
+        stock_tickers, misc_assets = self.symbols_fn()
+        previous = _load_price_file(self.price_file)['prices']
+
+        def on_price(symbol, entry):
+            if previous.get(symbol, {}).get('price') != entry['price']:
+                self.publish('price', {'symbol': symbol, **entry})
+
+        started = time.monotonic()
+        result = refresh_prices(stock_tickers, misc_assets, self.price_file, self.finnhub_key, on_price=on_price)
+        summary = {
+            'session': market_session(),
+            'prices_updated': len(result['updated']),
+            'seconds': round(time.monotonic() - started, 2),
+            'last_updated': result['prices'].get('last_updated')
+        }
+        self.last_result = {**result, 'summary': summary}
+        if self.on_cycle:
+            self.on_cycle(self.last_result)
+        self.publish('refresh', summary)
+        return self.last_result
@@ -4,12 +4,15 @@ Mission Control v3.0 - Portfolio Dashboard with JSON Data Layer
 Uses clean JSON data sources with schema validation
 """
 
+import atexit
 import os
 import sys
 import json
+import queue
+import threading
 from datetime import datetime, timedelta
 from pathlib import Path
-from flask import Flask, jsonify, render_template, request
+from flask import Flask, Response, jsonify, render_template, request
 
 # Add mission_control to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -23,10 +26,26 @@ except ImportError as e:
     USE_DATA_LAYER = False
     print(f"⚠️ Data layer not available ({e}), using fallback")
 
+# Provider fetchers live in price_refresh (re-exported for existing importers)
+from price_refresh import fetch_yahoo_price, fetch_coingecko_price
+from price_refresh import PriceRefresher
+
 app = Flask(__name__)
 
 # Configuration
 WORKSPACE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Shared workspace libraries (performance rollups + cache)
+sys.path.insert(0, WORKSPACE)
+from lib import performance_rollups
+from lib.performanceCache import (
+    generate_cache_key, get_or_compute, get_performance_cache_stats, has_unsaved_changes,
+    load_performance_cache_from_file, save_performance_cache_to_file
+)
+
+load_performance_cache_from_file()
+# Background revalidations finishing after the last request still get persisted
+atexit.register(save_performance_cache_to_file)
 DATA_FILE = os.path.join(WORKSPACE, 'portfolio', 'data', 'holdings.json')
 ANALYSES_DIR = os.path.join(WORKSPACE, 'portfolio', 'data', 'analyses')
 PRICE_FILE = os.path.join(WORKSPACE, 'portfolio', 'price_cache.json')
@@ -221,15 +240,37 @@ def transform_holdings_for_dashboard(data):
         'last_price_refresh': data.get('last_updated', datetime.now().isoformat())
     }
 
+# Transformed /api/portfolio payload, keyed by the source files' signatures
+_portfolio_cache = {'signature': None, 'payload': None}
+_portfolio_lock = threading.Lock()
+
+
+def _file_signature(path):
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+
+def get_portfolio_payload():
+    """Dashboard portfolio, rebuilt only when holdings or the price cache change"""
+    signature = tuple(_file_signature(p) for p in (DATA_FILE, MD_DATA_FILE, PRICE_FILE))
+    with _portfolio_lock:
+        if _portfolio_cache['signature'] != signature:
+            data = load_holdings(use_markdown_fallback=True)
+            # Transform to dashboard format
+            _portfolio_cache['payload'] = transform_holdings_for_dashboard(data)
+            _portfolio_cache['signature'] = signature
+        return _portfolio_cache['payload']
+
+
 @app.route('/api/portfolio')
 def api_portfolio():
     """Return complete portfolio data for Holdings tab"""
     try:
         if USE_DATA_LAYER:
-            data = load_holdings(use_markdown_fallback=True)
-            # Transform to dashboard format
-            transformed = transform_holdings_for_dashboard(data)
-            return jsonify(transformed)
+            return jsonify(get_portfolio_payload())
         else:
             # Fallback to old parsing
             return jsonify({'error': 'Data layer not available'}), 500
@@ -237,118 +278,77 @@ def api_portfolio():
         import traceback
         return jsonify({'error': str(e), 'traceback': traceback.format_exc()}), 500
 
-def fetch_yahoo_price(ticker):
-    """Fetch mutual fund price from Yahoo Finance"""
-    try:
-        import urllib.request
-        url = f'https://query1.finance.yahoo.com/v8/finance/chart/{ticker}'
-        req = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0'})
-        with urllib.request.urlopen(req, timeout=10) as response:
-            data = json.loads(response.read().decode())
-            result = data.get('chart', {}).get('result', [{}])[0]
-            return result.get('meta', {}).get('regularMarketPrice', 0)
-    except Exception as e:
-        print(f"Yahoo error for {ticker}: {e}")
-        return 0
 
-def fetch_coingecko_price(asset):
-    """Fetch crypto price from CoinGecko"""
+def holdings_symbols():
+    """(stock tickers, misc assets) to price, from current holdings"""
+    data = load_holdings(use_markdown_fallback=True)
+    stock_tickers = set()
+    misc_assets = set()
+    
+    for account in data.get('accounts', []):
+        for stock in account.get('stocks_etfs', []):
+            ticker = stock.get('Ticker', '')
+            if ticker and ticker not in ['SGOV', 'Cash']:
+                stock_tickers.add(ticker)
+        for misc in account.get('misc', []):
+            asset = misc.get('Asset', '')
+            if asset:
+                misc_assets.add(asset)
+    stock_tickers.add('SGOV')
+    return stock_tickers, misc_assets
+
+
+def _warm_portfolio(result):
+    """Rebuild the portfolio payload right after each background refresh"""
     try:
-        import urllib.request
-        asset_map = {'ETH': 'ethereum', 'BTC': 'bitcoin', 'SOL': 'solana'}
-        asset_id = asset_map.get(asset, asset.lower())
-        url = f'https://api.coingecko.com/api/v3/simple/price?ids={asset_id}&vs_currencies=usd'
-        req = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0'})
-        with urllib.request.urlopen(req, timeout=10) as response:
-            data = json.loads(response.read().decode())
-            return data.get(asset_id, {}).get('usd', 0)
+        get_portfolio_payload()
     except Exception as e:
-        print(f"CoinGecko error for {asset}: {e}")
-        return 0
+        print(f"Portfolio warm-up failed: {e}")
+
+
+# Background refresher: started from __main__ unless MC_BACKGROUND_REFRESH=0
+# (/api/refresh-prices then runs one cycle synchronously)
+price_refresher = PriceRefresher(holdings_symbols, PRICE_FILE, FINNHUB_KEY, on_cycle=_warm_portfolio)
 
 @app.route('/api/refresh-prices', methods=['POST'])
 def refresh_prices():
-    """Refresh all prices from APIs"""
+    """Run a refresh cycle now and wait for it (see price_refresh.py)"""
     try:
-        import requests
-        
-        # Get all tickers and misc assets from holdings
-        data = load_holdings(use_markdown_fallback=True)
-        stock_tickers = set()
-        misc_assets = set()
-        
-        for account in data.get('accounts', []):
-            for stock in account.get('stocks_etfs', []):
-                ticker = stock.get('Ticker', '')
-                if ticker and ticker not in ['SGOV', 'Cash']:
-                    stock_tickers.add(ticker)
-            for misc in account.get('misc', []):
-                asset = misc.get('Asset', '')
-                if asset:
-                    misc_assets.add(asset)
-        stock_tickers.add('SGOV')
-        
-        prices = {'version': '2.0', 'last_updated': datetime.now().isoformat(), 'prices': {}}
-        
-        # Fetch stock prices (Finnhub for most, Yahoo for mutual funds)
-        mutual_funds = ['VSEQX', 'VTCLX', 'VTMSX', 'VIG', 'VYM', 'VXUS']
-        
-        for ticker in stock_tickers:
-            if not ticker:
-                continue
-            try:
-                if ticker in mutual_funds:
-                    # Use Yahoo Finance for mutual funds
-                    price = fetch_yahoo_price(ticker)
-                    source = 'yahoo_finance'
-                else:
-                    # Use Finnhub for regular stocks
-                    url = f'https://finnhub.io/api/v1/quote?symbol={ticker}&token={FINNHUB_KEY}'
-                    resp = requests.get(url, timeout=5)
-                    price = 0
-                    if resp.status_code == 200:
-                        data = resp.json()
-                        price = data.get('c', 0)
-                    source = 'finnhub'
-                
-                if price > 0:
-                    prices['prices'][ticker] = {
-                        'price': price,
-                        'source': source,
-                        'last_updated': datetime.now().isoformat()
-                    }
-            except Exception as e:
-                print(f"Error fetching {ticker}: {e}")
-                continue
-        
-        # Fetch crypto prices from CoinGecko
-        for asset in misc_assets:
-            try:
-                price = fetch_coingecko_price(asset)
-                if price > 0:
-                    prices['prices'][asset] = {
-                        'price': price,
-                        'source': 'coingecko',
-                        'last_updated': datetime.now().isoformat()
-                    }
-            except Exception as e:
-                print(f"Error fetching {asset}: {e}")
-                continue
-        
-        # Save to cache
-        with open(PRICE_FILE, 'w') as f:
-            json.dump(prices, f, indent=2)
+        result = price_refresher.refresh_now()
+        if result is None:
+            return jsonify({'success': False, 'error': 'Price refresh did not complete'}), 504
+        updated = result['updated']
         
         return jsonify({
             'success': True, 
-            'prices_updated': len(prices['prices']),
-            'stocks': len([p for p in prices['prices'].values() if p.get('source') != 'coingecko']),
-            'crypto': len([p for p in prices['prices'].values() if p.get('source') == 'coingecko'])
+            'prices_updated': len(updated),
+            'stocks': len([p for p in updated.values() if p.get('source') != 'coingecko']),
+            'crypto': len([p for p in updated.values() if p.get('source') == 'coingecko'])
         })
     except Exception as e:
         import traceback
         return jsonify({'success': False, 'error': str(e), 'traceback': traceback.format_exc()}), 500
 
+@app.route('/api/prices/stream')
+def api_prices_stream():
+    """Server-Sent Events: 'price' for each changed price, 'refresh' after each cycle"""
+    def stream():
+        q = price_refresher.subscribe()
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    event, data = q.get(timeout=15)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                yield f'event: {event}\ndata: {json.dumps(data)}\n\n'
+        finally:
+            price_refresher.unsubscribe(q)
+    
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/analysis-archive')
 def api_analysis_archive():
     """Return stock analysis archive for Analysis Archive tab"""
@@ -574,32 +574,25 @@ def api_trades_performance_v2():
     Performance v2 - Canonical context model for trading performance.
     
     Query params:
-        context: lifetime | daily | monthly | yearly
+        context: lifetime | daily | weekly | monthly | yearly | custom
+        start, end: YYYY-MM-DD (custom only)
+        
+    Answered from daily per-ticker rollups (lib/performance_rollups), cached
+    per context in lib/performanceCache (stats: /api/performance-cache/stats).
         
     Returns:
         - summary: totalRealizedPl, winRate, totalTrades
         - tickerBreakdown: per-ticker realized P/L, wins, losses, winRate
     """
     try:
-        from datetime import datetime, date
-        import json
+        from datetime import date
         
         # Parse context parameter
         context = request.args.get('context', 'lifetime').lower()
-        valid_contexts = ['lifetime', 'daily', 'monthly', 'yearly']
+        valid_contexts = ['lifetime', 'daily', 'weekly', 'monthly', 'yearly', 'custom']
         if context not in valid_contexts:
             return jsonify({'error': f'Invalid context. Use: {", ".join(valid_contexts)}'}), 400
         
-        # Load trades
-        trades_file = os.path.join(WORKSPACE, 'data', 'trades.json')
-        if not os.path.exists(trades_file):
-            return jsonify({'context': context, 'summary': {}, 'tickerBreakdown': []})
-        
-        with open(trades_file, 'r') as f:
-            trades_data = json.load(f)
-        
-        all_trades = trades_data.get('trades', [])
-        
         # Determine date range based on context
         today = date.today()
         start_date = None
@@ -608,6 +601,9 @@ def api_trades_performance_v2():
         if context == 'daily':
             start_date = today
             end_date = today
+        elif context == 'weekly':
+            start_date = today - timedelta(days=today.weekday())
+            end_date = start_date + timedelta(days=6)
         elif context == 'monthly':
             start_date = today.replace(day=1)
             # Last day of month
@@ -618,96 +614,78 @@ def api_trades_performance_v2():
         elif context == 'yearly':
             start_date = today.replace(month=1, day=1)
             end_date = today.replace(month=12, day=31)
+        elif context == 'custom':
+            try:
+                start_date = date.fromisoformat(request.args.get('start', ''))
+                end_date = date.fromisoformat(request.args.get('end', ''))
+            except ValueError:
+                return jsonify({'error': 'Custom context needs start and end as YYYY-MM-DD'}), 400
         # lifetime: no date filter
         
-        # Filter trades by date
-        filtered_trades = []
-        for trade in all_trades:
-            trade_date_str = trade.get('date') or trade.get('timestamp', '')[:10]
-            try:
-                trade_date = datetime.strptime(trade_date_str, '%Y-%m-%d').date()
-                
-                if start_date and end_date:
-                    if not (start_date <= trade_date <= end_date):
-                        continue
-                elif start_date and trade_date < start_date:
-                    continue
-                    
-                filtered_trades.append(trade)
-            except (ValueError, TypeError):
-                # If date parsing fails, include the trade (default to lifetime behavior)
-                filtered_trades.append(trade)
+        date_range = {
+            'start': start_date.isoformat() if start_date else None,
+            'end': end_date.isoformat() if end_date else None
+        }
         
-        # Aggregate: Group by ticker
-        ticker_stats = {}
-        for trade in filtered_trades:
-            ticker = trade.get('ticker', 'UNKNOWN')
-            if ticker not in ticker_stats:
-                ticker_stats[ticker] = {
-                    'ticker': ticker,
-                    'realizedPl': 0.0,
-                    'wins': 0,
-                    'losses': 0,
-                    'total': 0
-                }
+        # Pick up newly saved trades (invalidates only the affected cache keys)
+        trades_file = os.path.join(WORKSPACE, 'data', 'trades.json')
+        performance_rollups.refresh(trades_file)
+        
+        cache_key = generate_cache_key(context, date_range['start'], date_range['end'])
+        
+        def compute():
+            # Aggregate: sum pre-bucketed days in range
+            ticker_stats, total_trades = performance_rollups.ticker_stats(start_date, end_date)
             
-            # Get trade P/L (prefer realized_pnl, fall back to premium for CSP logic)
-            pnl = trade.get('realized_pnl')
-            if pnl is None:
-                # For CSP: premium collected = credit, loss = assignment
-                # Use premium as the base P/L indicator
-                pnl = trade.get('premium', 0) or 0
+            # Calculate totals
+            total_realized_pl = sum(t.get('realizedPl', 0) for t in ticker_stats.values())
+            total_wins = sum(t.get('wins', 0) for t in ticker_stats.values())
             
-            ticker_stats[ticker]['realizedPl'] += pnl
-            ticker_stats[ticker]['total'] += 1
+            win_rate = round((total_wins / total_trades * 100), 2) if total_trades > 0 else 0.0
             
-            if pnl > 0:
-                ticker_stats[ticker]['wins'] += 1
-            elif pnl < 0:
-                ticker_stats[ticker]['losses'] += 1
-            # pnl == 0 is neither win nor loss
-        
-        # Calculate totals
-        total_realized_pl = sum(t.get('realizedPl', 0) for t in ticker_stats.values())
-        total_trades = len(filtered_trades)
-        total_wins = sum(t.get('wins', 0) for t in ticker_stats.values())
-        total_losses = sum(t.get('losses', 0) for t in ticker_stats.values())
-        
-        win_rate = round((total_wins / total_trades * 100), 2) if total_trades > 0 else 0.0
-        
-        # Build ticker breakdown with winRate
-        ticker_breakdown = []
-        for ticker, stats in ticker_stats.items():
-            ticker_win_rate = round((stats['wins'] / stats['total'] * 100), 2) if stats['total'] > 0 else 0.0
-            ticker_breakdown.append({
-                'ticker': ticker,
-                'realizedPl': round(stats['realizedPl'], 2),
-                'wins': stats['wins'],
-                'losses': stats['losses'],
-                'winRate': ticker_win_rate
-            })
-        
-        # Sort by realizedPl descending
-        ticker_breakdown.sort(key=lambda x: x['realizedPl'], reverse=True)
+            # Build ticker breakdown with winRate
+            ticker_breakdown = []
+            for ticker, stats in ticker_stats.items():
+                ticker_win_rate = round((stats['wins'] / stats['total'] * 100), 2) if stats['total'] > 0 else 0.0
+                ticker_breakdown.append({
+                    'ticker': ticker,
+                    'realizedPl': round(stats['realizedPl'], 2),
+                    'wins': stats['wins'],
+                    'losses': stats['losses'],
+                    'winRate': ticker_win_rate
+                })
+            
+            # Sort by realizedPl descending
+            ticker_breakdown.sort(key=lambda x: x['realizedPl'], reverse=True)
+            
+            return {
+                'context': context,
+                'dateRange': date_range,
+                'summary': {
+                    'totalRealizedPl': round(total_realized_pl, 2),
+                    'winRate': win_rate,
+                    'totalTrades': total_trades
+                },
+                'tickerBreakdown': ticker_breakdown
+            }
         
-        return jsonify({
-            'context': context,
-            'dateRange': {
-                'start': start_date.isoformat() if start_date else None,
-                'end': end_date.isoformat() if end_date else None
-            },
-            'summary': {
-                'totalRealizedPl': round(total_realized_pl, 2),
-                'winRate': win_rate,
-                'totalTrades': total_trades
-            },
-            'tickerBreakdown': ticker_breakdown
-        })
+        # Stale entries are served while recomputing in the background; relative
+        # keys (daily, weekly, yearly) roll over with the calendar
+        result = get_or_compute(cache_key, compute,
+                                is_valid=lambda data: data.get('dateRange') == date_range)
+        if has_unsaved_changes():  # cache hits leave nothing to persist
+            save_performance_cache_to_file()
+        return jsonify(result)
         
     except Exception as e:
         import traceback
         return jsonify({'error': str(e), 'trace': traceback.format_exc()}), 500
 
+@app.route('/api/performance-cache/stats')
+def api_performance_cache_stats():
+    """Hit/miss/eviction counters for the performance-v2 cache"""
+    return jsonify(get_performance_cache_stats())
+
 @app.route('/api/research/results')
 def api_research_results():
     """Return research calibration data"""
@@ -734,4 +712,6 @@ def corporate_test():
 if __name__ == '__main__':
     import sys
     port = int(sys.argv[1]) if len(sys.argv) > 1 else 8080
+    if os.environ.get('MC_BACKGROUND_REFRESH', '1') != '0':
+        price_refresher.start()
     app.run(host='0.0.0.0', port=port, debug=False, threaded=True)
@@ -7,25 +7,33 @@ Must be called from run_pipeline.py with Schwab token in environment.
 
 import json
 import sys
+import time
 from pathlib import Path
 
 # Add core to path
 sys.path.insert(0, str(Path(__file__).resolve().parent / "core"))
 
 from analysis_engine import analyze_batch
+import price_store
 
 
-def main():
+def main(data=None):
+    """
+    Enrich the research candidates in analysis_raw.json (or the in-memory
+    copy passed by run_pipeline). Returns the written output, or None if
+    there was nothing to analyze.
+    """
     # Load candidates after research_engine filtering
     candidates_path = Path("data/analysis/analysis_raw.json")
     
-    if not candidates_path.exists():
-        print("Error: analysis_raw.json not found")
-        print("Run research_engine.py first to filter candidates")
-        sys.exit(1)
-    
-    with open(candidates_path) as f:
-        data = json.load(f)
+    if data is None:
+        if not candidates_path.exists():
+            print("Error: analysis_raw.json not found")
+            print("Run research_engine.py first to filter candidates")
+            sys.exit(1)
+        
+        with open(candidates_path) as f:
+            data = json.load(f)
     
     candidates = data.get("candidates", [])
     
@@ -38,13 +46,24 @@ def main():
     
     # Run unified analysis (direct call, not subprocess)
     # Pass candidates to preserve original fields for downstream pipeline consumers
-    results = analyze_batch(tickers, candidates=candidates)
+    # Worker count comes from ANALYSIS_WORKERS (see analysis_engine.DEFAULT_BATCH_WORKERS)
+    started = time.perf_counter()
+    with price_store.run_scope() as prices:
+        results = analyze_batch(tickers, candidates=candidates)
+    elapsed = time.perf_counter() - started
+    print(f"Price series cache: {prices.stats()}")
+    
+    slowest = sorted(results, key=lambda r: r.get("analysis_seconds", 0), reverse=True)[:3]
+    print(f"Batch finished in {elapsed:.1f}s; slowest: "
+          + ", ".join(f"{r.get('ticker')} {r.get('analysis_seconds', 0):.1f}s" for r in slowest))
     
     # Write results - overwrites analysis_raw.json with enriched data
+    output_data = {"candidates": results}
     with open(candidates_path, "w") as f:
-        json.dump({"candidates": results}, f, indent=2)
+        json.dump(output_data, f, indent=2)
     
     print(f"Wrote {len(results)} enriched results to analysis_raw.json")
+    return output_data
 
 
 if __name__ == "__main__":
@@ -4,7 +4,10 @@ analysis_engine.py - Unified analysis orchestration
 Orchestrates the full analysis flow using data_providers.py
 """
 
+import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, List, Optional
@@ -12,8 +15,11 @@ from typing import Dict, List, Optional
 # Add core to path
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 
+import numpy as np
+
 from data_providers import (
     get_price_history,
+    get_price_series,
     get_basic_quote,
     get_news_timeline,
     get_options_context,
@@ -23,6 +29,10 @@ from data_providers import (
     get_sector_etf,
     save_earnings_to_encyclopedia,
 )
+import earnings_encyclopedia
+import price_store
+from indicators import compute_indicators, max_move, pct_change
+from price_series import PriceSeries
 
 # Workspace path
 WORKSPACE = Path(__file__).resolve().parent.parent.parent
@@ -72,14 +82,17 @@ def build_compact_response(result: Dict, ticker: str, file_path: Path) -> Dict:
 # ANALYSIS HELPERS
 # =============================================================================
 
-def identify_key_movement(price_timeline: List[Dict]) -> Dict:
-    """Identify key price movement in data with multiple reference frames."""
-    if len(price_timeline) < 2:
+def identify_key_movement(series: PriceSeries, window_days: int = 90) -> Dict:
+    """
+    Identify key price movement in data with multiple reference frames.
+    Magnitude is measured over the trailing window; reference frames may
+    look further back (52-week high) when the series holds the history.
+    """
+    window = series.window(window_days)
+    if len(window) < 2:
         return {"type": "unknown", "magnitude": 0}
 
-    start_price = price_timeline[0]["price"]
-    end_price = price_timeline[-1]["price"]
-    overall_change = ((end_price - start_price) / start_price) * 100
+    overall_change = pct_change(float(window.close[-1]), float(window.close[0])) or 0.0
 
     if abs(overall_change) > 15:
         move_type = "earnings spike" if overall_change > 0 else "major selloff"
@@ -91,7 +104,7 @@ def identify_key_movement(price_timeline: List[Dict]) -> Dict:
         move_type = "consolidation"
 
     # Compute multiple reference frame changes
-    reference_frames = compute_price_references(price_timeline)
+    reference_frames = compute_price_references(series, window_days)
 
     return {
         "type": move_type,
@@ -100,188 +113,96 @@ def identify_key_movement(price_timeline: List[Dict]) -> Dict:
     }
 
 
-def compute_price_references(price_timeline: List[Dict]) -> Dict:
+def compute_price_references(series: PriceSeries, window_days: int = 90) -> Dict:
     """
     Compute price changes from multiple reference points.
     Returns: price_change_30d, price_change_90d, price_change_ytd, 
-             price_from_52w_high, price_since_last_earnings
+             price_from_52w_high, price_since_recent_extreme
     """
-    from datetime import date, timedelta
-    
-    if len(price_timeline) < 5:
+    window = series.window(window_days)
+    if len(window) < 5:
         return {}
-    
-    # Sort by date
-    sorted_timeline = sorted(price_timeline, key=lambda x: x.get("date", ""))
-    
-    current_price = sorted_timeline[-1]["price"]
-    today = date.today()
-    
+
+    ind = compute_indicators(series)
+    current_price = ind["current"]
+
+    candidates = {
+        # 30 bars back, when the window has them
+        "price_change_30d": float(window.close[-30]) if len(window) >= 30 else None,
+        # 90 bars back, or the start of the window
+        "price_change_90d": float(window.close[-90] if len(window) >= 90 else window.close[0]),
+        "price_change_ytd": ind["ytd_anchor"],
+        "price_from_52w_high": ind["high_52w"],
+    }
+
     refs = {}
-    
-    # 30-day change
-    if len(sorted_timeline) >= 30:
-        price_30d_ago = sorted_timeline[-30]["price"]
-        if price_30d_ago and price_30d_ago > 0:
-            refs["price_change_30d"] = round(((current_price - price_30d_ago) / price_30d_ago) * 100, 1)
-    
-    # 90-day change (or max available)
-    if len(sorted_timeline) >= 90:
-        price_90d_ago = sorted_timeline[-90]["price"]
-    else:
-        price_90d_ago = sorted_timeline[0]["price"]
-    
-    if price_90d_ago and price_90d_ago > 0:
-        refs["price_change_90d"] = round(((current_price - price_90d_ago) / price_90d_ago) * 100, 1)
-    
-    # YTD change
-    try:
-        year_start = date(today.year, 1, 1)
-        for item in reversed(sorted_timeline):
-            item_date = datetime.strptime(item.get("date", ""), "%Y-%m-%d").date()
-            if item_date >= year_start:
-                price_ytd = item["price"]
-                if price_ytd and price_ytd > 0:
-                    refs["price_change_ytd"] = round(((current_price - price_ytd) / price_ytd) * 100, 1)
-                break
-    except:
-        pass
-    
-    # 52-week high
-    try:
-        one_year_ago = today - timedelta(days=365)
-        prices_52w = [item["price"] for item in sorted_timeline 
-                      if datetime.strptime(item.get("date", ""), "%Y-%m-%d").date() >= one_year_ago]
-        if prices_52w:
-            high_52w = max(prices_52w)
-            if high_52w and high_52w > 0:
-                refs["price_from_52w_high"] = round(((current_price - high_52w) / high_52w) * 100, 1)
-    except:
-        pass
-    
-    # Estimate price since last earnings (look for largest gap/move)
-    # This is approximate - find biggest price swing
-    if len(sorted_timeline) >= 10:
-        max_price = max(item["price"] for item in sorted_timeline)
-        min_price = min(item["price"] for item in sorted_timeline)
-        # Use the move from recent low or high as proxy
-        refs["price_since_recent_extreme"] = round(((current_price - min_price) / min_price) * 100, 1) if min_price > 0 else None
-    
-    return refs
+    for key, reference in candidates.items():
+        change = pct_change(current_price, reference)
+        if change is not None:
+            refs[key] = round(change, 1)
 
+    # Approximate move since the last swing: distance from the window low
+    if len(window) >= 10:
+        change = pct_change(current_price, float(window.close.min()))
+        refs["price_since_recent_extreme"] = round(change, 1) if change is not None else None
 
-def detect_price_based_event(price_timeline: List[Dict]) -> Optional[Dict]:
-    """Fallback: detect large price movements."""
-    if len(price_timeline) < 3:
-        return None
+    return refs
 
-    timeline = []
-    for item in price_timeline:
-        try:
-            d = datetime.strptime(item.get("date", ""), "%Y-%m-%d")
-            timeline.append((d, item.get("price")))
-        except ValueError:
-            continue
 
-    if len(timeline) < 3:
+def detect_price_based_event(series: PriceSeries) -> Optional[Dict]:
+    """Fallback: detect large price movements (largest 1- or 2-day move)."""
+    if len(series) < 3:
         return None
 
-    timeline.sort(key=lambda x: x[0])
-
-    best_magnitude = 0
-    best_date = None
-    best_before = None
-    best_after = None
-
-    # Single-day moves
-    for i in range(1, len(timeline)):
-        date, price = timeline[i]
-        before_price = timeline[i-1][1]
-
-        if before_price and before_price > 0:
-            magnitude = abs(price - before_price) / before_price * 100
-            if magnitude > best_magnitude:
-                best_magnitude = magnitude
-                best_date = date
-                best_before = before_price
-                best_after = price
-
-    # Two-day moves
-    for i in range(2, len(timeline)):
-        date, price = timeline[i]
-        before_price = timeline[i-2][1]
-
-        if before_price and before_price > 0:
-            magnitude = abs(price - before_price) / before_price * 100
-            if magnitude > best_magnitude:
-                best_magnitude = magnitude
-                best_date = date
-                best_before = before_price
-                best_after = price
-
-    if best_magnitude >= 10 and best_date:
+    best = max_move(series, max_span=2)
+
+    if best and best["magnitude"] >= 10:
         return {
-            "date": best_date.strftime("%Y-%m-%d"),
-            "price_before": round(best_before, 2),
-            "price_after": round(best_after, 2),
-            "reaction_percent": round(best_magnitude, 2),
+            "date": series.date_strings()[best["index"]],
+            "price_before": round(best["before"], 2),
+            "price_after": round(best["after"], 2),
+            "reaction_percent": round(best["magnitude"], 2),
             "method": "price_spike_detection"
         }
 
     return None
 
 
-def analyze_earnings_event(ticker: str, price_timeline: List[Dict]) -> Optional[Dict]:
+def analyze_earnings_event(ticker: str, series: PriceSeries) -> Optional[Dict]:
     """Analyze earnings event from encyclopedia or price detection."""
     # Try encyclopedia first
     earnings = get_last_earnings_event(ticker)
 
     if not earnings:
-        return detect_price_based_event(price_timeline)
+        return detect_price_based_event(series)
 
     earnings_date = earnings.get("report_date")
     if not earnings_date:
-        return detect_price_based_event(price_timeline)
+        return detect_price_based_event(series)
 
     # Check if earnings date is in price timeline
     try:
-        earnings_dt = datetime.strptime(earnings_date, "%Y-%m-%d")
+        earnings_day = np.datetime64(datetime.strptime(earnings_date, "%Y-%m-%d").date(), "D")
     except ValueError:
-        return detect_price_based_event(price_timeline)
-
-    timeline_dates = []
-    for item in price_timeline:
-        try:
-            d = datetime.strptime(item.get("date", ""), "%Y-%m-%d")
-            timeline_dates.append((d, item.get("price")))
-        except ValueError:
-            continue
+        return detect_price_based_event(series)
 
-    if not timeline_dates:
-        return detect_price_based_event(price_timeline)
+    if not len(series):
+        return detect_price_based_event(series)
 
-    timeline_dates.sort(key=lambda x: x[0])
-    first_date = timeline_dates[0][0]
-    last_date = timeline_dates[-1][0]
+    days = series.days
+    if not (days[0] <= earnings_day <= days[-1]):
+        return detect_price_based_event(series)
 
-    if not (first_date <= earnings_dt <= last_date):
-        return detect_price_based_event(price_timeline)
+    # First bar within 3 days before and within 5 days after the report
+    offset = (days - earnings_day).astype(np.int64)
+    before = np.flatnonzero((offset < 0) & (offset >= -3))
+    after = np.flatnonzero((offset > 0) & (offset <= 5))
 
-    # Find price before/after
-    price_before = None
-    for d, p in timeline_dates:
-        if d < earnings_dt and (earnings_dt - d).days <= 3:
-            price_before = p
-            break
+    if not len(before) or not len(after):
+        return detect_price_based_event(series)
 
-    price_after = None
-    for d, p in timeline_dates:
-        if d > earnings_dt and (d - earnings_dt).days <= 5:
-            price_after = p
-            break
-
-    if price_before is None or price_after is None:
-        return detect_price_based_event(price_timeline)
+    price_before = round(float(series.close[before[0]]), 2)
+    price_after = round(float(series.close[after[0]]), 2)
 
     reaction_percent = ((price_after - price_before) / price_before) * 100
 
@@ -296,17 +217,14 @@ def analyze_earnings_event(ticker: str, price_timeline: List[Dict]) -> Optional[
     }
 
 
-def technical_analysis(closes: List[float]) -> Dict:
+def technical_analysis(series: PriceSeries) -> Dict:
     """Perform technical analysis on price data."""
-    if len(closes) < 20:
+    if len(series) < 20:
         return {"trend": "neutral", "support_levels": [], "resistance_levels": []}
 
-    current = closes[-1]
-    sma_20 = sum(closes[-20:]) / 20 if len(closes) >= 20 else current
-    sma_50 = sum(closes[-50:]) / 50 if len(closes) >= 50 else sma_20
-
-    recent_low = min(closes[-20:])
-    recent_high = max(closes[-20:])
+    ind = compute_indicators(series)
+    sma_20 = ind["sma_20"]
+    sma_50 = ind["sma_50"] if ind["sma_50"] is not None else sma_20
 
     if sma_20 > sma_50:
         trend = "bullish"
@@ -315,13 +233,19 @@ def technical_analysis(closes: List[float]) -> Dict:
     else:
         trend = "neutral"
 
+    def _round(value, digits=2):
+        return round(value, digits) if value is not None else None
+
     return {
-        "support_levels": [round(recent_low, 2)],
-        "resistance_levels": [round(recent_high, 2)],
+        "support_levels": [round(ind["low_20"], 2)],
+        "resistance_levels": [round(ind["high_20"], 2)],
         "trend": trend,
         "sma_20": round(sma_20, 2),
-        "sma_50": round(sma_50, 2) if len(closes) >= 50 else None,
-        "current_price": round(current, 2)
+        "sma_50": _round(ind["sma_50"]),
+        "current_price": round(ind["current"], 2),
+        "atr_14": _round(ind["atr_14"]),
+        "realized_vol_20": _round(ind["realized_vol_20"], 4),
+        "rsi_14": _round(ind["rsi_14"], 1)
     }
 
 
@@ -1358,15 +1282,25 @@ def analyze_single(ticker: str, save_to_disk: bool = True) -> Dict:
     Perform full analysis on a single ticker.
     Returns comprehensive analysis dict.
     
+    Price series are memoized for the duration of the call: the 90-day
+    ticker fetch also serves the 30-day sector/peer windows, and the sector
+    ETF is fetched once (or reused from the batch run scope).
+    
     Args:
         ticker: Stock ticker symbol
         save_to_disk: If True, save analysis to disk and return compact response.
                       If False, return full analysis dict (used by analyze_batch).
     """
-    ticker = ticker.upper()
+    with price_store.request_scope():
+        return _analyze_single(ticker.upper(), save_to_disk)
+
+
+def _analyze_single(ticker: str, save_to_disk: bool) -> Dict:
 
-    # 1. Get price history
-    price_timeline = get_price_history(ticker, days=90)
+    # 1. Get price history (one year, so 52-week references are real;
+    #    the 90-day window is sliced from it)
+    price_series = get_price_series(ticker, days=365)
+    price_timeline = price_series.window(90).to_timeline()
 
     if not price_timeline:
         return {"error": "Could not fetch price data", "ticker": ticker}
@@ -1405,10 +1339,9 @@ def analyze_single(ticker: str, save_to_disk: bool = True) -> Dict:
     fundamentals = get_schwab_fundamentals(ticker)
 
     # 7. Analyze price movement
-    closes = [item["price"] for item in price_timeline]
-    key_movement = identify_key_movement(price_timeline)
-    tech_analysis = technical_analysis(closes)
-    earnings_event = analyze_earnings_event(ticker, price_timeline)
+    key_movement = identify_key_movement(price_series, window_days=90)
+    tech_analysis = technical_analysis(price_series)
+    earnings_event = analyze_earnings_event(ticker, price_series.window(90))
 
     # 7b. Save earnings event to encyclopedia if detected via price
     if earnings_event and earnings_event.get("method") == "price_spike_detection":
@@ -1511,15 +1444,64 @@ def analyze_single(ticker: str, save_to_disk: bool = True) -> Dict:
     return full_result
 
 
-def analyze_batch(tickers: List[str], candidates: Optional[List[Dict]] = None) -> List[Dict]:
+# Default worker count for analyze_batch (override with ANALYSIS_WORKERS)
+DEFAULT_BATCH_WORKERS = 6
+
+
+def _analyze_batch_item(ticker: str, candidate_lookup: Dict) -> Dict:
+    """Analyze one batch ticker, merge its candidate fields and record timing."""
+    started = time.perf_counter()
+
+    try:
+        result = analyze_single(ticker, save_to_disk=False)
+        
+        # Preserve original candidate fields for pipeline compatibility
+        if ticker.upper() in candidate_lookup:
+            original = candidate_lookup[ticker.upper()]
+            # Keep fields needed by bob_research_overlay.py
+            if "market" in original:
+                result["market"] = original["market"]
+            if "options" in original:
+                result["options"] = original["options"]
+            if "report" in original:
+                result["report"] = original["report"]
+            if "sector_etf" in original:
+                result["sector_etf"] = original["sector_etf"]
+            # Preserve any other top-level fields from original
+            for key in original:
+                if key not in result and key != "ticker":
+                    result[key] = original[key]
+            
+            # Save to disk AFTER adding preserved fields
+            file_path = save_analysis_to_disk(result, ticker)
+            result["report_path"] = str(file_path)
+    except Exception as e:
+        result = {
+            "ticker": ticker.upper(),
+            "error": str(e)
+        }
+
+    result["analysis_seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def analyze_batch(tickers: List[str], candidates: Optional[List[Dict]] = None,
+                  workers: Optional[int] = None) -> List[Dict]:
     """
     Perform analysis on a batch of tickers.
     Used by run_pipeline.py
     
+    Tickers are analyzed concurrently on a bounded thread pool. Provider
+    rate limits (Yahoo, Schwab) are enforced per host by provider_transport,
+    so the worker count only bounds how many tickers are in flight.
+    Output order always matches the input ticker order.
+    
     Args:
         tickers: List of ticker symbols
         candidates: Optional list of candidate dicts with original fields (market, options, report)
                    If provided, these fields are preserved in the output for downstream consumers.
+        workers: Max tickers analyzed at once (default ANALYSIS_WORKERS env or
+                 DEFAULT_BATCH_WORKERS). 1 runs serially.
     """
     # Build lookup for original candidate data
     candidate_lookup = {}
@@ -1528,38 +1510,19 @@ def analyze_batch(tickers: List[str], candidates: Optional[List[Dict]] = None) -
             ticker = c.get("ticker", "").upper()
             candidate_lookup[ticker] = c
     
-    results = []
+    if workers is None:
+        workers = int(os.environ.get("ANALYSIS_WORKERS", DEFAULT_BATCH_WORKERS))
+    workers = max(1, min(workers, len(tickers) or 1))
 
-    for ticker in tickers:
-        try:
-            result = analyze_single(ticker, save_to_disk=False)
-            
-            # Preserve original candidate fields for pipeline compatibility
-            if ticker.upper() in candidate_lookup:
-                original = candidate_lookup[ticker.upper()]
-                # Keep fields needed by bob_research_overlay.py
-                if "market" in original:
-                    result["market"] = original["market"]
-                if "options" in original:
-                    result["options"] = original["options"]
-                if "report" in original:
-                    result["report"] = original["report"]
-                if "sector_etf" in original:
-                    result["sector_etf"] = original["sector_etf"]
-                # Preserve any other top-level fields from original
-                for key in original:
-                    if key not in result and key != "ticker":
-                        result[key] = original[key]
-                
-                # Save to disk AFTER adding preserved fields
-                file_path = save_analysis_to_disk(result, ticker)
-                result["report_path"] = str(file_path)
-            
-            results.append(result)
-        except Exception as e:
-            results.append({
-                "ticker": ticker.upper(),
-                "error": str(e)
-            })
-
-    return results
+    # Run-scoped price store: sector ETFs are fetched once for the whole batch
+    try:
+        with price_store.run_scope():
+            if workers == 1:
+                return [_analyze_batch_item(t, candidate_lookup) for t in tickers]
+
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analyze") as pool:
+                # map() yields in submission order, keeping output deterministic
+                return list(pool.map(lambda t: _analyze_batch_item(t, candidate_lookup), tickers))
+    finally:
+        # One encyclopedia rewrite per batch instead of one per detected event
+        earnings_encyclopedia.flush()
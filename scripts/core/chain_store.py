@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+chain_store.py - Run-scoped options chain snapshots in data/options/chains/
+One file per symbol and 5-minute fetch-time bucket, shared by research_engine
+(earnings snapshot) and analysis_engine (options context) so a pipeline run
+fetches each candidate's chain from Schwab once.
+
+Chains are stored compactly: per expiration and side, one strike array plus
+one array per contract field, instead of Schwab's nested callExpDateMap
+dicts. expand() rebuilds the callExpDateMap/putExpDateMap shape (with only
+the stored fields) for existing readers.
+
+A snapshot records the window it was fetched with (fromDate, toDate,
+strikeCount) and serves any request it covers; the returned chain may hold
+more expirations or strikes than asked for.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+WORKSPACE = Path(__file__).resolve().parent.parent.parent
+CHAIN_DIR = Path(os.environ.get("OPTIONS_CHAIN_DIR", WORKSPACE / "data" / "options" / "chains"))
+
+# Snapshots younger than this are served without a fetch
+CHAIN_MAX_AGE_SECONDS = int(os.environ.get("OPTIONS_CHAIN_MAX_AGE", 900))
+
+# Fetch time bucket width in the file key
+BUCKET_SECONDS = 300
+
+# Snapshot files older than this are deleted on the next store
+RETENTION_SECONDS = 24 * 3600
+
+# Contract fields kept per strike (everything the snapshot/context readers use)
+FIELDS = ("bid", "ask", "mark", "last", "volatility", "delta", "gamma", "theta", "vega",
+          "openInterest", "totalVolume", "inTheMoney")
+
+_stats = {"hits": 0, "misses": 0, "fetches": 0}
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def _symbol_lock(symbol: str) -> threading.Lock:
+    with _locks_guard:
+        lock = _locks.get(symbol)
+        if lock is None:
+            lock = _locks[symbol] = threading.Lock()
+        return lock
+
+
+# =============================================================================
+# COMPACT FORM
+# =============================================================================
+
+def _compact_side(exp_map: Dict) -> Dict:
+    sides = {}
+    for exp_key, strikes in exp_map.items():
+        rows = []
+        for strike_str, contracts in strikes.items():
+            try:
+                strike = float(strike_str)
+            except ValueError:
+                continue
+            if contracts:
+                rows.append((strike, contracts[0]))
+        rows.sort(key=lambda row: row[0])
+        side = {"strike": [strike for strike, _ in rows]}
+        for field in FIELDS:
+            side[field] = [contract.get(field) for _, contract in rows]
+        sides[exp_key] = side
+    return sides
+
+
+def compact(chain: Dict) -> Dict:
+    """Schwab chain response -> {underlyingPrice, ..., call: {exp_key: arrays}, put: {...}}."""
+    underlying = chain.get("underlying") or {}
+    return {
+        "symbol": chain.get("symbol"),
+        "status": chain.get("status"),
+        "underlyingPrice": chain.get("underlyingPrice"),
+        "quoteTime": underlying.get("quoteTime"),
+        "call": _compact_side(chain.get("callExpDateMap") or {}),
+        "put": _compact_side(chain.get("putExpDateMap") or {}),
+    }
+
+
+def _expand_side(sides: Dict) -> Dict:
+    exp_map = {}
+    for exp_key, side in sides.items():
+        columns = [(field, side[field]) for field in FIELDS if field in side]
+        exp_map[exp_key] = {
+            str(strike): [{"strikePrice": strike, **{field: values[i] for field, values in columns}}]
+            for i, strike in enumerate(side["strike"])
+        }
+    return exp_map
+
+
+def expand(snapshot: Dict) -> Dict:
+    """Compact snapshot -> Schwab-shaped chain (callExpDateMap/putExpDateMap)."""
+    return {
+        "symbol": snapshot.get("symbol"),
+        "status": snapshot.get("status"),
+        "underlyingPrice": snapshot.get("underlyingPrice"),
+        "callExpDateMap": _expand_side(snapshot.get("call", {})),
+        "putExpDateMap": _expand_side(snapshot.get("put", {})),
+    }
+
+
+# =============================================================================
+# STORE
+# =============================================================================
+
+def _bucket(epoch: float) -> int:
+    return int(epoch // BUCKET_SECONDS)
+
+
+def _path(symbol: str, bucket: int) -> Path:
+    return CHAIN_DIR / f"{symbol.upper()}_{bucket}.json"
+
+
+def _window(from_date, to_date, strike_count) -> Dict:
+    return {
+        "fromDate": str(from_date) if from_date else None,
+        "toDate": str(to_date) if to_date else None,
+        "strikeCount": int(strike_count) if strike_count else None,
+    }
+
+
+def covers(stored: Dict, requested: Dict) -> bool:
+    """Whether a snapshot fetched with window `stored` holds everything in `requested` (None = unbounded)."""
+    if stored["fromDate"] and (not requested["fromDate"] or requested["fromDate"] < stored["fromDate"]):
+        return False
+    if stored["toDate"] and (not requested["toDate"] or requested["toDate"] > stored["toDate"]):
+        return False
+    if stored["strikeCount"] and (not requested["strikeCount"] or requested["strikeCount"] > stored["strikeCount"]):
+        return False
+    return True
+
+
+def _load(path: Path) -> Optional[Dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def get(symbol: str, from_date=None, to_date=None, strike_count: Optional[int] = None,
+        max_age: Optional[float] = None, compact_form: bool = False) -> Optional[Dict]:
+    """
+    Newest snapshot younger than max_age covering the window, as a
+    Schwab-shaped chain (or the compact snapshot itself if compact_form).
+    """
+    max_age = CHAIN_MAX_AGE_SECONDS if max_age is None else max_age
+    requested = _window(from_date, to_date, strike_count)
+    now = time.time()
+    for bucket in range(_bucket(now), _bucket(now - max_age) - 1, -1):
+        record = _load(_path(symbol, bucket))
+        if not record or now - record.get("fetched_at", 0) > max_age:
+            continue
+        if covers(record["window"], requested):
+            return record["chain"] if compact_form else expand(record["chain"])
+    return None
+
+
+def _prune(now: float) -> None:
+    try:
+        for path in CHAIN_DIR.glob("*.json"):
+            if now - path.stat().st_mtime > RETENTION_SECONDS:
+                path.unlink()
+    except OSError:
+        pass
+
+
+def put(symbol: str, chain: Dict, from_date=None, to_date=None, strike_count: Optional[int] = None) -> Dict:
+    """Store a fetched chain (compact form) under its fetch time bucket. Returns the compact snapshot."""
+    now = time.time()
+    snapshot = compact(chain)
+    record = {
+        "symbol": symbol.upper(),
+        "fetched_at": now,
+        "fetched": datetime.fromtimestamp(now).isoformat(timespec="seconds"),
+        "window": _window(from_date, to_date, strike_count),
+        "chain": snapshot,
+    }
+
+    # Bucketed by fetch time: the underlying's quoteTime can be hours old
+    # after the close, which would put fresh snapshots out of get()'s scan
+    path = _path(symbol, _bucket(now))
+    tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        CHAIN_DIR.mkdir(parents=True, exist_ok=True)
+        with open(tmp, "w") as f:
+            json.dump(record, f, separators=(",", ":"))
+        os.replace(tmp, path)
+    except OSError:
+        return snapshot
+    _prune(now)
+    return snapshot
+
+
+def get_or_fetch(symbol: str, fetch: Callable[[], Optional[Dict]], from_date=None, to_date=None,
+                 strike_count: Optional[int] = None, max_age: Optional[float] = None,
+                 compact_form: bool = False) -> Optional[Dict]:
+    """
+    Chain for the window from the store, else fetch() (a raw Schwab chain or
+    None) stored and returned. Concurrent callers for a symbol share one fetch.
+    """
+    with _symbol_lock(symbol.upper()):
+        chain = get(symbol, from_date, to_date, strike_count, max_age, compact_form)
+        if chain is not None:
+            _stats["hits"] += 1
+            return chain
+        _stats["misses"] += 1
+
+        raw = fetch()
+        _stats["fetches"] += 1
+        if not raw:
+            return None
+        snapshot = put(symbol, raw, from_date, to_date, strike_count)
+        return snapshot if compact_form else expand(snapshot)
+
+
+def stats() -> Dict:
+    """Hit/miss/fetch counters for this process."""
+    return dict(_stats)
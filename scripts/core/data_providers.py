@@ -5,14 +5,29 @@ All API calls (Yahoo, Schwab, Nasdaq) go through this module.
 """
 
 import json
-import subprocess
-import requests
+import re
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, List, Optional
+import numpy as np
 from dotenv import load_dotenv
 
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from provider_transport import fetch_json
+from price_store import active_store
+from price_series import PriceSeries
+import ohlcv_store
+import quote_cache
+import chain_store
+import fundamentals_cache
+import options_analytics
+import earnings_encyclopedia
+
 # Load .env from workspace root (override shell env)
 load_dotenv(Path(__file__).resolve().parents[2] / ".env", override=True)
 
@@ -35,76 +50,55 @@ def get_schwab_token() -> Optional[str]:
 
 
 # =============================================================================
-# YAHOO FINANCE (via curl)
+# YAHOO FINANCE
 # =============================================================================
 
-def get_price_history(ticker: str, days: int = 90) -> List[Dict]:
+YAHOO_CHART_URL = "https://query1.finance.yahoo.com/v8/finance/chart/{ticker}"
+YAHOO_SEARCH_URL = "https://query1.finance.yahoo.com/v1/finance/search"
+
+
+def get_price_series(ticker: str, days: int = 90) -> PriceSeries:
     """
-    Fetch price history from Yahoo Finance using curl.
-    Returns list of {date, price, change%} dicts.
+    Daily PriceSeries for the trailing `days` calendar days.
+    Served from the active price_store scope when one is open (see
+    analysis_engine), otherwise read from the on-disk OHLCV store, which
+    fetches only the missing tail from Yahoo.
     """
-    url = f"https://query1.finance.yahoo.com/v8/finance/chart/{ticker}?range={days}d&interval=1d"
-    
+    store = active_store()
     try:
-        result = subprocess.run(
-            ["curl", "-s", "-H", "User-Agent: Mozilla/5.0", url],
-            capture_output=True, text=True, timeout=15
-        )
-        
-        data = json.loads(result.stdout)
-        result_data = data.get("chart", {}).get("result", [])
-        
-        if not result_data:
-            return []
-        
-        timestamps = result_data[0].get("timestamp", [])
-        quote = result_data[0].get("indicators", {}).get("quote", [{}])[0]
-        closes = quote.get("close", [])
-        
-        if not timestamps or not closes:
-            return []
-        
-        prices = []
-        prev_close = None
-        
-        for ts, close in zip(timestamps, closes):
-            if close is not None:
-                date = datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
-                change_pct = 0.0
-                if prev_close is not None and prev_close > 0:
-                    change_pct = ((close - prev_close) / prev_close) * 100
-                
-                prices.append({
-                    "date": date,
-                    "price": round(close, 2),
-                    "change%": round(change_pct, 2)
-                })
-                prev_close = close
-        
-        return prices
-        
+        if store is not None:
+            return store.get(ticker, days, ohlcv_store.get_series)
+        return ohlcv_store.get_series(ticker, days)
     except Exception:
-        return []
+        return PriceSeries(ticker)
+
+
+def get_price_history(ticker: str, days: int = 90) -> List[Dict]:
+    """
+    Price history as a list of {date, price, change%} dicts.
+    Thin view over get_price_series() for callers that want JSON rows.
+    """
+    return get_price_series(ticker, days).to_timeline()
 
 
 def get_basic_quote(ticker: str) -> Dict:
     """Get current quote for a ticker."""
-    url = f"https://query1.finance.yahoo.com/v8/finance/chart/{ticker}?interval=1d"
-    
+    resp = fetch_json(YAHOO_CHART_URL.format(ticker=ticker),
+                      params={"interval": "1d"}, timeout=10)
+    if not resp["ok"]:
+        return {}
+
     try:
-        result = subprocess.run(
-            ["curl", "-s", "-H", "User-Agent: Mozilla/5.0", url],
-            capture_output=True, text=True, timeout=10
-        )
-        
-        data = json.loads(result.stdout)
+        data = resp["data"]
         meta = data.get("chart", {}).get("result", [{}])[0].get("meta", {})
         
         price = meta.get("regularMarketPrice")
+        volume = meta.get("regularMarketVolume")
         
         if price:
             return {
                 "price": float(price),
+                "volume": int(volume) if volume else None,
                 "symbol": ticker
             }
     except Exception:
@@ -117,15 +111,12 @@ def get_news_timeline(ticker: str, days_back: int = 90) -> List[Dict]:
     """
     Retrieve news headlines using Yahoo Finance search endpoint.
     """
-    url = f"https://query1.finance.yahoo.com/v1/finance/search?q={ticker}"
-    
+    resp = fetch_json(YAHOO_SEARCH_URL, params={"q": ticker}, timeout=15)
+    if not resp["ok"]:
+        return []
+
     try:
-        result = subprocess.run(
-            ["curl", "-s", "-H", "User-Agent: Mozilla/5.0", url],
-            capture_output=True, text=True, timeout=15
-        )
-        
-        data = json.loads(result.stdout)
+        data = resp["data"]
         news_items = data.get("news", [])
         
         if not news_items:
@@ -167,129 +158,280 @@ def get_news_timeline(ticker: str, days_back: int = 90) -> List[Dict]:
 
 SCHWAB_OPTIONS_URL = "https://api.schwabapi.com/marketdata/v1/chains"
 SCHWAB_INSTRUMENTS_URL = "https://api.schwabapi.com/v1/instruments"
+SCHWAB_QUOTES_URL = "https://api.schwabapi.com/marketdata/v1/quotes"
 
+# Symbols per Schwab bulk quote request, and Yahoo fallback concurrency
+QUOTE_BATCH_SIZE = 100
+QUOTE_FALLBACK_WORKERS = 8
 
-def get_schwab_fundamentals(symbol: str) -> Dict:
-    """Get fundamental data from Schwab."""
-    token = get_schwab_token()
+# Symbols per multi-symbol instruments (fundamentals) request
+FUNDAMENTALS_BATCH_SIZE = 50
+
+# Options context only needs the nearest expiration's ATM strikes
+CONTEXT_CHAIN_DAYS = 45
+CONTEXT_STRIKE_COUNT = 10
+
+
+def get_schwab_fundamentals(symbol: str, static_only: bool = False) -> Dict:
+    """
+    Get fundamental data from Schwab (via the persistent fundamentals cache).
+    static_only accepts a cached entry whose valuation block is stale, for
+    callers that only need sector/industry.
+    """
+    return get_bulk_fundamentals([symbol], static_only=static_only).get(symbol, {})
+
+
+def _instruments_by_symbol(data) -> Dict[str, Dict]:
+    """Instruments response ({"instruments": [...]} or keyed by symbol) as {SYMBOL: instrument}."""
+    instruments = data.get("instruments", []) if isinstance(data, dict) else []
+    if isinstance(instruments, dict):
+        return {s.upper(): i for s, i in instruments.items() if isinstance(i, dict)}
+    return {i["symbol"].upper(): i for i in instruments if isinstance(i, dict) and i.get("symbol")}
+
+
+def _symbol_key(symbol: str) -> str:
+    """Symbol with class-share separators dropped, so BRK.B, BRK/B and brk-b compare equal."""
+    return re.sub(r"[^A-Z0-9]", "", symbol.upper())
+
+
+def get_bulk_fundamentals(symbols: List[str], static_only: bool = False,
+                          latencies: Optional[List[float]] = None) -> Dict[str, Dict]:
+    """
+    Fundamentals for many symbols as {symbol: instrument} ({} where Schwab had
+    none). Served from the persistent fundamentals cache where fresh (see
+    get_schwab_fundamentals for static_only); the rest are fetched
+    FUNDAMENTALS_BATCH_SIZE symbols per instruments request and cached.
+    Each request's latency (ms) is appended to `latencies` if given.
+    
+    Symbols are matched to the response case-insensitively and ignoring
+    class-share separators. Only plain alphanumeric symbols with no match
+    are cached as "no record"; for BRK/B-style symbols a miss may just be
+    a format mismatch.
+    """
+    symbols = list(dict.fromkeys(s for s in symbols if s))
+    fundamentals = fundamentals_cache.get_fresh(symbols, static_only=static_only)
+    missing = list(dict.fromkeys(s.upper() for s in symbols if s not in fundamentals))
+    token = get_schwab_token() if missing else None
     if not token:
-        return {}
+        return {s: fundamentals.get(s, {}) for s in symbols}
     
     headers = {"Authorization": f"Bearer {token}"}
-    params = {
-        "symbol": symbol,
-        "projection": "fundamental"
+    batches = [missing[i:i + FUNDAMENTALS_BATCH_SIZE] for i in range(0, len(missing), FUNDAMENTALS_BATCH_SIZE)]
+    
+    def fetch_batch(batch):
+        params = {"symbol": ",".join(batch), "projection": "fundamental"}
+        resp = fetch_json(SCHWAB_INSTRUMENTS_URL, params=params, headers=headers, timeout=15)
+        if latencies is not None:
+            latencies.append(resp["elapsed_ms"])
+        if not resp["ok"]:
+            return None
+        found = _instruments_by_symbol(resp["data"])
+        if len(batch) == 1 and len(found) == 1:
+            # Single-symbol lookups take the one record returned
+            return {batch[0]: next(iter(found.values()))}
+        by_key = {_symbol_key(symbol): instrument for symbol, instrument in found.items()}
+        return {q: found.get(q) or by_key.get(_symbol_key(q), {}) for q in batch}
+    
+    fetched = {}
+    with ThreadPoolExecutor(max_workers=min(len(batches), 4)) as pool:
+        for found in pool.map(fetch_batch, batches):
+            if found is not None:  # failed requests are not cached as "no record"
+                fetched.update(found)
+    
+    # Records under the symbol Schwab returned; misses only where unambiguous
+    to_store = {}
+    for query, instrument in fetched.items():
+        if instrument:
+            to_store[(instrument.get("symbol") or query).upper()] = instrument
+        elif query.isalnum():
+            to_store.setdefault(query, {})
+    fundamentals_cache.store(to_store)
+    
+    return {s: fundamentals[s] if s in fundamentals else fetched.get(s.upper(), {}) for s in symbols}
+
+
+def warm_fundamentals(days: int = 7) -> Dict:
+    """
+    Fetch fundamentals for every name on the Nasdaq earnings calendar over
+    the next `days` days, so the pipeline and sector lookups hit the cache.
+    """
+    today = datetime.now().date()
+    dates = [(today + timedelta(days=d)).isoformat() for d in range(days)]
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        calendars = list(pool.map(fetch_nasdaq_earnings, dates))
+    
+    symbols = sorted({row.get("symbol") for rows in calendars for row in rows or [] if row.get("symbol")})
+    cached = fundamentals_cache.get_fresh(symbols)
+    fundamentals = get_bulk_fundamentals(symbols)
+    return {
+        "days": days,
+        "symbols": len(symbols),
+        "already_cached": len(cached),
+        "fetched": len(symbols) - len(cached),
+        "with_record": sum(1 for f in fundamentals.values() if f)
     }
+
+
+def _fetch_schwab_quotes(symbols: List[str], token: str,
+                         latencies: Optional[List[float]] = None) -> Dict[str, Dict]:
+    """One Schwab bulk quote request. Returns {symbol: {price, volume, market_cap}}."""
+    headers = {"Authorization": f"Bearer {token}"}
+    params = {"symbols": ",".join(symbols), "fields": "quote"}
     
-    try:
-        resp = requests.get(SCHWAB_INSTRUMENTS_URL, headers=headers, params=params, timeout=10)
-        if resp.status_code == 200:
-            data = resp.json()
-            instruments = data.get("instruments", [])
-            if instruments:
-                return instruments[0]
-    except Exception:
-        pass
+    resp = fetch_json(SCHWAB_QUOTES_URL, params=params, headers=headers, timeout=15)
+    if latencies is not None:
+        latencies.append(resp["elapsed_ms"])
+    if not resp["ok"] or not isinstance(resp["data"], dict):
+        return {}
     
-    return {}
+    quotes = {}
+    for symbol, item in resp["data"].items():
+        if not isinstance(item, dict):
+            continue
+        quote = item.get("quote") or {}
+        price = quote.get("lastPrice") or quote.get("mark")
+        if price:
+            volume = quote.get("totalVolume")
+            quotes[symbol] = {
+                "price": float(price),
+                "volume": int(volume) if volume else None,
+                "market_cap": None
+            }
+    return quotes
 
 
-def get_options_chain(symbol: str) -> Optional[Dict]:
-    """Fetch options chain from Schwab API."""
+def get_bulk_quotes(symbols: List[str], max_age: float = quote_cache.QUOTE_TTL_SECONDS,
+                    latencies: Optional[List[float]] = None) -> Dict[str, Dict]:
+    """
+    Quotes for many symbols as {symbol: {price, volume, market_cap}}
+    ({} for symbols that could not be quoted).
+    
+    Served from the short-TTL quote cache where fresh; the rest are fetched
+    QUOTE_BATCH_SIZE at a time from Schwab, and anything Schwab did not
+    return falls back to concurrent single-symbol Yahoo quotes. Each
+    request's latency (ms) is appended to `latencies` if given.
+    """
+    symbols = list(dict.fromkeys(s for s in symbols if s))
+    quotes = quote_cache.get_fresh(symbols, max_age)
+    missing = [s for s in symbols if s not in quotes]
+    fetched = {}
+    
+    token = get_schwab_token() if missing else None
+    if token:
+        for i in range(0, len(missing), QUOTE_BATCH_SIZE):
+            fetched.update(_fetch_schwab_quotes(missing[i:i + QUOTE_BATCH_SIZE], token, latencies))
+        missing = [s for s in missing if s not in fetched]
+    
+    def fallback_quote(symbol):
+        start = time.perf_counter()
+        quote = get_basic_quote(symbol)
+        if latencies is not None:
+            latencies.append((time.perf_counter() - start) * 1000)
+        return quote
+    
+    if missing:
+        with ThreadPoolExecutor(max_workers=QUOTE_FALLBACK_WORKERS) as pool:
+            for symbol, quote in zip(missing, pool.map(fallback_quote, missing)):
+                if quote:
+                    fetched[symbol] = {
+                        "price": quote["price"],
+                        "volume": quote.get("volume"),
+                        "market_cap": None
+                    }
+    
+    quote_cache.store(fetched)
+    quotes.update(fetched)
+    return {s: quotes.get(s, {}) for s in symbols}
+
+
+def options_chain_params(symbol: str, from_date=None, to_date=None,
+                         strike_count: Optional[int] = None, contract_type: Optional[str] = None) -> Dict:
+    """
+    Query for Schwab /chains. Without filters the API returns every expiration
+    and strike; fromDate/toDate (YYYY-MM-DD), strikeCount (strikes around the
+    money) and contractType (CALL/PUT/ALL) make it return only that slice.
+    """
+    params = {"symbol": symbol, "includeQuotes": "true"}
+    if from_date:
+        params["fromDate"] = str(from_date)
+    if to_date:
+        params["toDate"] = str(to_date)
+    if strike_count:
+        params["strikeCount"] = int(strike_count)
+    if contract_type:
+        params["contractType"] = contract_type.upper()
+    return params
+
+
+def get_options_chain(symbol: str, from_date=None, to_date=None,
+                      strike_count: Optional[int] = None, contract_type: Optional[str] = None) -> Optional[Dict]:
+    """Fetch options chain from Schwab API (optionally only a date/strike slice)."""
     token = get_schwab_token()
     if not token:
         return None
     
     headers = {"Authorization": f"Bearer {token}"}
-    params = {"symbol": symbol, "includeQuotes": "true"}
+    params = options_chain_params(symbol, from_date, to_date, strike_count, contract_type)
     
-    try:
-        response = requests.get(SCHWAB_OPTIONS_URL, headers=headers, params=params, timeout=15)
-        if response.status_code == 200:
-            return response.json()
-    except Exception:
-        pass
+    resp = fetch_json(SCHWAB_OPTIONS_URL, params=params, headers=headers, timeout=15)
+    if resp["ok"]:
+        return resp["data"]
     
     return None
 
 
+def get_options_chain_snapshot(symbol: str, from_date=None, to_date=None,
+                               strike_count: Optional[int] = None, fetch=None,
+                               compact_form: bool = False) -> Optional[Dict]:
+    """
+    Options chain from the run-scoped snapshot store (data/options/chains/),
+    fetching with fetch(symbol, from_date=, to_date=, strike_count=) (default
+    get_options_chain) only when no fresh snapshot covers the window.
+    compact_form returns the stored per-expiration arrays instead of the
+    Schwab-shaped chain.
+    """
+    fetch = fetch or get_options_chain
+    return chain_store.get_or_fetch(
+        symbol,
+        lambda: fetch(symbol, from_date=from_date, to_date=to_date, strike_count=strike_count),
+        from_date, to_date, strike_count, compact_form=compact_form
+    )
+
+
 def get_options_context(ticker: str) -> Optional[Dict]:
     """
     Get options market context using Schwab API.
-    Returns implied move, ATM IV, call/put skew.
+    Returns implied move, ATM IV, call/put skew, 25-delta skew,
+    strangle-based implied move and the ATM IV term structure.
     """
-    chain = get_options_chain(ticker)
-    if not chain:
+    # Only near-term expirations and strikes around the money are needed;
+    # usually already in the snapshot store from research_engine
+    today = datetime.now().date()
+    snapshot = get_options_chain_snapshot(ticker, from_date=today,
+                                          to_date=today + timedelta(days=CONTEXT_CHAIN_DAYS),
+                                          strike_count=CONTEXT_STRIKE_COUNT, compact_form=True)
+    if snapshot and not snapshot.get("call"):
+        # No listed expiration in the window (e.g. quarterly-only names)
+        snapshot = get_options_chain_snapshot(ticker, strike_count=CONTEXT_STRIKE_COUNT, compact_form=True)
+    if not snapshot:
         return None
     
-    underlying_price = chain.get("underlyingPrice")
+    chain = options_analytics.OptionsChain.from_snapshot(snapshot)
+    underlying_price = chain.underlying
     if not underlying_price:
         return None
     
-    call_map = chain.get("callExpDateMap", {})
-    if not call_map:
-        return None
-    
-    expirations = list(call_map.keys())
-    if not expirations:
-        return None
-    
-    expirations.sort(key=lambda x: x.split(":")[0] if ":" in x else x)
-    nearest_exp = expirations[0]
-    
-    exp_calls = call_map.get(nearest_exp, {})
-    strikes = list(exp_calls.keys())
-    if not strikes:
-        return None
-    
-    # Find ATM strike
-    atm_strike = None
-    min_diff = float('inf')
-    
-    for strike_str in strikes:
-        try:
-            strike = float(strike_str)
-            diff = abs(strike - underlying_price)
-            if diff < min_diff:
-                min_diff = diff
-                atm_strike = strike
-        except ValueError:
-            continue
-    
-    if atm_strike is None:
+    # Nearest expiration with a call strike; ATM = call strike nearest the underlying
+    metrics = options_analytics.expiration_metrics(chain)
+    with_atm = np.flatnonzero(metrics["atm_row"] >= 0)
+    if not len(with_atm):
         return None
+    nearest = chain.expirations[with_atm[0]]
+    summary = options_analytics.expiration_summary(chain, nearest, metrics=metrics)
     
-    call_data = exp_calls.get(str(atm_strike), [{}])[0] if exp_calls.get(str(atm_strike)) else {}
-    put_data = chain.get("putExpDateMap", {}).get(nearest_exp, {}).get(str(atm_strike), [{}])[0]
-    
-    # Calculate implied move
-    call_mark = call_data.get("mark", 0) or 0
-    put_mark = put_data.get("mark", 0) or 0 if put_data else 0
-    straddle = call_mark + put_mark
-    
-    if underlying_price > 0 and straddle > 0:
-        implied_move_pct = (straddle / underlying_price) * 100
-    else:
-        implied_move_pct = None
-    
-    # Get ATM IV - Schwab API uses "volatility" field as percentage (e.g., 150 = 150%)
-    call_iv = call_data.get("volatility", 0) or 0
-    put_iv = put_data.get("volatility", 0) or 0 if put_data else 0
-    atm_iv = (call_iv + put_iv) / 2 if (call_iv and put_iv) else (call_iv or put_iv or 0)
-    
-    # Calculate call/put skew
-    if put_mark > 0 and call_mark > 0:
-        call_put_skew = (call_mark - put_mark) / put_mark * 100
-    else:
-        call_put_skew = 0
-    
-    # Extract DTE
-    dte = 0
-    if ":" in nearest_exp:
-        try:
-            dte = int(nearest_exp.split(":")[1])
-        except (ValueError, IndexError):
-            dte = 0
+    implied_move_pct = summary["em_percent"]
+    atm_iv = summary["atm_iv"]
+    dte = summary["dte"]
     
     # Build interpretation
     if implied_move_pct:
@@ -297,13 +439,18 @@ def get_options_context(ticker: str) -> Optional[Dict]:
     else:
         interpretation = "Unable to calculate implied move."
     
+    strangle_em = summary["strangle_em_percent"]
+    skew_25d = summary["skew_25d"]
     return {
         "implied_move": round(implied_move_pct, 2) if implied_move_pct else None,
         "atm_iv": round(atm_iv, 1) if atm_iv else None,
-        "call_put_skew": round(call_put_skew, 1),
+        "call_put_skew": round(summary["call_put_skew"], 1),
+        "skew_25d": round(skew_25d, 1) if skew_25d is not None else None,
+        "strangle_implied_move": round(strangle_em, 2) if strangle_em else None,
+        "iv_term_structure": options_analytics.iv_term_structure(chain, metrics),
         "underlying_price": underlying_price,
         "dte": dte,
-        "expiration": nearest_exp.split(":")[0] if ":" in nearest_exp else nearest_exp,
+        "expiration": nearest,
         "interpretation": interpretation
     }
 
@@ -317,25 +464,20 @@ def fetch_nasdaq_earnings(date_str: str = None) -> List[Dict]:
     if date_str is None:
         date_str = datetime.now().strftime("%Y-%m-%d")
     
-    url = f"https://api.nasdaq.com/api/calendar/earnings?date={date_str}"
+    url = "https://api.nasdaq.com/api/calendar/earnings"
     
-    headers = {"User-Agent": "Mozilla/5.0", "Accept": "application/json"}
+    headers = {"Accept": "application/json"}
+    
+    resp = fetch_json(url, params={"date": date_str}, headers=headers, timeout=30)
+    if not resp["ok"]:
+        return []
     
     try:
-        result = subprocess.run(
-            ["curl", "-s", "-H", f"User-Agent: {headers['User-Agent']}", 
-             "-H", f"Accept: {headers['Accept']}", "--max-time", "30", url],
-            capture_output=True, text=True, timeout=35
-        )
-        
-        if result.returncode != 0:
-            return []
-        
-        data = json.loads(result.stdout)
+        data = resp["data"]
         
         if "data" in data:
-            rows = data["data"].get("rows", [])
-            return rows
+            # Weekends and holidays come back as {"data": {"rows": null}} (or "data": null)
+            return (data["data"] or {}).get("rows") or []
     except Exception:
         pass
     
@@ -347,24 +489,17 @@ def fetch_nasdaq_earnings(date_str: str = None) -> List[Dict]:
 # =============================================================================
 
 def get_earnings_encyclopedia() -> List[Dict]:
-    """Load earnings encyclopedia entries."""
-    path = WORKSPACE / "data" / "earnings" / "earnings_encyclopedia.json"
-    
-    if not path.exists():
-        return []
-    
-    try:
-        with open(path) as f:
-            data = json.load(f)
-        return data.get("entries", [])
-    except Exception:
-        return []
+    """Load earnings encyclopedia entries (indexed, loaded once per process)."""
+    return earnings_encyclopedia.get_store().entries()
 
 
 def save_earnings_to_encyclopedia(earnings_event: Dict, ticker: str, source: str = "price_detection") -> bool:
     """
     Add new earnings event to encyclopedia if it doesn't already exist.
     
+    The entry is journaled immediately; the JSON file is rewritten once
+    per flush (end of batch / process exit), not once per entry.
+    
     Args:
         earnings_event: The earnings event dict with date, reaction, etc
         ticker: Stock ticker symbol
@@ -373,36 +508,15 @@ def save_earnings_to_encyclopedia(earnings_event: Dict, ticker: str, source: str
     Returns:
         True if saved successfully, False if already exists or error
     """
-    import copy
-    from datetime import datetime
-    
-    path = WORKSPACE / "data" / "earnings" / "earnings_encyclopedia.json"
-    
-    # Load existing data
-    try:
-        if path.exists():
-            with open(path) as f:
-                data = json.load(f)
-        else:
-            data = {"version": "1.0", "last_updated": "", "entries": []}
-    except Exception:
-        return False
-    
-    entries = data.get("entries", [])
-    
-    # Check if entry already exists for this ticker + date
     earnings_date = earnings_event.get("report_date") or earnings_event.get("earnings_date")
     if not earnings_date:
         return False
     
-    # Check for existing entry
-    for existing in entries:
-        if existing.get("ticker", "").upper() == ticker.upper():
-            if existing.get("earnings_date") == earnings_date:
-                # Already exists
-                return False
+    store = earnings_encyclopedia.get_store()
+    if store.get(ticker, earnings_date) is not None:
+        # Already exists
+        return False
     
-    # Create new entry
     new_entry = {
         "ticker": ticker.upper(),
         "company": ticker.upper(),  # Would need to fetch real name
@@ -420,35 +534,19 @@ def save_earnings_to_encyclopedia(earnings_event: Dict, ticker: str, source: str
         "research_history": []
     }
     
-    # Add to entries
-    entries.append(new_entry)
-    data["entries"] = entries
-    data["last_updated"] = datetime.now().strftime("%Y-%m-%d")
-    
-    # Save
     try:
-        with open(path, "w") as f:
-            json.dump(data, f, indent=2)
-        return True
-    except Exception:
+        return store.upsert(new_entry, overwrite=False)
+    except OSError:
         return False
 
 
 def get_last_earnings_event(ticker: str) -> Optional[Dict]:
     """Get most recent earnings event for a ticker."""
-    entries = get_earnings_encyclopedia()
+    latest = earnings_encyclopedia.get_store().latest(ticker)
     
-    ticker_entries = [
-        e for e in entries 
-        if e.get("ticker", "").upper() == ticker.upper()
-    ]
-    
-    if not ticker_entries:
+    if not latest:
         return None
     
-    ticker_entries.sort(key=lambda x: x.get("earnings_date", ""), reverse=True)
-    latest = ticker_entries[0]
-    
     return {
         "ticker": latest.get("ticker"),
         "report_date": latest.get("earnings_date"),
@@ -459,26 +557,37 @@ def get_last_earnings_event(ticker: str) -> Optional[Dict]:
     }
 
 
+# analysis_with_probs.json indexed by ticker, re-read only when the file changes
+_probability_index = {"signature": None, "by_ticker": {}}
+_probability_lock = threading.Lock()
+
+
 def get_probability_data(ticker: str) -> Optional[Dict]:
     """Load probability metrics from analysis file."""
     path = WORKSPACE / "data" / "analysis" / "analysis_with_probs.json"
     
-    if not path.exists():
+    try:
+        st = path.stat()
+    except OSError:
         return None
+    signature = (st.st_mtime_ns, st.st_size)
     
-    try:
-        with open(path) as f:
-            data = json.load(f)
-        
-        candidates = data.get("candidates", [])
+    with _probability_lock:
+        if _probability_index["signature"] != signature:
+            by_ticker = {}
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+                
+                for c in data.get("candidates", []):
+                    # First entry wins, matching the old linear scan
+                    by_ticker.setdefault(c.get("ticker", "").upper(), c.get("probabilities", {}))
+            except Exception:
+                pass
+            _probability_index["signature"] = signature
+            _probability_index["by_ticker"] = by_ticker
         
-        for c in candidates:
-            if c.get("ticker", "").upper() == ticker.upper():
-                return c.get("probabilities", {})
-    except Exception:
-        pass
-    
-    return None
+        return _probability_index["by_ticker"].get(ticker.upper())
 
 
 def get_sector_etf(ticker: str) -> str:
@@ -539,8 +648,8 @@ def get_sector_etf(ticker: str) -> str:
     if ticker.upper() in ticker_map:
         return ticker_map[ticker.upper()]
     
-    # Try to get sector from fundamentals
-    fundamentals = get_schwab_fundamentals(ticker)
+    # Try to get sector from (cached) fundamentals
+    fundamentals = get_schwab_fundamentals(ticker, static_only=True)
     sector = fundamentals.get("sector", "")
     industry = fundamentals.get("industry", "")
     
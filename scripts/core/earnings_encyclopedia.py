@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+earnings_encyclopedia.py - Indexed earnings encyclopedia store
+Loads data/earnings/earnings_encyclopedia.json once per process into a
+ticker -> earnings_date -> entry index. Upserts are O(1) and are appended to
+a small JSONL journal next to the file; the JSON snapshot (the format
+Mission Control reads) is rewritten once per flush instead of once per entry.
+
+The snapshot is reloaded only if another process changes the file or journal.
+"""
+
+import atexit
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+WORKSPACE = Path(__file__).resolve().parent.parent.parent
+ENCYCLOPEDIA_PATH = WORKSPACE / "data" / "earnings" / "earnings_encyclopedia.json"
+
+# Fold the journal into the snapshot once it holds this many entries
+COMPACT_AFTER = 200
+
+
+def _key(entry: Dict) -> Tuple[str, str]:
+    return entry.get("ticker", "").upper(), entry.get("earnings_date") or ""
+
+
+def _signature(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class EarningsEncyclopedia:
+    """
+    In-memory index over the encyclopedia snapshot plus its journal.
+
+    entries keeps snapshot order (new entries are appended); index maps
+    ticker -> {earnings_date: position in entries} for O(1) lookups and upserts.
+    """
+
+    def __init__(self, path: Path = ENCYCLOPEDIA_PATH):
+        self.path = Path(path)
+        self.journal_path = self.path.with_suffix(".journal.jsonl")
+        self._lock = threading.RLock()
+        self._meta: Dict = {}
+        self._entries: List[Dict] = []
+        self._index: Dict[str, Dict[str, int]] = {}
+        self._pending = 0
+        self._seen = None  # (snapshot signature, journal signature) at last load/write
+
+    # -------------------------------------------------------------------------
+    # Loading
+    # -------------------------------------------------------------------------
+
+    def _signatures(self):
+        return _signature(self.path), _signature(self.journal_path)
+
+    def _load(self) -> None:
+        data = {"version": "1.0", "last_updated": "", "entries": []}
+        try:
+            if self.path.exists():
+                with open(self.path) as f:
+                    data = json.load(f)
+        except Exception:
+            pass
+
+        self._meta = {k: v for k, v in data.items() if k != "entries"}
+        self._entries = []
+        self._index = {}
+        for entry in data.get("entries", []):
+            self._add(entry, overwrite=False)
+
+        # Replay entries written since the last flush
+        self._pending = 0
+        if self.journal_path.exists():
+            with open(self.journal_path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # torn final line from an interrupted write
+                    self._add(entry, overwrite=True)
+                    self._pending += 1
+
+        self._seen = self._signatures()
+
+    def _ensure_loaded(self) -> None:
+        if self._seen is None or self._signatures() != self._seen:
+            self._load()
+
+    def _add(self, entry: Dict, overwrite: bool) -> bool:
+        ticker, earnings_date = _key(entry)
+        by_date = self._index.setdefault(ticker, {})
+        pos = by_date.get(earnings_date)
+
+        if pos is None:
+            by_date[earnings_date] = len(self._entries)
+            self._entries.append(entry)
+            return True
+        if not overwrite:
+            return False
+
+        # Replace in place so snapshot order is preserved
+        self._entries[pos] = entry
+        return True
+
+    # -------------------------------------------------------------------------
+    # Reads
+    # -------------------------------------------------------------------------
+
+    def entries(self) -> List[Dict]:
+        with self._lock:
+            self._ensure_loaded()
+            return list(self._entries)
+
+    def get(self, ticker: str, earnings_date: str) -> Optional[Dict]:
+        with self._lock:
+            self._ensure_loaded()
+            pos = self._index.get(ticker.upper(), {}).get(earnings_date)
+            return self._entries[pos] if pos is not None else None
+
+    def latest(self, ticker: str) -> Optional[Dict]:
+        """Entry with the most recent earnings_date for a ticker."""
+        with self._lock:
+            self._ensure_loaded()
+            by_date = self._index.get(ticker.upper())
+            if not by_date:
+                return None
+            return self._entries[by_date[max(by_date)]]
+
+    # -------------------------------------------------------------------------
+    # Writes
+    # -------------------------------------------------------------------------
+
+    def upsert(self, entry: Dict, overwrite: bool = True) -> bool:
+        """
+        Insert (or with overwrite, replace) the entry for (ticker, earnings_date).
+        Returns False if nothing changed. The entry is journaled immediately.
+        """
+        if not entry.get("earnings_date"):
+            return False
+
+        with self._lock:
+            self._ensure_loaded()
+            if not self._add(entry, overwrite):
+                return False
+
+            self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.journal_path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+            self._pending += 1
+            self._seen = self._signatures()
+
+            if self._pending >= COMPACT_AFTER:
+                self._flush()
+            return True
+
+    def flush(self) -> bool:
+        """Rewrite the JSON snapshot with all journaled entries, then clear the journal."""
+        with self._lock:
+            if self._seen is None:
+                return True
+            self._ensure_loaded()
+            if not self._pending:
+                return True
+            return self._flush()
+
+    def _flush(self) -> bool:
+        data = dict(self._meta)
+        data["last_updated"] = datetime.now().strftime("%Y-%m-%d")
+        data["entries"] = self._entries
+
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp, "w") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp, self.path)
+            self.journal_path.unlink(missing_ok=True)
+        except OSError:
+            return False
+
+        self._meta = {k: v for k, v in data.items() if k != "entries"}
+        self._pending = 0
+        self._seen = self._signatures()
+        return True
+
+
+# =============================================================================
+# PROCESS-WIDE STORE
+# =============================================================================
+
+_store: Optional[EarningsEncyclopedia] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> EarningsEncyclopedia:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = EarningsEncyclopedia()
+        return _store
+
+
+def flush() -> bool:
+    """Write pending entries into the JSON snapshot (no-op if nothing changed)."""
+    with _store_lock:
+        store = _store
+    return store.flush() if store is not None else True
+
+
+atexit.register(flush)
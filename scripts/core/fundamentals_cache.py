@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+fundamentals_cache.py - Persistent Schwab fundamentals cache in data/cache/fundamentals.json
+Entries are keyed by symbol. Each holds the instrument's static fields
+(description, exchange, sector, industry, ...) and its valuation block
+(Schwab's "fundamental": P/E, market cap, yields, 52-week range, ...),
+each with its own fetch time: static fields keep for STATIC_TTL_SECONDS,
+valuation for VALUATION_TTL_SECONDS. Symbols Schwab returned nothing for
+are remembered for MISSING_TTL_SECONDS so they are not refetched on every
+sector lookup.
+
+Warm the cache for the coming week's earnings names with:
+    python scripts/core/fundamentals_cache.py --warm [--days 7]
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable
+
+WORKSPACE = Path(__file__).resolve().parent.parent.parent
+FUNDAMENTALS_CACHE_FILE = WORKSPACE / "data" / "cache" / "fundamentals.json"
+
+# Sector/industry and other identity fields change about once a year
+STATIC_TTL_SECONDS = 30 * 24 * 3600
+# Price-derived ratios in the valuation block
+VALUATION_TTL_SECONDS = 24 * 3600
+# Symbols with no instrument record
+MISSING_TTL_SECONDS = 24 * 3600
+
+VALUATION_KEY = "fundamental"
+
+_lock = threading.Lock()
+_cache = {"signature": None, "entries": {}}
+
+
+def _signature():
+    try:
+        st = os.stat(FUNDAMENTALS_CACHE_FILE)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _entries() -> Dict[str, Dict]:
+    """Entries by symbol, re-read only when the file changes. Caller holds the lock."""
+    signature = _signature()
+    if signature != _cache["signature"]:
+        entries = {}
+        try:
+            with open(FUNDAMENTALS_CACHE_FILE) as f:
+                data = json.load(f)
+            if isinstance(data, dict) and isinstance(data.get("symbols"), dict):
+                entries = data["symbols"]
+        except (OSError, ValueError):
+            pass
+        _cache.update(signature=signature, entries=entries)
+    return _cache["entries"]
+
+
+def get_fresh(symbols: Iterable[str], static_only: bool = False) -> Dict[str, Dict]:
+    """
+    Cached instruments for symbols whose static fields (and, unless
+    static_only, valuation block) are within TTL, as {symbol: instrument}.
+    Symbols known to have no record map to {}.
+    """
+    now = time.time()
+    with _lock:
+        entries = _entries()
+
+    fresh = {}
+    for symbol in symbols:
+        entry = entries.get(symbol.upper())
+        if not entry:
+            continue
+        if entry.get("missing"):
+            if now - entry.get("static_at", 0) <= MISSING_TTL_SECONDS:
+                fresh[symbol] = {}
+            continue
+        if now - entry.get("static_at", 0) > STATIC_TTL_SECONDS:
+            continue
+        instrument = dict(entry.get("static") or {})
+        if VALUATION_KEY in entry:
+            if now - entry.get("valuation_at", 0) <= VALUATION_TTL_SECONDS:
+                instrument[VALUATION_KEY] = entry[VALUATION_KEY]
+            elif not static_only:
+                continue
+        fresh[symbol] = instrument
+    return fresh
+
+
+def store(instruments: Dict[str, Dict]) -> None:
+    """Merge fetched {symbol: instrument} ({} = no record) into the cache file."""
+    if not instruments:
+        return
+
+    now = time.time()
+    with _lock:
+        entries = dict(_entries())
+        for symbol, instrument in instruments.items():
+            if not instrument:
+                # Never let a miss (possibly a symbol format mismatch) replace a real record
+                if not entries.get(symbol.upper(), {}).get("static"):
+                    entries[symbol.upper()] = {"missing": True, "static_at": now}
+                continue
+            entry = {
+                "static": {k: v for k, v in instrument.items() if k != VALUATION_KEY},
+                "static_at": now
+            }
+            if VALUATION_KEY in instrument:
+                entry[VALUATION_KEY] = instrument[VALUATION_KEY]
+                entry["valuation_at"] = now
+            entries[symbol.upper()] = entry
+
+        # Atomic replace so concurrent readers never see a half-written file
+        tmp = FUNDAMENTALS_CACHE_FILE.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            FUNDAMENTALS_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp, "w") as f:
+                json.dump({"symbols": entries}, f, separators=(",", ":"))
+            os.replace(tmp, FUNDAMENTALS_CACHE_FILE)
+        except OSError:
+            return
+        _cache.update(signature=_signature(), entries=entries)
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from data_providers import warm_fundamentals
+
+    parser = argparse.ArgumentParser(description="Schwab fundamentals cache")
+    parser.add_argument("--warm", action="store_true", help="Fetch fundamentals for upcoming earnings names")
+    parser.add_argument("--days", type=int, default=7, help="Days of the earnings calendar to warm (default 7)")
+    args = parser.parse_args()
+
+    if not args.warm:
+        parser.print_help()
+        sys.exit(0)
+    print(json.dumps(warm_fundamentals(args.days), indent=2))
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+indicators.py - Vectorized technical indicators over PriceSeries arrays
+Returns, SMAs, 52-week extremes, YTD anchor, largest N-day move,
+ATR, realized volatility and RSI, all computed with NumPy (no per-bar loops).
+"""
+
+from datetime import date
+from typing import Dict, Optional
+
+import numpy as np
+
+from price_series import PriceSeries
+
+TRADING_DAYS = 252
+
+# Wilder averages only look back this many periods (weight left ~2e-9), which
+# also keeps the discounted cumsum in wilder_smooth well inside float range
+WILDER_LOOKBACK = 20
+
+
+# =============================================================================
+# ROLLING PRIMITIVES
+# =============================================================================
+
+def wilder_smooth(values: np.ndarray, n: int) -> np.ndarray:
+    """
+    Wilder's smoothing (RMA): seed with the first n-bar mean, then
+    s[i] = s[i-1] + (x[i] - s[i-1]) / n. Expressed as a discounted cumulative
+    sum so it runs without a Python loop. NaN before the seed.
+    """
+    out = np.full(len(values), np.nan)
+    if n <= 0 or len(values) < n:
+        return out
+
+    alpha = 1.0 / n
+    decay = 1.0 - alpha
+    seed = values[:n].mean()
+    tail = values[n:]
+
+    # s[k] = decay^k * seed + alpha * sum_{j<=k} decay^(k-j) * x[j]
+    k = np.arange(1, len(tail) + 1)
+    powers = decay ** k
+    with np.errstate(over="ignore", divide="ignore", invalid="ignore"):
+        weighted = np.cumsum(tail / powers)
+        smoothed = powers * (seed + alpha * weighted)
+
+    out[n - 1] = seed
+    out[n:] = smoothed
+    return out
+
+
+# =============================================================================
+# INDICATORS
+# =============================================================================
+
+def sma(series: PriceSeries, n: int) -> Optional[float]:
+    """Latest n-bar simple moving average of closes, or None."""
+    if len(series) < n:
+        return None
+    return float(series.close[-n:].mean())
+
+
+def rsi(series: PriceSeries, n: int = 14) -> Optional[float]:
+    """Latest Wilder RSI of closes, or None."""
+    if len(series) <= n:
+        return None
+    delta = np.diff(series.close[-(n * WILDER_LOOKBACK + 1):])
+    avg_gain = wilder_smooth(np.clip(delta, 0, None), n)[-1]
+    avg_loss = wilder_smooth(np.clip(-delta, 0, None), n)[-1]
+    if not np.isfinite(avg_gain) or not np.isfinite(avg_loss):
+        return None
+    if avg_loss == 0:
+        return 100.0
+    return float(100 - 100 / (1 + avg_gain / avg_loss))
+
+
+def atr(series: PriceSeries, n: int = 14) -> Optional[float]:
+    """Latest Wilder average true range, or None if highs/lows are missing."""
+    if len(series) <= n:
+        return None
+    bars = series.tail(n * WILDER_LOOKBACK + 1)
+    high, low, prev_close = bars.high[1:], bars.low[1:], bars.close[:-1]
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    if not np.all(np.isfinite(true_range[-n:])):
+        return None
+    value = wilder_smooth(np.nan_to_num(true_range), n)[-1]
+    return float(value) if np.isfinite(value) else None
+
+
+def realized_volatility(series: PriceSeries, n: int = 20) -> Optional[float]:
+    """Annualized standard deviation of the last n daily log returns, or None."""
+    if len(series) <= n:
+        return None
+    closes = series.close[-(n + 1):]
+    if np.any(closes <= 0):
+        return None
+    log_returns = np.diff(np.log(closes))
+    return float(log_returns.std(ddof=1) * np.sqrt(TRADING_DAYS))
+
+
+def max_move(series: PriceSeries, max_span: int = 2) -> Optional[Dict]:
+    """
+    Largest absolute close-to-close move over 1..max_span bars.
+    Shorter spans win ties. Returns {index, span, before, after, magnitude}
+    with magnitude in percent, or None when there are too few bars.
+    """
+    best = None
+    for span in range(1, max_span + 1):
+        moves = np.abs(series.returns(span))
+        if not len(moves) or not np.any(np.isfinite(moves)):
+            continue
+        i = int(np.nanargmax(moves))
+        magnitude = float(moves[i]) * 100
+        if best is None or magnitude > best["magnitude"]:
+            best = {
+                "index": i + span,
+                "span": span,
+                "before": float(series.close[i]),
+                "after": float(series.close[i + span]),
+                "magnitude": magnitude
+            }
+    return best
+
+
+def compute_indicators(series: PriceSeries, today: Optional[date] = None) -> Dict:
+    """
+    Every indicator the analysis engine uses, computed in one pass over
+    the series arrays. Missing values are None.
+    """
+    if today is None:
+        today = date.today()
+
+    if not len(series):
+        return {"bars": 0}
+
+    close = series.close
+    current = float(close[-1])
+
+    year = series.since(today.replace(month=1, day=1))
+    last_52w = series.since(np.datetime64(today, "D") - np.timedelta64(365, "D"))
+
+    return {
+        "bars": len(series),
+        "current": current,
+        "sma_20": sma(series, 20),
+        "sma_50": sma(series, 50),
+        "high_20": float(close[-20:].max()),
+        "low_20": float(close[-20:].min()),
+        "high_52w": float(last_52w.close.max()) if len(last_52w) else None,
+        "low_52w": float(last_52w.close.min()) if len(last_52w) else None,
+        "ytd_anchor": float(year.close[0]) if len(year) else None,
+        "atr_14": atr(series, 14),
+        "realized_vol_20": realized_volatility(series, 20),
+        "rsi_14": rsi(series, 14),
+    }
+
+
+def pct_change(current: float, reference: Optional[float]) -> Optional[float]:
+    """Percent change from reference to current, or None if reference is unusable."""
+    if not reference or reference <= 0:
+        return None
+    return (current - reference) / reference * 100
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+ohlcv_store.py - Persistent daily OHLCV store
+One compact columnar binary file per ticker under data/prices/. Only the
+missing tail since the last stored bar is fetched from Yahoo; any range up
+to the backfilled depth is then served from disk.
+
+File layout (little-endian):
+    header  magic "OHLC", version, column count, bar count,
+            backfilled days, last sync time (epoch seconds)
+    columns ts (int64), open, high, low, close, volume (float64),
+            each stored as one contiguous block of `count` values
+"""
+
+import os
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from provider_transport import fetch_json
+from price_series import COLUMNS, PriceSeries, empty_columns, parse_yahoo_chart
+
+WORKSPACE = Path(__file__).resolve().parent.parent.parent
+STORE_DIR = Path(os.environ.get("OHLCV_STORE_DIR", WORKSPACE / "data" / "prices"))
+
+YAHOO_CHART_URL = "https://query1.finance.yahoo.com/v8/finance/chart/{ticker}"
+
+# First fetch for a ticker pulls this much history so 90d/1y reads never refetch
+BACKFILL_DAYS = 730
+
+# A synced ticker is not re-checked for new bars within this window
+REFRESH_SECONDS = 900
+
+# Re-fetch this many trailing days on every sync so a partial intraday bar
+# (or a late correction) is replaced rather than kept forever
+TAIL_OVERLAP_DAYS = 3
+
+MAGIC = b"OHLC"
+VERSION = 1
+_HEADER = struct.Struct("<4sHHIId")
+_DISK_DTYPES = {name: ("<i8" if name == "ts" else "<f8") for name in COLUMNS}
+
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def _ticker_lock(ticker: str) -> threading.Lock:
+    with _locks_guard:
+        lock = _locks.get(ticker)
+        if lock is None:
+            lock = _locks[ticker] = threading.Lock()
+        return lock
+
+
+def _path(ticker: str) -> Path:
+    safe = ticker.upper().replace("^", "_").replace("/", "_")
+    return STORE_DIR / f"{safe}.ohlcv"
+
+
+# =============================================================================
+# DISK I/O
+# =============================================================================
+
+def read_file(ticker: str) -> Tuple[Dict[str, np.ndarray], Dict]:
+    """
+    Read a ticker's columns and header meta. Columns are read-only views
+    over the file bytes. Missing/corrupt files read as empty.
+    """
+    meta = {"count": 0, "backfill_days": 0, "synced_at": 0.0}
+
+    path = _path(ticker)
+    if not path.exists():
+        return empty_columns(), meta
+
+    try:
+        raw = path.read_bytes()
+        magic, version, ncols, count, backfill_days, synced_at = _HEADER.unpack_from(raw, 0)
+        if magic != MAGIC or version != VERSION or ncols != len(COLUMNS):
+            return empty_columns(), meta
+
+        cols = {}
+        offset = _HEADER.size
+        for name in COLUMNS:
+            cols[name] = np.frombuffer(raw, dtype=_DISK_DTYPES[name], count=count, offset=offset)
+            offset += count * 8
+    except (OSError, struct.error, ValueError):
+        return empty_columns(), meta
+
+    meta = {"count": count, "backfill_days": backfill_days, "synced_at": synced_at}
+    return cols, meta
+
+
+def write_file(ticker: str, cols: Dict[str, np.ndarray], backfill_days: int, synced_at: float) -> None:
+    """Atomically rewrite a ticker file (temp file + rename)."""
+    STORE_DIR.mkdir(parents=True, exist_ok=True)
+    path = _path(ticker)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+
+    count = len(cols["ts"])
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(COLUMNS), count, backfill_days, synced_at))
+        for name in COLUMNS:
+            f.write(np.ascontiguousarray(cols[name], dtype=_DISK_DTYPES[name]).tobytes())
+    os.replace(tmp, path)
+
+
+# =============================================================================
+# YAHOO FETCH + MERGE
+# =============================================================================
+
+def _fetch_bars(ticker: str, params: Dict):
+    """Fetch daily bars from Yahoo as column arrays. None on any failure."""
+    resp = fetch_json(YAHOO_CHART_URL.format(ticker=ticker),
+                      params=dict(params, interval="1d"), timeout=15)
+    if not resp["ok"]:
+        return None
+    return parse_yahoo_chart(resp["data"])
+
+
+def _merge(old: Dict[str, np.ndarray], new: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Union of two column sets keyed by UTC trading day; new bars win."""
+    combined = {name: np.concatenate([old[name], new[name]]) for name in COLUMNS}
+    day = combined["ts"] // 86400
+
+    # Last occurrence of each day wins: unique over the reversed keys
+    _, rev_idx = np.unique(day[::-1], return_index=True)
+    keep = len(day) - 1 - rev_idx  # already in ascending day order
+    return {name: col[keep] for name, col in combined.items()}
+
+
+def sync(ticker: str, days: int, force: bool = False) -> Dict[str, np.ndarray]:
+    """
+    Make sure the store holds at least `days` of history for ticker and that
+    its tail is fresh, fetching only what is missing. Returns all stored columns.
+    Network failures fall back to whatever is already on disk.
+    """
+    ticker = ticker.upper()
+
+    with _ticker_lock(ticker):
+        cols, meta = read_file(ticker)
+        now = time.time()
+
+        if meta["backfill_days"] < days or not len(cols["ts"]):
+            backfill = max(days, BACKFILL_DAYS)
+            fetched = _fetch_bars(ticker, {"period1": int(now) - backfill * 86400,
+                                           "period2": int(now)})
+            if fetched is None or not len(fetched["ts"]):
+                return cols
+            merged = _merge(cols, fetched)
+            write_file(ticker, merged, backfill, now)
+            return merged
+
+        if not force and now - meta["synced_at"] < REFRESH_SECONDS:
+            return cols
+
+        period1 = int(cols["ts"][-1]) - TAIL_OVERLAP_DAYS * 86400
+        fetched = _fetch_bars(ticker, {"period1": period1, "period2": int(now)})
+        if fetched is None:
+            return cols
+
+        merged = _merge(cols, fetched) if len(fetched["ts"]) else cols
+        write_file(ticker, merged, meta["backfill_days"], now)
+        return merged
+
+
+# =============================================================================
+# READS
+# =============================================================================
+
+def get_series(ticker: str, days: int) -> PriceSeries:
+    """PriceSeries for the trailing `days` calendar days (Yahoo range=Nd semantics)."""
+    return PriceSeries(ticker, sync(ticker, days)).window(days)
+
+
+def store_stats() -> Dict:
+    """Ticker count and total bytes held on disk."""
+    if not STORE_DIR.exists():
+        return {"tickers": 0, "bytes": 0}
+    files = list(STORE_DIR.glob("*.ohlcv"))
+    return {"tickers": len(files), "bytes": sum(f.stat().st_size for f in files)}
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+options_analytics.py - Vectorized options chain analytics
+A chain is laid out as flat NumPy arrays, one row per (expiration, strike),
+grouped by expiration (sorted by date) and sorted by strike within each
+group, with call and put columns aligned on the union of their strikes.
+Per-expiration ATM selection, straddle/expected move, call/put skew,
+25-delta skew, strangle-based expected move and the IV term structure are
+computed for every expiration at once.
+
+Built from the compact snapshots in chain_store (or any Schwab-shaped chain).
+"""
+
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import chain_store
+
+# Per-contract columns used by the analytics
+FIELDS = ("bid", "ask", "mark", "openInterest", "volatility", "delta")
+
+# Liquidity filter for a tradable ATM strike (both sides)
+MIN_OPEN_INTEREST = 50
+
+# Delta targeted by 25-delta skew, and how far from it a strike may be;
+# narrow strike windows often stop short of 25 delta (skew is then NaN)
+SKEW_DELTA = 0.25
+SKEW_DELTA_TOLERANCE = 0.05
+
+
+class OptionsChain:
+    """Flat per-strike arrays for a chain; rows offsets[i]:offsets[i + 1] belong to expirations[i]."""
+
+    __slots__ = ("symbol", "underlying", "expirations", "exp_keys", "dte", "offsets",
+                 "exp_idx", "strike", "call", "put", "_index")
+
+    def __init__(self, symbol, underlying, exp_keys, strikes_by_exp, call_rows, put_rows):
+        self.symbol = symbol
+        self.underlying = float(underlying or 0)
+        self.exp_keys = exp_keys
+        self.expirations = [key.split(":")[0] for key in exp_keys]
+        self.dte = np.array([_key_dte(key) for key in exp_keys], dtype=np.int64)
+        sizes = [len(s) for s in strikes_by_exp]
+        self.offsets = np.concatenate(([0], np.cumsum(sizes))).astype(np.int64)
+        self.exp_idx = np.repeat(np.arange(len(exp_keys)), sizes)
+        self.strike = np.concatenate(strikes_by_exp) if strikes_by_exp else np.empty(0)
+        self.call = {name: np.concatenate(cols) if cols else np.empty(0) for name, cols in call_rows.items()}
+        self.put = {name: np.concatenate(cols) if cols else np.empty(0) for name, cols in put_rows.items()}
+        self._index = {exp: i for i, exp in enumerate(self.expirations)}
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Dict) -> "OptionsChain":
+        """From a chain_store compact snapshot (per-expiration strike/field arrays)."""
+        calls = snapshot.get("call") or {}
+        puts = snapshot.get("put") or {}
+        exp_keys = sorted(set(calls) | set(puts), key=lambda key: key.split(":")[0])
+
+        strikes_by_exp = []
+        columns = ("present",) + FIELDS
+        call_rows = {name: [] for name in columns}
+        put_rows = {name: [] for name in columns}
+        kept = []
+        for key in exp_keys:
+            call_side = calls.get(key) or {"strike": []}
+            put_side = puts.get(key) or {"strike": []}
+            strikes = np.union1d(np.asarray(call_side["strike"], dtype=float),
+                                 np.asarray(put_side["strike"], dtype=float))
+            if not len(strikes):
+                continue
+            kept.append(key)
+            strikes_by_exp.append(strikes)
+            _align(call_side, strikes, call_rows)
+            _align(put_side, strikes, put_rows)
+        return cls(snapshot.get("symbol"), snapshot.get("underlyingPrice"), kept,
+                   strikes_by_exp, call_rows, put_rows)
+
+    @classmethod
+    def from_chain(cls, chain: Dict) -> "OptionsChain":
+        """From a Schwab-shaped chain (callExpDateMap/putExpDateMap)."""
+        return cls.from_snapshot(chain_store.compact(chain))
+
+    def expiration_index(self, expiration: str) -> Optional[int]:
+        return self._index.get(expiration)
+
+    def __len__(self) -> int:
+        return len(self.exp_keys)
+
+
+def _key_dte(key: str) -> int:
+    try:
+        return int(key.split(":")[1])
+    except (IndexError, ValueError):
+        return 0
+
+
+def _align(side: Dict, strikes: np.ndarray, rows: Dict[str, list]) -> None:
+    """Scatter one side's columns onto the expiration's strike union (NaN where absent)."""
+    own = np.asarray(side["strike"], dtype=float)
+    at = np.searchsorted(strikes, own)
+    present = np.zeros(len(strikes), dtype=bool)
+    present[at] = True
+    rows["present"].append(present)
+    for name in FIELDS:
+        column = np.full(len(strikes), np.nan)
+        values = side.get(name)
+        if values is not None and len(own):
+            column[at] = np.array([np.nan if v is None else v for v in values], dtype=float)
+        rows[name].append(column)
+
+
+def as_options_chain(chain) -> OptionsChain:
+    """Accept an OptionsChain, a compact snapshot or a Schwab-shaped chain."""
+    if isinstance(chain, OptionsChain):
+        return chain
+    if "callExpDateMap" in chain or "putExpDateMap" in chain:
+        return OptionsChain.from_chain(chain)
+    return OptionsChain.from_snapshot(chain)
+
+
+# =============================================================================
+# VECTORIZED PASSES
+# =============================================================================
+
+def liquid_mask(chain: OptionsChain, min_open_interest: int = MIN_OPEN_INTEREST) -> np.ndarray:
+    """Rows where both sides have positive bid/ask and open interest >= min_open_interest."""
+    call, put = chain.call, chain.put
+    with np.errstate(invalid="ignore"):
+        return ((call["bid"] > 0) & (put["bid"] > 0) & (call["ask"] > 0) & (put["ask"] > 0)
+                & (call["openInterest"] >= min_open_interest) & (put["openInterest"] >= min_open_interest))
+
+
+def group_argmin(chain: OptionsChain, distance: np.ndarray) -> np.ndarray:
+    """
+    Row of the smallest distance in each expiration (lowest strike on ties),
+    or -1 where every row is excluded (distance inf/NaN).
+    """
+    if not len(chain):
+        return np.empty(0, dtype=np.int64)
+    distance = np.where(np.isnan(distance), np.inf, distance)
+    order = np.lexsort((distance, chain.exp_idx))
+    first = order[chain.offsets[:-1]]
+    return np.where(np.isfinite(distance[first]), first, -1)
+
+
+def _take(values: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """values[rows] with NaN where rows is -1."""
+    out = np.full(len(rows), np.nan)
+    ok = rows >= 0
+    out[ok] = values[rows[ok]]
+    return out
+
+
+def _neighbour(chain: OptionsChain, rows: np.ndarray, step: int) -> np.ndarray:
+    """Row `step` strikes away within the same expiration (rows[i] belongs to expiration i), or -1."""
+    moved = rows + step
+    inside = (rows >= 0) & (moved >= chain.offsets[:-1]) & (moved < chain.offsets[1:])
+    return np.where(inside, moved, -1)
+
+
+def expiration_metrics(chain: OptionsChain, liquid: bool = False,
+                       min_open_interest: int = MIN_OPEN_INTEREST) -> Dict[str, np.ndarray]:
+    """
+    Per-expiration arrays (NaN where unavailable): atm_row, atm_strike,
+    call_mark, put_mark, straddle, em_percent, atm_iv, call_put_skew,
+    skew_25d, strangle, strangle_em_percent. A missing mark counts as 0
+    in the straddle.
+
+    The ATM strike is the call strike nearest the underlying; with
+    liquid=True, the nearest strike that passes liquid_mask.
+    """
+    underlying = chain.underlying
+    call, put = chain.call, chain.put
+
+    eligible = liquid_mask(chain, min_open_interest) if liquid else call["present"]
+    atm_row = group_argmin(chain, np.where(eligible, np.abs(chain.strike - underlying), np.inf))
+
+    call_quoted = _take(call["mark"], atm_row)
+    put_quoted = _take(put["mark"], atm_row)
+    call_mark = np.nan_to_num(call_quoted)
+    put_mark = np.nan_to_num(put_quoted)
+    straddle = call_mark + put_mark
+    with np.errstate(divide="ignore", invalid="ignore"):
+        em_percent = np.where((straddle > 0) & (underlying > 0), straddle / underlying * 100, np.nan)
+        call_put_skew = np.where((call_mark > 0) & (put_mark > 0), (call_mark - put_mark) / put_mark * 100, 0.0)
+
+    # ATM IV: average of both sides when both are quoted, else whichever is.
+    # Non-positive IVs (Schwab reports missing IV as -999) count as unquoted.
+    with np.errstate(invalid="ignore"):
+        call_iv = _take(call["volatility"], atm_row)
+        put_iv = _take(put["volatility"], atm_row)
+        call_ok, put_ok = call_iv > 0, put_iv > 0
+    atm_iv = np.where(call_ok & put_ok, (call_iv + put_iv) / 2,
+                      np.where(call_ok, call_iv, np.where(put_ok, put_iv, np.nan)))
+
+    # 25-delta skew: put IV minus call IV at the strikes nearest +/-0.25 delta,
+    # only where such a strike is within SKEW_DELTA_TOLERANCE and has an IV
+    with np.errstate(invalid="ignore"):
+        call_gap = np.abs(call["delta"] - SKEW_DELTA)
+        put_gap = np.abs(put["delta"] + SKEW_DELTA)
+        call_25 = group_argmin(chain, np.where((call_gap <= SKEW_DELTA_TOLERANCE) & (call["volatility"] > 0),
+                                               call_gap, np.inf))
+        put_25 = group_argmin(chain, np.where((put_gap <= SKEW_DELTA_TOLERANCE) & (put["volatility"] > 0),
+                                              put_gap, np.inf))
+    skew_25d = _take(put["volatility"], put_25) - _take(call["volatility"], call_25)
+
+    # First OTM strangle (call one strike up, put one strike down); the
+    # expected move is the average of the ATM straddle and that strangle
+    strangle = _take(call["mark"], _neighbour(chain, atm_row, 1)) + _take(put["mark"], _neighbour(chain, atm_row, -1))
+    with np.errstate(invalid="ignore"):
+        strangle_em_percent = np.where((strangle > 0) & (straddle > 0) & (underlying > 0),
+                                       (straddle + strangle) / 2 / underlying * 100, np.nan)
+
+    return {
+        "atm_row": atm_row,
+        "atm_strike": _take(chain.strike, atm_row),
+        "call_mark": call_quoted,
+        "put_mark": put_quoted,
+        "straddle": np.where(atm_row >= 0, straddle, np.nan),
+        "em_percent": em_percent,
+        "atm_iv": atm_iv,
+        "call_put_skew": np.where(atm_row >= 0, call_put_skew, np.nan),
+        "skew_25d": skew_25d,
+        "strangle": strangle,
+        "strangle_em_percent": strangle_em_percent,
+    }
+
+
+def _num(value) -> Optional[float]:
+    return None if value is None or np.isnan(value) else float(value)
+
+
+def expiration_summary(chain, expiration: str, liquid: bool = False,
+                       metrics: Optional[Dict[str, np.ndarray]] = None) -> Optional[Dict]:
+    """Metrics of one expiration (YYYY-MM-DD) as plain floats, or None if not in the chain."""
+    chain = as_options_chain(chain)
+    i = chain.expiration_index(expiration)
+    if i is None:
+        return None
+    metrics = metrics if metrics is not None else expiration_metrics(chain, liquid=liquid)
+    summary = {name: _num(values[i]) for name, values in metrics.items() if name != "atm_row"}
+    summary.update(expiration=expiration, dte=int(chain.dte[i]), underlying_price=chain.underlying)
+    return summary
+
+
+def iv_term_structure(chain, metrics: Optional[Dict[str, np.ndarray]] = None) -> List[Dict]:
+    """[{expiration, dte, atm_iv, em_percent}] across all expirations with an ATM strike."""
+    chain = as_options_chain(chain)
+    metrics = metrics if metrics is not None else expiration_metrics(chain)
+    return [
+        {
+            "expiration": chain.expirations[i],
+            "dte": int(chain.dte[i]),
+            "atm_iv": _num(np.round(metrics["atm_iv"][i], 1)),
+            "em_percent": _num(np.round(metrics["em_percent"][i], 2))
+        }
+        for i in np.flatnonzero(metrics["atm_row"] >= 0)
+    ]
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+price_series.py - Array-backed daily price series
+The one Yahoo chart parser and the PriceSeries type shared by the analysis,
+probability and risk engines. Bars live in parallel NumPy arrays; windows,
+returns and lookups are vectorized.
+"""
+
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+COLUMNS = ("ts", "open", "high", "low", "close", "volume")
+DTYPES = {"ts": np.int64, "open": np.float64, "high": np.float64,
+          "low": np.float64, "close": np.float64, "volume": np.float64}
+
+
+def empty_columns() -> Dict[str, np.ndarray]:
+    return {name: np.empty(0, dtype=DTYPES[name]) for name in COLUMNS}
+
+
+def parse_yahoo_chart(payload: Dict) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Parse a Yahoo v8 chart response into column arrays.
+    Bars without a close are dropped; other missing fields become NaN.
+    Returns None if the payload has no chart result.
+    """
+    try:
+        result = payload["chart"]["result"][0]
+    except (KeyError, IndexError, TypeError):
+        return None
+
+    ts = np.asarray(result.get("timestamp") or [], dtype=np.int64)
+    quote = (result.get("indicators", {}).get("quote") or [{}])[0]
+    n = len(ts)
+
+    cols = {"ts": ts}
+    for name in COLUMNS[1:]:
+        values = quote.get(name) or []
+        # None -> NaN; pad or trim so every column matches the timestamps
+        arr = np.array(values[:n], dtype=np.float64)
+        if len(arr) < n:
+            arr = np.concatenate([arr, np.full(n - len(arr), np.nan)])
+        cols[name] = arr
+
+    keep = np.isfinite(cols["close"])
+    return {name: col[keep] for name, col in cols.items()}
+
+
+def _local_utc_offset(ts: int) -> int:
+    return int(datetime.fromtimestamp(ts).astimezone().utcoffset().total_seconds())
+
+
+class PriceSeries:
+    """
+    Daily bars for one ticker, oldest first.
+
+    ts holds epoch seconds (int64); open/high/low/close/volume are float64
+    arrays of the same length. Slicing methods return views, not copies.
+    """
+
+    __slots__ = ("ticker", "ts", "open", "high", "low", "close", "volume", "_days")
+
+    def __init__(self, ticker: str, columns: Optional[Dict[str, np.ndarray]] = None):
+        columns = columns or empty_columns()
+        self.ticker = ticker.upper()
+        for name in COLUMNS:
+            setattr(self, name, np.asarray(columns[name], dtype=DTYPES[name]))
+        self._days = None
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def __repr__(self) -> str:
+        if not len(self):
+            return f"PriceSeries({self.ticker}, empty)"
+        return f"PriceSeries({self.ticker}, {len(self)} bars, {self.date_strings()[0]}..{self.date_strings()[-1]})"
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        return {name: getattr(self, name) for name in COLUMNS}
+
+    def _slice(self, start: int, stop: Optional[int] = None) -> "PriceSeries":
+        return PriceSeries(self.ticker, {name: getattr(self, name)[start:stop] for name in COLUMNS})
+
+    # -------------------------------------------------------------------------
+    # Dates
+    # -------------------------------------------------------------------------
+
+    @property
+    def days(self) -> np.ndarray:
+        """Local calendar date of each bar as datetime64[D] (computed once)."""
+        if self._days is None:
+            if len(self):
+                offset = _local_utc_offset(int(self.ts[-1]))
+                self._days = ((self.ts + offset) // 86400).astype("datetime64[D]")
+            else:
+                self._days = np.empty(0, dtype="datetime64[D]")
+        return self._days
+
+    def date_strings(self) -> List[str]:
+        return np.datetime_as_string(self.days, unit="D").tolist()
+
+    # -------------------------------------------------------------------------
+    # Windows and lookups
+    # -------------------------------------------------------------------------
+
+    def window(self, days: int, now: Optional[float] = None) -> "PriceSeries":
+        """Trailing `days` calendar days (Yahoo range=Nd semantics)."""
+        if now is None:
+            now = datetime.now().timestamp()
+        start = int(np.searchsorted(self.ts, now - days * 86400, side="left"))
+        return self._slice(start)
+
+    def tail(self, n: int) -> "PriceSeries":
+        return self._slice(max(0, len(self) - n))
+
+    def since(self, day) -> "PriceSeries":
+        """Bars on or after a date (date, 'YYYY-MM-DD' or datetime64)."""
+        start = int(np.searchsorted(self.days, np.datetime64(_as_date(day), "D"), side="left"))
+        return self._slice(start)
+
+    def index_on_or_before(self, day) -> Optional[int]:
+        """Index of the last bar on or before `day`, or None."""
+        idx = int(np.searchsorted(self.days, np.datetime64(_as_date(day), "D"), side="right")) - 1
+        return idx if idx >= 0 else None
+
+    def close_on_or_before(self, day) -> Optional[float]:
+        idx = self.index_on_or_before(day)
+        return float(self.close[idx]) if idx is not None else None
+
+    # -------------------------------------------------------------------------
+    # Returns
+    # -------------------------------------------------------------------------
+
+    def returns(self, periods: int = 1) -> np.ndarray:
+        """Simple returns close[i] / close[i - periods] - 1 (length n - periods)."""
+        if len(self) <= periods:
+            return np.empty(0)
+        prev = self.close[:-periods]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(prev > 0, self.close[periods:] / prev - 1, np.nan)
+
+    def change(self) -> Optional[float]:
+        """Return from first to last close in the series, or None."""
+        if len(self) < 2 or not self.close[0]:
+            return None
+        return float(self.close[-1] / self.close[0] - 1)
+
+    # -------------------------------------------------------------------------
+    # Legacy views
+    # -------------------------------------------------------------------------
+
+    def to_timeline(self) -> List[Dict]:
+        """[{date, price, change%}] as produced by the old data_providers parser."""
+        if not len(self):
+            return []
+        change_pct = np.zeros(len(self))
+        change_pct[1:] = np.nan_to_num(self.returns() * 100)
+        return [
+            {"date": d, "price": p, "change%": c}
+            for d, p, c in zip(self.date_strings(),
+                               np.round(self.close, 2).tolist(),
+                               np.round(change_pct, 2).tolist())
+        ]
+
+
+def _as_date(day) -> date:
+    if isinstance(day, str):
+        return datetime.strptime(day, "%Y-%m-%d").date()
+    if isinstance(day, datetime):
+        return day.date()
+    if isinstance(day, np.datetime64):
+        return day.astype("datetime64[D]").astype(date)
+    return day
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+price_store.py - Memoizing price-history store
+Request-scoped (one analyze_single call) and run-scoped (one batch) caches
+so each price series is fetched once and shorter windows are sliced from it.
+"""
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional
+
+from price_series import PriceSeries
+
+Fetcher = Callable[[str, int], PriceSeries]
+
+
+class PriceHistoryStore:
+    """
+    Holds the longest PriceSeries fetched per ticker.
+
+    A request for `days` is a hit when a series of at least that many days
+    is already held; the window is then sliced (as an array view) by
+    calendar cutoff, matching Yahoo's range=Nd semantics. Misses go to the
+    parent store (if any) or the fetcher.
+    """
+
+    def __init__(self, name: str, parent: Optional["PriceHistoryStore"] = None):
+        self.name = name
+        self.parent = parent
+        self.hits = 0
+        self.misses = 0
+        self.request_hits = 0
+        self._series: Dict[str, tuple] = {}  # ticker -> (days, PriceSeries)
+        self._lock = threading.Lock()
+        self._ticker_locks: Dict[str, threading.Lock] = {}
+
+    def _ticker_lock(self, ticker: str) -> threading.Lock:
+        with self._lock:
+            lock = self._ticker_locks.get(ticker)
+            if lock is None:
+                lock = self._ticker_locks[ticker] = threading.Lock()
+            return lock
+
+    def _lookup(self, ticker: str, days: int) -> Optional[PriceSeries]:
+        held = self._series.get(ticker)
+        if held is None or held[0] < days:
+            return None
+        self.hits += 1
+        held_days, series = held
+        return series if days >= held_days else series.window(days)
+
+    def get(self, ticker: str, days: int, fetcher: Fetcher) -> PriceSeries:
+        ticker = ticker.upper()
+
+        with self._lock:
+            cached = self._lookup(ticker, days)
+        if cached is not None:
+            return cached
+
+        # One fetch per ticker at a time; concurrent callers re-check after waiting
+        with self._ticker_lock(ticker):
+            with self._lock:
+                cached = self._lookup(ticker, days)
+                if cached is not None:
+                    return cached
+                self.misses += 1
+
+            if self.parent is not None:
+                series = self.parent.get(ticker, days, fetcher)
+            else:
+                series = fetcher(ticker, days)
+
+            # Only keep non-empty series so a failed fetch can be retried
+            if len(series):
+                with self._lock:
+                    held = self._series.get(ticker)
+                    if held is None or held[0] < days:
+                        self._series[ticker] = (days, series)
+
+        return series
+
+    def absorb(self, child: "PriceHistoryStore") -> None:
+        """Fold a finished request store's hits into this run's totals."""
+        with self._lock:
+            self.request_hits += child.hits
+
+    def stats(self) -> Dict:
+        with self._lock:
+            hits = self.hits + self.request_hits
+            total = hits + self.misses
+            return {
+                "scope": self.name,
+                "series": len(self._series),
+                "hits": hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / total, 3) if total else None
+            }
+
+
+# =============================================================================
+# SCOPES
+# =============================================================================
+
+_run_store: Optional[PriceHistoryStore] = None
+_run_lock = threading.Lock()
+
+# Request stores are per thread/task; the run store is shared by all workers
+_request_store: ContextVar[Optional[PriceHistoryStore]] = ContextVar("price_request_store", default=None)
+
+
+def active_store() -> Optional[PriceHistoryStore]:
+    """Innermost active store: request scope first, then run scope."""
+    return _request_store.get() or _run_store
+
+
+@contextmanager
+def run_scope():
+    """
+    Share price series across every analysis in a batch (e.g. sector ETFs).
+    Nested calls reuse the outer run store.
+    """
+    global _run_store
+    with _run_lock:
+        outer = _run_store
+        if outer is None:
+            _run_store = PriceHistoryStore("run")
+        store = _run_store
+
+    try:
+        yield store
+    finally:
+        if outer is None:
+            with _run_lock:
+                _run_store = None
+
+
+@contextmanager
+def request_scope():
+    """Memoize price series for one analysis; misses fall through to the run store."""
+    store = PriceHistoryStore("request", parent=_run_store)
+    token = _request_store.set(store)
+    try:
+        yield store
+    finally:
+        _request_store.reset(token)
+        if store.parent is not None:
+            store.parent.absorb(store)
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+provider_transport.py - Shared HTTP transport for data providers
+One pooled keep-alive session per process, per-host concurrency limits,
+structured results. A stub backend serves canned payloads for offline runs.
+"""
+
+import json
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+# Max in-flight requests per host (anything not listed uses DEFAULT_HOST_LIMIT)
+HOST_LIMITS = {
+    "query1.finance.yahoo.com": 8,
+    "api.nasdaq.com": 2,
+    "api.schwabapi.com": 4,
+}
+DEFAULT_HOST_LIMIT = 4
+
+# Sustained request rate per host (requests/second). Schwab market data
+# allows 120 req/min per app; Yahoo is unofficial, so stay polite.
+HOST_RATE_LIMITS = {
+    "query1.finance.yahoo.com": 8.0,
+    "api.schwabapi.com": 2.0,
+}
+
+# Connections kept alive per host
+POOL_SIZE = 16
+
+
+# =============================================================================
+# BACKENDS
+# =============================================================================
+
+class HttpBackend:
+    """Real network backend: one requests.Session with a keep-alive pool."""
+
+    def __init__(self, pool_size: int = POOL_SIZE):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(self, method: str, url: str, params: Optional[Dict] = None,
+                headers: Optional[Dict] = None, data: Any = None,
+                timeout: float = 15) -> Tuple[int, bytes]:
+        resp = self.session.request(method, url, params=params, headers=headers,
+                                    data=data, timeout=timeout)
+        return resp.status_code, resp.content
+
+
+StubRoute = Union[Dict, list, Callable[[str, Optional[Dict]], Any]]
+
+
+class StubBackend:
+    """
+    Offline backend for benchmarks and dry runs.
+
+    routes maps "host/path-prefix" to either a JSON-able payload or a
+    callable(url, params) returning one. The longest matching prefix wins;
+    a None payload (or no match) is served as a 404.
+    """
+
+    def __init__(self, routes: Optional[Dict[str, StubRoute]] = None, latency_ms: float = 0.0):
+        self.routes = dict(routes or {})
+        self.latency_ms = latency_ms
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def request(self, method: str, url: str, params: Optional[Dict] = None,
+                headers: Optional[Dict] = None, data: Any = None,
+                timeout: float = 15) -> Tuple[int, bytes]:
+        with self._lock:
+            self.calls += 1
+
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+        parts = urlsplit(url)
+        key = parts.netloc + parts.path
+        match = None
+        for prefix in self.routes:
+            if key.startswith(prefix) and (match is None or len(prefix) > len(match)):
+                match = prefix
+
+        if match is None:
+            return 404, b""
+
+        payload = self.routes[match]
+        if callable(payload):
+            payload = payload(url, params)
+        if payload is None:
+            return 404, b""
+
+        return 200, json.dumps(payload).encode()
+
+
+# =============================================================================
+# RATE LIMITING
+# =============================================================================
+
+class RateLimiter:
+    """Token bucket: `rate` requests/second with bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a request slot is available."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# =============================================================================
+# TRANSPORT
+# =============================================================================
+
+_backend = None
+_backend_lock = threading.Lock()
+
+_host_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+_semaphore_lock = threading.Lock()
+
+_rate_limiters: Dict[str, Optional[RateLimiter]] = {}
+_rate_lock = threading.Lock()
+
+_stats = defaultdict(lambda: {"requests": 0, "errors": 0, "total_ms": 0.0})
+_stats_lock = threading.Lock()
+
+
+def get_backend():
+    """Return the active backend, creating the pooled HTTP backend on first use."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = HttpBackend()
+        return _backend
+
+
+def set_backend(backend):
+    """Swap the active backend (e.g. a StubBackend). Returns the previous one."""
+    global _backend
+    with _backend_lock:
+        previous = _backend
+        _backend = backend
+        return previous
+
+
+def _host_semaphore(host: str) -> threading.BoundedSemaphore:
+    with _semaphore_lock:
+        sem = _host_semaphores.get(host)
+        if sem is None:
+            sem = threading.BoundedSemaphore(HOST_LIMITS.get(host, DEFAULT_HOST_LIMIT))
+            _host_semaphores[host] = sem
+        return sem
+
+
+def _rate_limiter(host: str) -> Optional[RateLimiter]:
+    with _rate_lock:
+        if host not in _rate_limiters:
+            rate = HOST_RATE_LIMITS.get(host)
+            _rate_limiters[host] = RateLimiter(rate) if rate else None
+        return _rate_limiters[host]
+
+
+def set_rate_limit(host: str, per_second: Optional[float]) -> None:
+    """Override (or with None, remove) the request rate limit for a host."""
+    with _rate_lock:
+        _rate_limiters[host] = RateLimiter(per_second) if per_second else None
+
+
+def _record(host: str, ok: bool, elapsed_ms: float) -> None:
+    with _stats_lock:
+        entry = _stats[host]
+        entry["requests"] += 1
+        entry["total_ms"] += elapsed_ms
+        if not ok:
+            entry["errors"] += 1
+
+
+def _result(ok: bool, host: str, elapsed_ms: float, status: Optional[int] = None,
+            data: Any = None, error: Optional[str] = None) -> Dict:
+    _record(host, ok, elapsed_ms)
+    return {
+        "ok": ok,
+        "status": status,
+        "data": data,
+        "error": error,
+        "host": host,
+        "elapsed_ms": round(elapsed_ms, 1)
+    }
+
+
+def fetch_json(url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None,
+               timeout: float = 15, method: str = "GET", data: Any = None) -> Dict:
+    """
+    Perform a request through the shared transport and decode the JSON body.
+
+    Never raises. Returns {ok, status, data, error, host, elapsed_ms};
+    data is the decoded JSON when ok is True.
+    """
+    host = urlsplit(url).netloc
+    merged_headers = dict(DEFAULT_HEADERS)
+    if headers:
+        merged_headers.update(headers)
+
+    limiter = _rate_limiter(host)
+    if limiter is not None:
+        limiter.acquire()
+
+    start = time.perf_counter()
+    try:
+        with _host_semaphore(host):
+            status, body = get_backend().request(method, url, params=params,
+                                                 headers=merged_headers, data=data,
+                                                 timeout=timeout)
+    except Exception as e:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        return _result(False, host, elapsed_ms, error=f"{type(e).__name__}: {e}")
+
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    if status != 200:
+        return _result(False, host, elapsed_ms, status=status, error=f"HTTP {status}")
+
+    try:
+        payload = json.loads(body)
+    except (ValueError, TypeError) as e:
+        return _result(False, host, elapsed_ms, status=status, error=f"Invalid JSON: {e}")
+
+    return _result(True, host, elapsed_ms, status=status, data=payload)
+
+
+def transport_stats() -> Dict[str, Dict]:
+    """Per-host request/error counts and cumulative latency since last reset."""
+    with _stats_lock:
+        return {
+            host: {
+                "requests": s["requests"],
+                "errors": s["errors"],
+                "avg_ms": round(s["total_ms"] / s["requests"], 1) if s["requests"] else 0.0
+            }
+            for host, s in _stats.items()
+        }
+
+
+def reset_transport_stats() -> None:
+    with _stats_lock:
+        _stats.clear()
+
+
+# =============================================================================
+# OFFLINE BENCHMARK
+# =============================================================================
+
+YAHOO_HOST = "query1.finance.yahoo.com"
+
+
+def _synthetic_chart(url: str, params: Optional[Dict]) -> Dict:
+    """Yahoo-shaped chart payload with 90 daily bars."""
+    now = int(time.time())
+    timestamps = [now - (90 - i) * 86400 for i in range(90)]
+    closes = [100.0 + (i % 7) - 3 for i in range(90)]
+    return {
+        "chart": {
+            "result": [{
+                "meta": {"regularMarketPrice": closes[-1], "regularMarketVolume": 1_000_000},
+                "timestamp": timestamps,
+                "indicators": {"quote": [{"close": closes}]}
+            }]
+        }
+    }
+
+
+def benchmark(tickers: int = 40, latency_ms: float = 20.0) -> Dict:
+    """Run the Yahoo provider calls against a stub backend and report timings."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    import tempfile
+
+    # Import by module name so this works the same when run as __main__
+    import provider_transport as transport
+    import ohlcv_store
+    from data_providers import get_price_history, get_basic_quote
+
+    # Keep benchmark bars out of the real price store
+    ohlcv_store.STORE_DIR = Path(tempfile.mkdtemp(prefix="ohlcv_bench_"))
+
+    stub = transport.StubBackend({"query1.finance.yahoo.com/v8/finance/chart/": _synthetic_chart},
+                                 latency_ms=latency_ms)
+    previous = transport.set_backend(stub)
+    transport.reset_transport_stats()
+    # Measure transport overhead, not the politeness limit
+    transport.set_rate_limit(YAHOO_HOST, None)
+    symbols = [f"T{i:03d}" for i in range(tickers)]
+
+    try:
+        start = time.perf_counter()
+        for symbol in symbols:
+            get_price_history(symbol, days=90)
+            get_basic_quote(symbol)
+        serial_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda s: (get_price_history(s, days=90), get_basic_quote(s)), symbols))
+        pooled_s = time.perf_counter() - start
+    finally:
+        transport.set_backend(previous)
+        transport.set_rate_limit(YAHOO_HOST, HOST_RATE_LIMITS.get(YAHOO_HOST))
+
+    return {
+        "tickers": tickers,
+        "stub_latency_ms": latency_ms,
+        "backend_calls": stub.calls,
+        "serial_seconds": round(serial_s, 3),
+        "threaded_seconds": round(pooled_s, 3),
+        "hosts": transport.transport_stats()
+    }
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    print(json.dumps(benchmark(), indent=2))
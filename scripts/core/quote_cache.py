@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+quote_cache.py - Short-TTL quote cache in data/quote_cache.json
+Shared with Mission Control: entries are keyed by symbol with markPrice and
+an ISO lastUpdated timestamp. Entries written by other tools are preserved.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable
+
+WORKSPACE = Path(__file__).resolve().parent.parent.parent
+QUOTE_CACHE_FILE = WORKSPACE / "data" / "quote_cache.json"
+
+# Quotes younger than this are served without a fetch
+QUOTE_TTL_SECONDS = 300
+
+_lock = threading.Lock()
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def _age_seconds(stamp: str, now: datetime) -> float:
+    try:
+        updated = datetime.fromisoformat(stamp.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return float("inf")
+    if updated.tzinfo is None:
+        updated = updated.replace(tzinfo=timezone.utc)
+    return (now - updated).total_seconds()
+
+
+def _load() -> Dict:
+    try:
+        with open(QUOTE_CACHE_FILE) as f:
+            data = json.load(f)
+        if isinstance(data, dict) and isinstance(data.get("quotes"), dict):
+            return data
+    except (OSError, ValueError):
+        pass
+    return {"lastQuoteUpdate": None, "quotes": {}}
+
+
+def get_fresh(symbols: Iterable[str], max_age: float = QUOTE_TTL_SECONDS) -> Dict[str, Dict]:
+    """
+    Cached quotes younger than max_age seconds, as {symbol: {price, volume, market_cap}}.
+    Entries without a positive price are treated as missing.
+    """
+    with _lock:
+        quotes = _load()["quotes"]
+
+    now = datetime.now(timezone.utc)
+    fresh = {}
+    for symbol in symbols:
+        entry = quotes.get(symbol.upper())
+        if not entry or not entry.get("markPrice") or entry["markPrice"] <= 0:
+            continue
+        if _age_seconds(entry.get("lastUpdated"), now) > max_age:
+            continue
+        fresh[symbol] = {
+            "price": float(entry["markPrice"]),
+            "volume": entry.get("volume"),
+            "market_cap": entry.get("marketCap")
+        }
+    return fresh
+
+
+def store(quotes: Dict[str, Dict], source: str = "data_providers") -> None:
+    """Merge fetched {symbol: {price, volume, market_cap}} quotes into the cache file."""
+    quotes = {s: q for s, q in quotes.items() if q and q.get("price")}
+    if not quotes:
+        return
+
+    stamp = _now_iso()
+    with _lock:
+        data = _load()
+        for symbol, quote in quotes.items():
+            data["quotes"][symbol.upper()] = {
+                "symbol": symbol.upper(),
+                "markPrice": quote["price"],
+                "volume": quote.get("volume"),
+                "marketCap": quote.get("market_cap"),
+                "lastUpdated": stamp,
+                "source": source
+            }
+        data["lastQuoteUpdate"] = stamp
+
+        # Atomic replace so Mission Control never reads a half-written file
+        tmp = QUOTE_CACHE_FILE.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            QUOTE_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp, "w") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp, QUOTE_CACHE_FILE)
+        except OSError:
+            pass
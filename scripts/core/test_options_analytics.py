@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+options_analytics tests
+Checks expiration_metrics on small hand-built chains against the scalar
+code it replaced (select_atm_strike / compute_atm_straddle /
+get_options_context before vectorization, kept below as legacy_*), and
+the 25-delta and strangle paths against hand-computed values.
+"""
+
+import math
+import sys
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+import chain_store
+import data_providers
+import options_analytics
+from options_analytics import OptionsChain, expiration_metrics, expiration_summary
+from scripts.options_provider_schwab import compute_atm_straddle, select_atm_strike
+
+
+# =============================================================================
+# LEGACY SCALAR CODE (before options_analytics)
+# =============================================================================
+
+def _exp_key(exp_map, expiration):
+    return next((key for key in exp_map if key.startswith(f"{expiration}:")), None)
+
+
+def legacy_select_atm_strike(chain_json, expiration):
+    underlying_price = chain_json.get("underlyingPrice")
+    exp_key = _exp_key(chain_json["callExpDateMap"], expiration)
+    if not underlying_price or not exp_key:
+        return None
+    call_exp_map = chain_json["callExpDateMap"][exp_key]
+    put_exp_map = chain_json.get("putExpDateMap", {}).get(exp_key, {})
+
+    strikes_with_diff = sorted((abs(float(s) - underlying_price), float(s), s) for s in call_exp_map)
+    for _, strike, strike_str in strikes_with_diff:
+        call_data = call_exp_map.get(strike_str)
+        put_data = put_exp_map.get(strike_str) if put_exp_map else None
+        if not call_data or not put_data:
+            continue
+        call_option, put_option = call_data[0], put_data[0]
+        if ((call_option.get("bid", 0) or 0) > 0 and (put_option.get("bid", 0) or 0) > 0
+                and (call_option.get("ask", 0) or 0) > 0 and (put_option.get("ask", 0) or 0) > 0
+                and (call_option.get("openInterest", 0) or 0) >= 50
+                and (put_option.get("openInterest", 0) or 0) >= 50):
+            return strike
+    return None
+
+
+def legacy_compute_atm_straddle(chain_json, expiration, atm_strike):
+    underlying_price = chain_json.get("underlyingPrice")
+    call_key = _exp_key(chain_json.get("callExpDateMap", {}), expiration)
+    put_key = _exp_key(chain_json.get("putExpDateMap", {}), expiration)
+    if not underlying_price or not call_key or not put_key:
+        return None
+    call_data = chain_json["callExpDateMap"][call_key].get(str(atm_strike))
+    put_data = chain_json["putExpDateMap"][put_key].get(str(atm_strike))
+    if not call_data or not put_data:
+        return None
+    call_mark, put_mark = call_data[0].get("mark"), put_data[0].get("mark")
+    if call_mark is None or put_mark is None:
+        return None
+    straddle = call_mark + put_mark
+    return {"straddle": straddle, "em_percent": straddle / underlying_price * 100,
+            "call_mark": call_mark, "put_mark": put_mark}
+
+
+def legacy_options_context(chain):
+    underlying_price = chain.get("underlyingPrice")
+    call_map = chain.get("callExpDateMap", {})
+    nearest_exp = sorted(call_map, key=lambda x: x.split(":")[0])[0]
+    exp_calls = call_map[nearest_exp]
+
+    atm_strike, min_diff = None, float("inf")
+    for strike_str in exp_calls:
+        diff = abs(float(strike_str) - underlying_price)
+        if diff < min_diff:
+            min_diff, atm_strike = diff, float(strike_str)
+
+    call_data = exp_calls.get(str(atm_strike), [{}])[0]
+    put_data = chain.get("putExpDateMap", {}).get(nearest_exp, {}).get(str(atm_strike), [{}])[0]
+    call_mark = call_data.get("mark", 0) or 0
+    put_mark = put_data.get("mark", 0) or 0
+    straddle = call_mark + put_mark
+    implied_move_pct = straddle / underlying_price * 100 if straddle > 0 else None
+
+    call_iv = call_data.get("volatility", 0) or 0
+    put_iv = put_data.get("volatility", 0) or 0
+    atm_iv = (call_iv + put_iv) / 2 if (call_iv and put_iv) else (call_iv or put_iv or 0)
+    call_put_skew = (call_mark - put_mark) / put_mark * 100 if put_mark > 0 and call_mark > 0 else 0
+
+    return {
+        "implied_move": round(implied_move_pct, 2) if implied_move_pct else None,
+        "atm_iv": round(atm_iv, 1) if atm_iv else None,
+        "call_put_skew": round(call_put_skew, 1),
+        "dte": int(nearest_exp.split(":")[1]),
+        "expiration": nearest_exp.split(":")[0],
+    }
+
+
+# =============================================================================
+# CHAIN BUILDERS
+# =============================================================================
+
+NEAR = "2026-03-20:7"
+FAR = "2026-04-17:35"
+
+
+def contract(mark, delta, iv=30.0, oi=500, spread=0.1):
+    return {"bid": round(mark - spread / 2, 4), "ask": round(mark + spread / 2, 4), "mark": mark,
+            "openInterest": oi, "volatility": iv, "delta": delta}
+
+
+def make_chain(underlying, calls, puts):
+    """calls/puts: {exp_key: {strike: contract}} -> Schwab-shaped chain."""
+    def exp_map(side):
+        return {key: {str(float(strike)): [c] for strike, c in strikes.items()} for key, strikes in side.items()}
+    return {"symbol": "TEST", "underlyingPrice": underlying,
+            "callExpDateMap": exp_map(calls), "putExpDateMap": exp_map(puts)}
+
+
+def base_sides():
+    """Strikes 90-110 around 101: 25-delta call at 105, 25-delta put at 95."""
+    calls = {
+        90: contract(11.2, 0.92, 34), 95: contract(6.6, 0.76, 31), 100: contract(2.9, 0.52, 29),
+        105: contract(1.1, 0.26, 28), 110: contract(0.35, 0.09, 30),
+    }
+    puts = {
+        90: contract(0.3, -0.08, 38), 95: contract(0.95, -0.27, 35), 100: contract(2.4, -0.48, 30),
+        105: contract(5.3, -0.74, 29), 110: contract(9.7, -0.91, 28),
+    }
+    far_calls = {k: contract(c["mark"] * 1.8, c["delta"], c["volatility"] - 4) for k, c in calls.items()}
+    far_puts = {k: contract(p["mark"] * 1.8, p["delta"], p["volatility"] - 4) for k, p in puts.items()}
+    return {NEAR: calls, FAR: far_calls}, {NEAR: puts, FAR: far_puts}
+
+
+def metric(chain_json, name, expiration=NEAR, liquid=False):
+    chain = OptionsChain.from_chain(chain_json)
+    return expiration_metrics(chain, liquid=liquid)[name][chain.expiration_index(expiration.split(":")[0])]
+
+
+def options_context(chain_json):
+    with patch.object(data_providers, "get_options_chain_snapshot",
+                      lambda *args, **kwargs: chain_store.compact(chain_json)):
+        return data_providers.get_options_context("TEST")
+
+
+# =============================================================================
+# TESTS
+# =============================================================================
+
+class TestLegacyParity(unittest.TestCase):
+    """ATM selection, straddle and context fields match the scalar code."""
+
+    def assert_parity(self, chain_json):
+        for expiration in ("2026-03-20", "2026-04-17"):
+            atm = select_atm_strike(chain_json, expiration)
+            self.assertEqual(atm, legacy_select_atm_strike(chain_json, expiration))
+            if atm is None:
+                continue
+            straddle = compute_atm_straddle(chain_json, expiration, atm)
+            legacy = legacy_compute_atm_straddle(chain_json, expiration, atm)
+            self.assertEqual(straddle is None, legacy is None)
+            for name in (legacy or {}):
+                self.assertAlmostEqual(straddle[name], legacy[name])
+
+        context = options_context(chain_json)
+        for name, value in legacy_options_context(chain_json).items():
+            self.assertEqual(context[name], value, name)
+        return context
+
+    def test_liquid_chain(self):
+        calls, puts = base_sides()
+        context = self.assert_parity(make_chain(101, calls, puts))
+        self.assertEqual(context["implied_move"], round(5.3 / 101 * 100, 2))
+
+    def test_illiquid_nearest_strike(self):
+        calls, puts = base_sides()
+        calls[NEAR][100]["openInterest"] = 10
+        chain_json = make_chain(101, calls, puts)
+        self.assert_parity(chain_json)
+        self.assertEqual(select_atm_strike(chain_json, "2026-03-20"), 105.0)
+
+    def test_missing_put_strikes(self):
+        calls, puts = base_sides()
+        del puts[NEAR][100]
+        del puts[NEAR][95]
+        chain_json = make_chain(101, calls, puts)
+        context = self.assert_parity(chain_json)
+
+        # The context's ATM is the nearest call strike: straddle is the call alone
+        self.assertEqual(context["implied_move"], round(2.9 / 101 * 100, 2))
+        self.assertEqual(context["atm_iv"], 29.0)
+        self.assertEqual(context["call_put_skew"], 0)
+        self.assertTrue(math.isnan(metric(chain_json, "put_mark")))
+        self.assertIsNone(compute_atm_straddle(chain_json, "2026-03-20", 100.0))
+
+        # No put one strike below the ATM: no strangle; no 25-delta put: no skew
+        self.assertTrue(math.isnan(metric(chain_json, "strangle")))
+        self.assertTrue(math.isnan(metric(chain_json, "strangle_em_percent")))
+        self.assertIsNone(context["skew_25d"])
+
+    def test_missing_marks(self):
+        calls, puts = base_sides()
+        puts[NEAR][100]["mark"] = None
+        self.assert_parity(make_chain(101, calls, puts))
+
+
+class TestImpliedVolatility(unittest.TestCase):
+    """Schwab reports missing IV as -999; it must never enter an average."""
+
+    def test_one_side_missing(self):
+        calls, puts = base_sides()
+        calls[NEAR][100]["volatility"] = -999.0
+        chain_json = make_chain(101, calls, puts)
+        self.assertEqual(metric(chain_json, "atm_iv"), 30.0)
+        self.assertEqual(options_context(chain_json)["atm_iv"], 30.0)
+
+    def test_both_sides_missing(self):
+        calls, puts = base_sides()
+        calls[NEAR][100]["volatility"] = -999.0
+        puts[NEAR][100]["volatility"] = -999.0
+        chain_json = make_chain(101, calls, puts)
+        self.assertTrue(math.isnan(metric(chain_json, "atm_iv")))
+        self.assertIsNone(options_context(chain_json)["atm_iv"])
+
+        # The term structure still lists the far expiration with its own IV
+        term = options_analytics.iv_term_structure(chain_json)
+        self.assertEqual([row["atm_iv"] for row in term], [None, 25.5])
+
+    def test_missing_iv_at_25_delta(self):
+        calls, puts = base_sides()
+        calls[NEAR][105]["volatility"] = -999.0
+        chain_json = make_chain(101, calls, puts)
+        self.assertTrue(math.isnan(metric(chain_json, "skew_25d")))
+        self.assertAlmostEqual(metric(chain_json, "skew_25d", FAR), 31.0 - 24.0)
+
+
+class TestSkewAndStrangle(unittest.TestCase):
+
+    def test_hand_computed(self):
+        calls, puts = base_sides()
+        chain_json = make_chain(101, calls, puts)
+        summary = expiration_summary(chain_json, "2026-03-20")
+
+        self.assertEqual(summary["atm_strike"], 100.0)
+        self.assertAlmostEqual(summary["straddle"], 5.3)
+        self.assertAlmostEqual(summary["skew_25d"], 35.0 - 28.0)
+        self.assertAlmostEqual(summary["strangle"], 1.1 + 0.95)
+        self.assertAlmostEqual(summary["strangle_em_percent"], (5.3 + 2.05) / 2 / 101 * 100)
+
+        context = options_context(chain_json)
+        self.assertEqual(context["skew_25d"], 7.0)
+        self.assertEqual(context["strangle_implied_move"], round((5.3 + 2.05) / 2 / 101 * 100, 2))
+
+    def test_window_short_of_25_delta(self):
+        # Strikes 99-103 only reach 0.40 / -0.38 delta: nothing within tolerance of 0.25
+        calls = {NEAR: {99: contract(3.6, 0.6), 101: contract(2.5, 0.5), 103: contract(1.6, 0.4)}}
+        puts = {NEAR: {99: contract(1.7, -0.38), 101: contract(2.6, -0.5), 103: contract(3.7, -0.61)}}
+        chain_json = make_chain(101, calls, puts)
+        self.assertTrue(math.isnan(metric(chain_json, "skew_25d")))
+        self.assertIsNone(options_context(chain_json)["skew_25d"])
+
+        # The strangle only needs neighbouring strikes
+        self.assertAlmostEqual(metric(chain_json, "strangle"), 1.6 + 1.7)
+
+    def test_atm_at_window_edge(self):
+        # ATM on the top strike: no call one strike up, so no strangle
+        calls, puts = base_sides()
+        chain_json = make_chain(112, calls, puts)
+        self.assertEqual(metric(chain_json, "atm_strike"), 110.0)
+        self.assertTrue(math.isnan(metric(chain_json, "strangle_em_percent")))
+        self.assertIsNone(options_context(chain_json)["strangle_implied_move"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -14,8 +14,20 @@ from datetime import datetime, date, timedelta
 # Add workspace to path for imports
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-import requests
-from scripts.core.data_providers import get_schwab_token
+import numpy as np
+from scripts.core.data_providers import (
+    CONTEXT_CHAIN_DAYS,
+    fetch_json,
+    get_options_chain_snapshot,
+    get_schwab_token,
+    options_chain_params,
+)
+from scripts.core.options_analytics import (
+    OptionsChain,
+    as_options_chain,
+    expiration_summary,
+    liquid_mask,
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -24,13 +36,22 @@ logger = logging.getLogger(__name__)
 # Schwab API configuration
 SCHWAB_OPTIONS_URL = "https://api.schwabapi.com/marketdata/v1/chains"
 
+# Strikes around the money requested for an earnings snapshot; the liquid
+# ATM search walks outward from the underlying within this window. The
+# snapshot window also covers get_options_context's (CONTEXT_CHAIN_DAYS,
+# fewer strikes), so analysis reuses the stored chain instead of refetching.
+EARNINGS_STRIKE_COUNT = 20
 
-def fetch_options_chain(symbol: str):
+
+def fetch_options_chain(symbol: str, from_date=None, to_date=None, strike_count=None, contract_type=None):
     """
     Fetch options chain for a given symbol from Schwab API.
     
     Args:
         symbol: Stock ticker symbol (e.g., 'INTU')
+        from_date, to_date: Optional expiration range (YYYY-MM-DD or date)
+        strike_count: Optional number of strikes around the money
+        contract_type: Optional 'CALL', 'PUT' or 'ALL'
         
     Returns:
         JSON response dict or None if failed
@@ -45,19 +66,18 @@ def fetch_options_chain(symbol: str):
             "Authorization": f"Bearer {access_token}"
         }
         
-        params = {
-            "symbol": symbol,
-            "includeQuotes": "true"
-        }
+        # Unfiltered requests return every expiration and strike
+        params = options_chain_params(symbol, from_date, to_date, strike_count, contract_type)
         
-        response = requests.get(SCHWAB_OPTIONS_URL, headers=headers, params=params)
+        # Shared transport: pooled Schwab session, host concurrency and rate limit
+        response = fetch_json(SCHWAB_OPTIONS_URL, params=params, headers=headers, timeout=30)
         
-        if response.status_code != 200:
-            logger.error(f"OPTIONS: Failed - Status {response.status_code}: {response.text}")
+        if not response["ok"]:
+            logger.error(f"OPTIONS: Failed - {response['error']}")
             return None
         
         logger.info("OPTIONS: Success")
-        return response.json()
+        return response["data"]
         
     except Exception as e:
         logger.error(f"OPTIONS: Failed - {str(e)}")
@@ -78,21 +98,22 @@ def get_friday_of_week(dt: date) -> date:
     return dt + timedelta(days=days_until_friday)
 
 
-def select_earnings_expiration(chain_json: dict, earnings_date: str):
+def select_earnings_expiration(chain_json, earnings_date: str):
     """
     Select the expiration that matches the Friday of the earnings week.
     This ensures CSP trades expire the same week as earnings.
     
     Args:
-        chain_json: Response from fetch_options_chain
+        chain_json: Response from fetch_options_chain (or an OptionsChain)
         earnings_date: String in format 'YYYY-MM-DD'
         
     Returns:
         Expiration date string (YYYY-MM-DD) or None if no valid expiration
     """
-    if not chain_json or "callExpDateMap" not in chain_json:
+    if not chain_json or (isinstance(chain_json, dict) and "callExpDateMap" not in chain_json):
         logger.warning("OPTIONS: No valid expiration found - no chain data")
         return None
+    chain = as_options_chain(chain_json)
     
     # Parse earnings date
     try:
@@ -102,117 +123,56 @@ def select_earnings_expiration(chain_json: dict, earnings_date: str):
         return None
     
     # Find the Friday of the earnings week
-    target_friday = get_friday_of_week(earnings_dt)
+    target_friday = get_friday_of_week(earnings_dt).isoformat()
     
     logger.info(f"OPTIONS: Earnings {earnings_date}, targeting Friday {target_friday}")
     
-    # Look for expiration matching that Friday
-    for key in chain_json["callExpDateMap"].keys():
-        try:
-            exp_str, dte_str = key.split(":")
-            exp_dt = datetime.strptime(exp_str, "%Y-%m-%d").date()
-            dte = int(dte_str)
-            
-            # Match the Friday of earnings week, and must have valid DTE
-            if exp_dt == target_friday and dte > 0:
-                logger.info(f"OPTIONS: Selected expiration {exp_str} (earnings week Friday)")
-                return exp_str
-        except (ValueError, IndexError):
-            continue
+    # Match the Friday of earnings week, and must have valid DTE
+    i = chain.expiration_index(target_friday)
+    if i is not None and chain.dte[i] > 0:
+        logger.info(f"OPTIONS: Selected expiration {target_friday} (earnings week Friday)")
+        return target_friday
     
     logger.warning(f"OPTIONS: No expiration found for Friday {target_friday} - skipping ticker")
     return None
 
 
-def select_atm_strike(chain_json: dict, expiration: str):
+def select_atm_strike(chain_json, expiration: str):
     """
-    Select the ATM (at-the-money) strike price.
+    Select the ATM (at-the-money) strike price: the strike nearest the
+    underlying where both sides have bids, asks and open interest >= 50.
     
     Args:
-        chain_json: Response from fetch_options_chain
+        chain_json: Response from fetch_options_chain (or an OptionsChain)
         expiration: Expiration date string (YYYY-MM-DD)
         
     Returns:
         ATM strike as float, or None if not found
     """
-    if not chain_json or "callExpDateMap" not in chain_json:
+    if not chain_json:
         logger.warning("OPTIONS: No ATM strike found - no chain data")
         return None
+    chain = as_options_chain(chain_json)
     
-    # Get underlying price
-    underlying_price = chain_json.get("underlyingPrice")
-    if not underlying_price:
+    if not chain.underlying:
         logger.warning("OPTIONS: No ATM strike found - no underlying price")
         return None
     
-    # Find the expiration map key
-    exp_key = None
-    for key in chain_json["callExpDateMap"].keys():
-        if key.startswith(f"{expiration}:"):
-            exp_key = key
-            break
-    
-    if not exp_key:
+    i = chain.expiration_index(expiration)
+    if i is None:
         logger.warning(f"OPTIONS: No ATM strike found - expiration {expiration} not in chain")
         return None
     
-    # Get strikes for this expiration from both call and put maps
-    call_exp_map = chain_json["callExpDateMap"][exp_key]
-    put_exp_map = chain_json.get("putExpDateMap", {}).get(exp_key, {})
-    
-    if not call_exp_map:
+    rows = slice(chain.offsets[i], chain.offsets[i + 1])
+    if not chain.call["present"][rows].any():
         logger.warning(f"OPTIONS: No ATM strike found - empty expiration map")
         return None
     
-    # Collect all strikes with their distance from underlying
-    strikes_with_diff = []
-    for strike_str in call_exp_map.keys():
-        try:
-            strike = float(strike_str)
-            diff = abs(strike - underlying_price)
-            strikes_with_diff.append((diff, strike, strike_str))
-        except ValueError:
-            continue
-    
-    if not strikes_with_diff:
-        logger.warning("OPTIONS: No ATM strike found - could not parse strikes")
-        return None
-    
-    # Sort by distance from underlying
-    strikes_with_diff.sort(key=lambda x: x[0])
-    
-    # Find first strike that passes liquidity check
-    atm_strike = None
-    atm_strike_str = None
-    
-    for diff, strike, strike_str in strikes_with_diff:
-        # Get call and put data for this strike
-        call_data = call_exp_map.get(strike_str)
-        put_data = put_exp_map.get(strike_str) if put_exp_map else None
-        
-        if not call_data or not put_data:
-            logger.info(f"OPTIONS: Liquidity check failed for strike {strike} - no data")
-            continue
-        
-        call_option = call_data[0] if call_data else {}
-        put_option = put_data[0] if put_data else {}
-        
-        # Check liquidity conditions
-        call_bid = call_option.get("bid", 0) or 0
-        put_bid = put_option.get("bid", 0) or 0
-        call_ask = call_option.get("ask", 0) or 0
-        put_ask = put_option.get("ask", 0) or 0
-        call_oi = call_option.get("openInterest", 0) or 0
-        put_oi = put_option.get("openInterest", 0) or 0
-        
-        if call_bid > 0 and put_bid > 0 and call_ask > 0 and put_ask > 0 and call_oi >= 50 and put_oi >= 50:
-            atm_strike = strike
-            atm_strike_str = strike_str
-            logger.info(f"OPTIONS: Liquidity confirmed at strike {strike}")
-            break
-        else:
-            logger.info(f"OPTIONS: Liquidity check failed for strike {strike}")
+    summary = expiration_summary(chain, expiration, liquid=True)
+    liquid = int(liquid_mask(chain)[rows].sum())
+    logger.info(f"OPTIONS: {liquid} of {rows.stop - rows.start} strikes pass liquidity check")
     
+    atm_strike = summary["atm_strike"]
     if atm_strike is None:
         logger.warning("OPTIONS: No liquid ATM found")
         return None
@@ -221,12 +181,12 @@ def select_atm_strike(chain_json: dict, expiration: str):
     return atm_strike
 
 
-def compute_atm_straddle(chain_json: dict, expiration: str, atm_strike: float):
+def compute_atm_straddle(chain_json, expiration: str, atm_strike: float):
     """
     Compute ATM straddle and expected move percentage.
     
     Args:
-        chain_json: Response from fetch_options_chain
+        chain_json: Response from fetch_options_chain (or an OptionsChain)
         expiration: Expiration date string (YYYY-MM-DD)
         atm_strike: ATM strike price
         
@@ -236,47 +196,32 @@ def compute_atm_straddle(chain_json: dict, expiration: str, atm_strike: float):
     if not chain_json:
         logger.warning("OPTIONS: No straddle computed - no chain data")
         return None
+    chain = as_options_chain(chain_json)
     
-    underlying_price = chain_json.get("underlyingPrice")
+    underlying_price = chain.underlying
     if not underlying_price:
         logger.warning("OPTIONS: No straddle computed - no underlying price")
         return None
     
-    # Find expiration key in call and put maps
-    call_key = None
-    put_key = None
-    
-    for key in chain_json.get("callExpDateMap", {}).keys():
-        if key.startswith(f"{expiration}:"):
-            call_key = key
-            break
-    
-    for key in chain_json.get("putExpDateMap", {}).keys():
-        if key.startswith(f"{expiration}:"):
-            put_key = key
-            break
-    
-    if not call_key or not put_key:
+    i = chain.expiration_index(expiration)
+    if i is None:
         logger.warning("OPTIONS: No straddle computed - expiration not found in chain")
         return None
     
-    # Get strike entry (strike is stored as string like "410.0")
-    strike_str = str(atm_strike)
-    
-    call_data = chain_json["callExpDateMap"][call_key].get(strike_str)
-    put_data = chain_json["putExpDateMap"][put_key].get(strike_str)
-    
-    if not call_data or not put_data:
+    lo, hi = chain.offsets[i], chain.offsets[i + 1]
+    row = lo + int(np.searchsorted(chain.strike[lo:hi], atm_strike))
+    if row >= hi or chain.strike[row] != atm_strike or not (chain.call["present"][row] and chain.put["present"][row]):
         logger.warning("OPTIONS: No straddle computed - strike not found in chain")
         return None
     
     # Extract marks
-    call_mark = call_data[0].get("mark")
-    put_mark = put_data[0].get("mark")
+    call_mark = chain.call["mark"][row]
+    put_mark = chain.put["mark"][row]
     
-    if call_mark is None or put_mark is None:
+    if np.isnan(call_mark) or np.isnan(put_mark):
         logger.warning("OPTIONS: No straddle computed - no mark price available")
         return None
+    call_mark, put_mark = float(call_mark), float(put_mark)
     
     # Compute straddle and EM%
     straddle = call_mark + put_mark
@@ -305,16 +250,28 @@ def get_earnings_snapshot(symbol: str, earnings_date: str) -> dict:
         earnings_date: Earnings date string (YYYY-MM-DD)
         
     Returns:
-        Dict with price, expiration, atm_strike, straddle, em_percent, liquidity_ok, dte
+        Dict with price, expiration, atm_strike, straddle, em_percent, liquidity_ok, dte,
+        atm_iv, skew_25d, strangle_em_percent
         or {"status": "options_unavailable"} if failed
     """
     logger.info(f"OPTIONS: Snapshot complete")
     
-    # Fetch chain
-    chain = fetch_options_chain(symbol)
-    if chain is None:
+    # Near-term expirations through the earnings-week Friday, strikes around the money
+    try:
+        target_friday = get_friday_of_week(datetime.strptime(earnings_date, "%Y-%m-%d").date())
+    except ValueError:
+        logger.warning("OPTIONS: Snapshot failed - invalid earnings date format")
+        return {"status": "options_unavailable"}
+    
+    today = date.today()
+    snapshot = get_options_chain_snapshot(symbol, from_date=min(today, target_friday),
+                                          to_date=max(target_friday, today + timedelta(days=CONTEXT_CHAIN_DAYS)),
+                                          strike_count=EARNINGS_STRIKE_COUNT, fetch=fetch_options_chain,
+                                          compact_form=True)
+    if snapshot is None:
         logger.warning("OPTIONS: Snapshot failed - no options chain")
         return {"status": "options_unavailable"}
+    chain = OptionsChain.from_snapshot(snapshot)
     
     # Select expiration
     expiration = select_earnings_expiration(chain, earnings_date)
@@ -334,28 +291,149 @@ def get_earnings_snapshot(symbol: str, earnings_date: str) -> dict:
         logger.warning("OPTIONS: Snapshot failed - could not compute straddle")
         return {"status": "options_unavailable"}
     
-    # Extract DTE from expiration key
-    dte = 0
-    for key in chain.get("callExpDateMap", {}).keys():
-        if key.startswith(f"{expiration}:"):
-            try:
-                dte = int(key.split(":")[1])
-            except (IndexError, ValueError):
-                dte = 0
-            break
+    # Skew and strangle EM for the same expiration and liquid ATM strike
+    analytics = expiration_summary(chain, expiration, liquid=True)
     
     return {
-        "price": chain.get("underlyingPrice"),
+        "price": chain.underlying,
         "expiration": expiration,
         "atm_strike": atm_strike,
         "straddle": straddle_data["straddle"],
         "em_percent": straddle_data["em_percent"],
         "liquidity_ok": True,
-        "dte": dte
+        "dte": analytics["dte"],
+        "atm_iv": analytics["atm_iv"],
+        "skew_25d": analytics["skew_25d"],
+        "strangle_em_percent": analytics["strangle_em_percent"]
     }
 
 
+# =============================================================================
+# BENCHMARK
+# =============================================================================
+
+def filter_chain(chain_json: dict, from_date=None, to_date=None, strike_count=None, contract_type=None) -> dict:
+    """
+    Apply the fromDate/toDate/strikeCount/contractType filters to a full chain
+    locally, the way the API does server-side (for benchmarks and recorded chains).
+    """
+    from_str = str(from_date) if from_date else None
+    to_str = str(to_date) if to_date else None
+    underlying = chain_json.get("underlyingPrice") or 0
+    wanted = (contract_type or "ALL").upper()
+    
+    def slice_map(exp_map):
+        result = {}
+        for key, strikes in exp_map.items():
+            exp = key.split(":")[0]
+            if (from_str and exp < from_str) or (to_str and exp > to_str):
+                continue
+            if strike_count:
+                ordered = sorted(strikes, key=float)
+                atm = min(range(len(ordered)), key=lambda i: abs(float(ordered[i]) - underlying)) if ordered else 0
+                lo = max(0, atm - strike_count // 2)
+                keep = set(ordered[lo:lo + strike_count])
+                strikes = {k: v for k, v in strikes.items() if k in keep}
+            result[key] = strikes
+        return result
+    
+    filtered = {k: v for k, v in chain_json.items() if k not in ("callExpDateMap", "putExpDateMap")}
+    filtered["callExpDateMap"] = slice_map(chain_json.get("callExpDateMap", {})) if wanted in ("ALL", "CALL") else {}
+    filtered["putExpDateMap"] = slice_map(chain_json.get("putExpDateMap", {})) if wanted in ("ALL", "PUT") else {}
+    return filtered
+
+
+def synthetic_chain(underlying: float = 450.0, expirations: int = 40, strikes: int = 240) -> dict:
+    """Full chain shaped like a Schwab mega-cap response (weekly + monthly expirations)."""
+    today = date.today()
+    exp_dates = [get_friday_of_week(today) + timedelta(weeks=w) for w in range(expirations)]
+    step = 2.5
+    low = round(underlying / step) * step - step * (strikes // 2)
+    
+    def contract(put_call, exp, dte, strike):
+        mark = max(0.05, (underlying - strike if put_call == "CALL" else strike - underlying)) + 2.0
+        return [{
+            "putCall": put_call, "symbol": f"SYM  {exp:%y%m%d}{put_call[0]}{int(strike * 1000):08d}",
+            "description": f"SYM {exp:%b %d %Y} {strike} {put_call.title()}", "exchangeName": "OPR",
+            "bid": round(mark - 0.05, 2), "ask": round(mark + 0.05, 2), "last": round(mark, 2), "mark": round(mark, 2),
+            "bidSize": 10, "askSize": 12, "bidAskSize": "10X12", "lastSize": 1, "highPrice": round(mark * 1.1, 2),
+            "lowPrice": round(mark * 0.9, 2), "openPrice": 0.0, "closePrice": round(mark, 2), "totalVolume": 150,
+            "tradeTimeInLong": 1771000000000, "quoteTimeInLong": 1771000000000, "netChange": -0.12,
+            "volatility": 31.5, "delta": 0.5, "gamma": 0.01, "theta": -0.2, "vega": 0.3, "rho": 0.05,
+            "openInterest": 500, "timeValue": 2.0, "theoreticalOptionValue": round(mark, 2),
+            "theoreticalVolatility": 29.0, "optionDeliverablesList": [{"symbol": "SYM", "assetType": "STOCK",
+                                                                       "deliverableUnits": 100.0}],
+            "strikePrice": strike, "expirationDate": f"{exp}T20:00:00.000+00:00", "daysToExpiration": dte,
+            "expirationType": "W", "lastTradingDay": 1771000000000, "multiplier": 100.0, "settlementType": "P",
+            "deliverableNote": "100 SYM", "percentChange": -1.2, "markChange": -0.1, "markPercentChange": -1.0,
+            "intrinsicValue": 0.0, "extrinsicValue": 2.0, "optionRoot": "SYM", "exerciseType": "A",
+            "high52Week": 60.0, "low52Week": 0.5, "nonStandard": False, "pennyPilot": True, "inTheMoney": False,
+            "mini": False
+        }]
+    
+    chain = {"symbol": "SYM", "status": "SUCCESS", "underlyingPrice": underlying, "numberOfContracts": 0,
+             "callExpDateMap": {}, "putExpDateMap": {}}
+    for exp in exp_dates:
+        dte = (exp - today).days
+        key = f"{exp}:{dte}"
+        strike_values = [low + i * step for i in range(strikes)]
+        chain["callExpDateMap"][key] = {str(k): contract("CALL", exp, dte, k) for k in strike_values}
+        chain["putExpDateMap"][key] = {str(k): contract("PUT", exp, dte, k) for k in strike_values}
+    chain["numberOfContracts"] = expirations * strikes * 2
+    return chain
+
+
+def benchmark_chain_filter(chain_paths=None, rounds: int = 5) -> list:
+    """
+    Response bytes and JSON parse time of full chains vs the slices requested
+    by get_earnings_snapshot (CONTEXT_CHAIN_DAYS, EARNINGS_STRIKE_COUNT strikes),
+    that slice as stored in the shared snapshot store, and the one-expiration
+    slice. Uses recorded full-chain JSON files if given, else a synthetic
+    mega-cap chain.
+    """
+    import json
+    import time
+    from scripts.core import chain_store
+    
+    chains = []
+    for path in chain_paths or []:
+        with open(path) as f:
+            chains.append((Path(path).name, json.load(f)))
+    if not chains:
+        chains.append(("synthetic", synthetic_chain()))
+    
+    def measure(payload):
+        raw = json.dumps(payload)
+        started = time.perf_counter()
+        for _ in range(rounds):
+            json.loads(raw)
+        return len(raw), round((time.perf_counter() - started) / rounds * 1000, 2)
+    
+    results = []
+    for name, chain in chains:
+        expirations = sorted(k.split(":")[0] for k in chain.get("callExpDateMap", {}))
+        earnings_exp = expirations[min(2, len(expirations) - 1)] if expirations else None
+        today = date.today()
+        snapshot = filter_chain(chain, today, today + timedelta(days=CONTEXT_CHAIN_DAYS), EARNINGS_STRIKE_COUNT)
+        slices = {
+            "full": chain,
+            "earnings_snapshot": snapshot,
+            "snapshot_stored": chain_store.compact(snapshot),
+            "one_expiration": filter_chain(chain, earnings_exp, earnings_exp, EARNINGS_STRIKE_COUNT),
+        }
+        for label, payload in slices.items():
+            size, parse_ms = measure(payload)
+            results.append({"chain": name, "request": label, "bytes": size, "parse_ms": parse_ms})
+    return results
+
+
 if __name__ == "__main__":
+    if "--benchmark" in sys.argv:
+        # python options_provider_schwab.py --benchmark [recorded_chain.json ...]
+        for row in benchmark_chain_filter(sys.argv[2:]):
+            print(f"{row['chain']:<20} {row['request']:<18} {row['bytes']:>12,} bytes  {row['parse_ms']:>8} ms")
+        sys.exit(0)
+    
     # Test the full snapshot function
     snapshot = get_earnings_snapshot("INTU", "2026-02-26")
     print("Snapshot:", snapshot)
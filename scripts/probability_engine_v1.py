@@ -4,10 +4,17 @@ probability_engine_v1.py - B-lite probability engine
 Calculates downside probabilities based on historical earnings moves.
 """
 import json
-import subprocess
+import sys
 from datetime import datetime, timedelta
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent / "core"))
+
+import numpy as np
+
+import ohlcv_store
+from price_series import PriceSeries
+
 # Paths
 WORKSPACE = Path.home() / ".openclaw" / "workspace"
 DATA_DIR = WORKSPACE / "data"
@@ -34,42 +41,12 @@ def load_analysis():
     return data, {}
 
 def get_price_history(ticker):
-    """Fetch price history from Yahoo to find earnings dates"""
-    # Get last 90 days of daily data
-    url = f"https://query1.finance.yahoo.com/v8/finance/chart/{ticker}?range=1y&interval=1d"
-    
+    """Last year of daily bars as a PriceSeries from the local OHLCV store"""
     try:
-        result = subprocess.run(
-            ["curl", "-s", "-H", "User-Agent: Mozilla/5.0", url],
-            capture_output=True, text=True, timeout=15
-        )
-        
-        data = json.loads(result.stdout)
-        result_data = data.get("chart", {}).get("result", [])
-        
-        if not result_data:
-            return []
-        
-        timestamps = result_data[0].get("timestamp", [])
-        close_prices = result_data[0]["indicators"]["quote"][0].get("close", [])
-        
-        if not timestamps or not close_prices:
-            return []
-        
-        # Build price series
-        prices = []
-        for i, (ts, close) in enumerate(zip(timestamps, close_prices)):
-            if close is not None:
-                prices.append({
-                    "date": datetime.fromtimestamp(ts),
-                    "close": close
-                })
-        
-        return prices
-        
+        return ohlcv_store.get_series(ticker, 365)
     except Exception as e:
         log(f"  Error fetching {ticker}: {e}")
-        return []
+        return PriceSeries(ticker)
 
 def find_earnings_moves(prices, ticker):
     """
@@ -82,19 +59,9 @@ def find_earnings_moves(prices, ticker):
     if len(prices) < 10:
         return []
     
-    moves = []
-    for i in range(1, len(prices)):
-        prev_close = prices[i-1]["close"]
-        curr_close = prices[i]["close"]
-        
-        if prev_close > 0:
-            pct_change = (curr_close - prev_close) / prev_close
-            
-            # Large single-day drops (>3%) are likely earnings
-            if abs(pct_change) > 0.03:
-                moves.append(abs(pct_change))
-    
-    return moves
+    # Large single-day moves (>3%) are likely earnings
+    moves = np.abs(prices.returns())
+    return moves[moves > 0.03].tolist()
 
 def calculate_probabilities(down_moves, em_percent):
     """Calculate probability of staying within EM thresholds"""
@@ -185,11 +152,18 @@ def process_tickers(analysis_data):
     
     return results, calculated, skipped
 
-def main():
+def main(analysis=None):
+    """
+    Add downside probabilities to the research output. Reads analysis_raw.json
+    unless run_pipeline passes it in memory. Returns the written output.
+    """
     log("=== Starting probability_engine_v1.py ===")
     
     # Load analysis
-    analysis_data, metadata = load_analysis()
+    if analysis is None:
+        analysis_data, metadata = load_analysis()
+    else:
+        analysis_data, metadata = analysis.get("candidates", []), analysis.get("metadata", {})
     
     # Always write output file, even if empty - prevents stale data bug
     if not analysis_data:
@@ -202,7 +176,7 @@ def main():
             json.dump(output_data, f, indent=2)
         log(f"Wrote empty output to {OUTPUT_FILE}")
         log("=== Completed ===")
-        return
+        return output_data
     
     log(f"Loaded {len(analysis_data)} tickers")
     
@@ -230,7 +204,7 @@ def main():
         print(f"{ticker}: {probs}")
     
     log("=== Completed ===")
-    return calculated
+    return output_data
 
 if __name__ == "__main__":
     main()
@@ -262,7 +262,7 @@ def main():
     print(f"\nOutput: {CACHE_FILE}")
     log("=== Completed ===")
     
-    return len(candidates)
+    return candidates
 
 if __name__ == "__main__":
     main()
@@ -6,16 +6,16 @@ Now includes visible progress tracking.
 """
 
 import json
-import subprocess
 import sys
-import requests
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 from scripts.options_provider_schwab import get_earnings_snapshot
-from scripts.core.data_providers import get_schwab_token
+from scripts.core.data_providers import get_bulk_fundamentals, get_bulk_quotes
 
 
 # ===============================
@@ -31,6 +31,10 @@ LOG_FILE = DATA_DIR / "logs" / "pipeline.log"
 
 (DATA_DIR / "analysis").mkdir(parents=True, exist_ok=True)
 
+# Concurrent options snapshots; Schwab requests are additionally capped and
+# rate limited by the shared transport (provider_transport.HOST_LIMITS)
+OPTIONS_WORKERS = 4
+
 
 # ===============================
 # LOGGING
@@ -44,6 +48,30 @@ def log(msg):
         f.write(line + "\n")
 
 
+def log_latency(stage, samples_ms, wall_s):
+    """Log a stage's wall time and p50/p90/p99/max of its per-request latencies."""
+    if not samples_ms:
+        log(f"{stage} latency: no requests (all cached), wall {wall_s:.2f}s")
+        return
+    ordered = sorted(samples_ms)
+
+    def pct(p):
+        # Nearest-rank percentile
+        return ordered[max(0, -(-len(ordered) * p // 100) - 1)]
+
+    log(
+        f"{stage} latency: n={len(ordered)} wall {wall_s:.2f}s "
+        f"p50 {pct(50):.0f}ms p90 {pct(90):.0f}ms p99 {pct(99):.0f}ms max {ordered[-1]:.0f}ms"
+    )
+
+
+def timed(fn, *args):
+    """(fn(*args), elapsed ms)."""
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
 # ===============================
 # HELPERS
 # ===============================
@@ -69,55 +97,6 @@ def load_holdings():
     return []
 
 
-def get_basic_quote(symbol: str):
-    try:
-        url = f"https://query1.finance.yahoo.com/v8/finance/chart/{symbol}?interval=1d"
-        result = subprocess.run(
-            ["curl", "-s", "-H", "User-Agent: Mozilla/5.0", url],
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
-
-        data = json.loads(result.stdout)
-        meta = data.get("chart", {}).get("result", [{}])[0].get("meta", {})
-        price = meta.get("regularMarketPrice")
-        volume = meta.get("regularMarketVolume")
-
-        if price:
-            return {
-                "price": float(price),
-                "volume": int(volume) if volume else None,
-                "market_cap": None
-            }
-    except Exception as e:
-        log(f"Quote error {symbol}: {e}")
-
-    return {}
-
-
-def get_schwab_fundamentals(symbol: str):
-    try:
-        access_token = get_schwab_token()
-        headers = {"Authorization": f"Bearer {access_token}"}
-        url = "https://api.schwabapi.com/v1/instruments"
-        params = {"symbol": symbol, "projection": "fundamental"}
-
-        resp = requests.get(url, headers=headers, params=params, timeout=10)
-
-        if resp.status_code != 200:
-            log(f"Fundamentals failed {symbol}: {resp.status_code}")
-            return {}
-
-        data = resp.json()
-        instruments = data.get("instruments", {})
-        return instruments.get(symbol, {})
-
-    except Exception as e:
-        log(f"Fundamentals error {symbol}: {e}")
-        return {}
-
-
 def is_excluded_healthcare(industry: str):
     if not industry:
         return False
@@ -139,15 +118,20 @@ def is_excluded_healthcare(industry: str):
 # MAIN
 # ===============================
 
-def main():
+def main(candidates=None):
+    """
+    Filter candidates and fetch options snapshots. Reads todays_candidates.json
+    unless run_pipeline passes the candidates in memory. Returns the written output.
+    """
     log("=== Starting research_engine.py ===")
 
-    if not CACHE_FILE.exists():
-        log("Candidates file not found")
-        return
+    if candidates is None:
+        if not CACHE_FILE.exists():
+            log("Candidates file not found")
+            return None
 
-    with open(CACHE_FILE) as f:
-        candidates = json.load(f)
+        with open(CACHE_FILE) as f:
+            candidates = json.load(f)
 
     include_list = load_json(CONFIG_DIR / "include_list.json")
     exclude_list = load_json(CONFIG_DIR / "exclude_list.json")
@@ -166,12 +150,13 @@ def main():
     ticker_list = list(set([c.get("ticker") for c in candidates]))
     log(f"Fetching quotes for {len(ticker_list)} tickers...")
 
-    ticker_quotes = {}
-
-    for idx, ticker in enumerate(ticker_list, 1):
-        log(f"[QUOTE {idx}/{len(ticker_list)}] {ticker}")
-        quote = get_basic_quote(ticker)
-        ticker_quotes[ticker] = quote if isinstance(quote, dict) else {}
+    # Bulk Schwab quotes (cached for a few minutes), Yahoo fallback per symbol
+    # Per-request latencies (Schwab batches, Yahoo fallbacks); cache hits make none
+    quote_latencies = []
+    stage_start = time.perf_counter()
+    ticker_quotes = get_bulk_quotes(ticker_list, latencies=quote_latencies)
+    log_latency("QUOTE FETCH", quote_latencies, time.perf_counter() - stage_start)
+    log(f"Quoted {sum(1 for q in ticker_quotes.values() if q)}/{len(ticker_list)} tickers")
 
     ticker_prices = {
         t: ticker_quotes.get(t, {}).get("price")
@@ -243,18 +228,25 @@ def main():
     # HEALTHCARE FILTER (skip for include_list)
     # -----------------------------
 
+    # Include_list tickers bypass healthcare filter; the rest come from the
+    # fundamentals cache (industry only) or multi-symbol instruments requests
+    screen = [c.get("ticker") for c in candidates if c.get("ticker") not in include_tickers]
+    log(f"[FUNDAMENTALS] {len(screen)} tickers")
+    fundamentals_latencies = []
+    stage_start = time.perf_counter()
+    all_fundamentals = get_bulk_fundamentals(screen, static_only=True, latencies=fundamentals_latencies)
+    log_latency("FUNDAMENTALS", fundamentals_latencies, time.perf_counter() - stage_start)
+
     filtered = []
 
-    for idx, c in enumerate(candidates, 1):
+    for c in candidates:
         ticker = c.get("ticker")
-        log(f"[FUNDAMENTALS {idx}/{len(candidates)}] {ticker}")
 
-        # Include_list tickers bypass healthcare filter
         if ticker in include_tickers:
             filtered.append(c)
             continue
 
-        fundamentals = get_schwab_fundamentals(ticker)
+        fundamentals = all_fundamentals.get(ticker, {})
         industry = fundamentals.get("industry")
 
         if is_excluded_healthcare(industry):
@@ -272,15 +264,22 @@ def main():
 
     results = []
 
-    for idx, c in enumerate(candidates, 1):
+    # Snapshots are independent per ticker: fan out, then filter in rank order
+    def fetch_snapshot(idx_c):
+        idx, c = idx_c
+        log(f"[OPTIONS {idx}/{len(candidates)}] {c.get('ticker')}")
+        return timed(get_earnings_snapshot, c.get("ticker"), c.get("report_date"))
+
+    stage_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=OPTIONS_WORKERS) as pool:
+        snapshots = list(pool.map(fetch_snapshot, enumerate(candidates, 1)))
+    log_latency("OPTIONS SNAPSHOT", [ms for _, ms in snapshots], time.perf_counter() - stage_start)
+
+    for c, (snapshot, _) in zip(candidates, snapshots):
         ticker = c.get("ticker")
         report_date = c.get("report_date")
         report_time = c.get("report_time", "AMC")
 
-        log(f"[OPTIONS {idx}/{len(candidates)}] {ticker}")
-
-        snapshot = get_earnings_snapshot(ticker, report_date)
-
         # Critical failure: options chain unavailable (include_list cannot bypass this)
         if snapshot.get("status") == "options_unavailable":
             log(f"{ticker} skipped — options unavailable")
@@ -308,6 +307,9 @@ def main():
             "options": {
                 "straddle": snapshot.get("straddle"),
                 "em_percent": snapshot.get("em_percent"),
+                "strangle_em_percent": snapshot.get("strangle_em_percent"),
+                "atm_iv": snapshot.get("atm_iv"),
+                "skew_25d": snapshot.get("skew_25d"),
             },
             "probabilities": {
                 "down_1x": None,
@@ -350,6 +352,7 @@ def main():
 
     log(f"Wrote {len(results)} final research results")
     log("=== Completed ===")
+    return output_data
 
 
 if __name__ == "__main__":
@@ -4,10 +4,14 @@ risk_filter_engine_v1.py - Deterministic risk filter
 Adds risk flags to each ticker based on market conditions.
 """
 import json
-import subprocess
+import sys
 from datetime import datetime, timedelta
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent / "core"))
+
+import ohlcv_store
+
 # Paths
 WORKSPACE = Path.home() / ".openclaw" / "workspace"
 CONFIG_DIR = WORKSPACE / "config"
@@ -52,36 +56,10 @@ def load_analysis():
     return data, {}
 
 def get_price_change(ticker, days=10):
-    """Get price change over last N days"""
-    url = f"https://query1.finance.yahoo.com/v8/finance/chart/{ticker}?range={days}d&interval=1d"
-    
+    """Get price change over last N days (served from the local OHLCV store)"""
     try:
-        result = subprocess.run(
-            ["curl", "-s", "-H", "User-Agent: Mozilla/5.0", url],
-            capture_output=True, text=True, timeout=15
-        )
-        
-        data = json.loads(result.stdout)
-        result_data = data.get("chart", {}).get("result", [])
-        
-        if not result_data:
-            return None
-        
-        timestamps = result_data[0].get("timestamp", [])
-        close_prices = result_data[0]["indicators"]["quote"][0].get("close", [])
-        
-        if len(close_prices) < 2:
-            return None
-        
-        start_price = close_prices[0]
-        end_price = close_prices[-1]
-        
-        if start_price and end_price:
-            return (end_price - start_price) / start_price
-        
-        return None
-        
-    except Exception as e:
+        return ohlcv_store.get_series(ticker, days).change()
+    except Exception:
         return None
 
 def get_sector_change(sector_etf, days=14):
@@ -89,30 +67,12 @@ def get_sector_change(sector_etf, days=14):
     return get_price_change(sector_etf, days)
 
 def get_vix():
-    """Get current VIX level"""
-    url = "https://query1.finance.yahoo.com/v8/finance/chart/%5EVIX?interval=1d"
-    
+    """Get current VIX level (latest ^VIX close from the local OHLCV store)"""
     try:
-        result = subprocess.run(
-            ["curl", "-s", "-H", "User-Agent: Mozilla/5.0", url],
-            capture_output=True, text=True, timeout=15
-        )
-        
-        data = json.loads(result.stdout)
-        result_data = data.get("chart", {}).get("result", [])
-        
-        if not result_data:
-            return None
-        
-        close_prices = result_data[0]["indicators"]["quote"][0].get("close", [])
-        
-        if close_prices:
-            return close_prices[-1]
-        
-        return None
-        
-    except:
+        closes = ohlcv_store.get_series("^VIX", 10).close
+    except Exception:
         return None
+    return float(closes[-1]) if len(closes) else None
 
 def check_macro_events():
     """Check if any macro events within 48 hours"""
@@ -2,23 +2,49 @@
 """
 run_pipeline.py - Master Earnings Pipeline Orchestrator
 
-Deterministic execution order:
+Stages (declared order):
 
 1. pull_earnings_today.py
 2. research_engine.py
-3. bob_research_overlay.py
-4. probability_engine_v1.py
-5. risk_filter_engine_v1.py
-6. grading_engine_v2.py
-7. send_email.py
-
+3. probability_engine_v1.py
+4. analysis_batch.py
+5. send_email.py
+
+Each stage declares the files it reads (STAGE_INPUTS) and writes
+(STAGE_OUTPUTS). Dependencies are derived from those declarations, and any
+stage whose dependencies have finished starts immediately, so independent
+stages run concurrently.
+
+By default stages run in-process: each stage's main() receives the upstream
+payload in memory instead of re-reading it from disk. Output files are still
+written for dashboards and validation. Pass --isolated to run every stage
+as a subprocess (30 minute limit per stage).
+
+Stage cache: each stage is fingerprinted from its script and the modules it
+imports (STAGE_CODE), its upstream outputs (by content hash), the config
+files it reads and today's date.
+A stage whose fingerprint matches its last successful run is skipped and its
+cached output is restored, so a same-day re-run only repeats what changed.
+
+    run_pipeline.py                          # cached stages are skipped
+    run_pipeline.py --from-stage send_email  # re-run send_email onwards
+    run_pipeline.py --only research_engine   # re-run just these stages
+    run_pipeline.py --force                  # ignore the cache
+
+Wall time and peak RSS for every stage are written to pipeline.log.
 All intermediate JSON files are overwritten.
-analysis_final.json is archived inside grading_engine_v2.py.
 """
 
+import argparse
+import copy
+import hashlib
+import importlib
+import json
+import resource
 import subprocess
 import sys
 import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 from datetime import datetime
 import time
@@ -101,7 +127,6 @@ def validate_output(script_name):
     if full_path.stat().st_size == 0:
         raise ValueError(f"Validation FAILED for {script_name}: Output file is empty: {output_path}")
     try:
-        import json
         with open(full_path) as f:
             json.load(f)
     except json.JSONDecodeError as e:
@@ -109,6 +134,143 @@ def validate_output(script_name):
     log(f"Validated {output_path} - OK")
 
 
+# Files each stage reads. The first entry is the payload handed to the
+# stage's main() when running in-process.
+STAGE_INPUTS = {
+    "pull_earnings_today.py": [],
+    "research_engine.py": ["data/cache/todays_candidates.json"],
+    "probability_engine_v1.py": ["data/analysis/analysis_raw.json"],
+    # Per-ticker probabilities come from analysis_with_probs.json via data_providers
+    "analysis_batch.py": ["data/analysis/analysis_raw.json", "data/analysis/analysis_with_probs.json"],
+    "send_email.py": ["data/analysis/analysis_raw.json"],
+}
+
+
+# Config files each stage reads; changing one invalidates the stage's cache
+STAGE_CONFIG = {
+    "pull_earnings_today.py": ["config/include_list.json", "config/exclude_list.json"],
+    "research_engine.py": ["config/include_list.json", "config/exclude_list.json",
+                           "data/portfolio/holdings.json"],
+}
+
+
+# Code a stage imports besides its own script (a directory means every .py
+# in it); editing any of it invalidates the stage's cache
+STAGE_CODE = {
+    "research_engine.py": ["scripts/core", "scripts/options_provider_schwab.py"],
+    "probability_engine_v1.py": ["scripts/core"],
+    "analysis_batch.py": ["scripts/core"],
+}
+
+
+# ===============================
+# STAGE CACHE
+# ===============================
+
+STAGE_CACHE_DIR = WORKSPACE / "data" / "cache" / "pipeline"
+STAGE_MANIFEST = STAGE_CACHE_DIR / "manifest.json"
+
+
+def _file_hash(path):
+    try:
+        return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+
+def _code_hash(path):
+    """Hash of a source file, or of every .py file under a directory."""
+    path = Path(path)
+    if not path.is_dir():
+        return _file_hash(path)
+    h = hashlib.sha256()
+    for source in sorted(path.rglob("*.py")):
+        h.update(f"{source.relative_to(path)}={_file_hash(source)}".encode())
+    return h.hexdigest()
+
+
+def _write_atomic(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_bytes(content)
+    os.replace(tmp, path)
+
+
+def load_manifest():
+    """{stage: {fingerprint, output_hash, completed_at, seconds}} from the last runs."""
+    try:
+        with open(STAGE_MANIFEST) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest):
+    _write_atomic(STAGE_MANIFEST, json.dumps(manifest, indent=2).encode())
+
+
+def _cached_copy(script_name):
+    return STAGE_CACHE_DIR / f"{Path(script_name).stem}.json"
+
+
+def stage_fingerprint(script_name, producers, manifest):
+    """
+    Hash of everything a stage's output depends on: its script and the code
+    it imports (STAGE_CODE), the content of each input (as recorded when its
+    producer finished), its config files and today's date.
+    """
+    h = hashlib.sha256()
+    h.update(script_name.encode())
+    h.update(datetime.now().strftime("%Y-%m-%d").encode())
+    h.update(str(_file_hash(SCRIPTS_DIR / script_name)).encode())
+    for path in STAGE_CODE.get(script_name, []):
+        h.update(f"{path}={_code_hash(WORKSPACE / path)}".encode())
+
+    for path in STAGE_INPUTS.get(script_name, []):
+        # Use the producer's recorded hash: the file itself may since have been
+        # overwritten by a later stage (analysis_batch rewrites analysis_raw.json)
+        entry = manifest.get(producers[script_name].get(path))
+        digest = entry["output_hash"] if entry else _file_hash(WORKSPACE / path)
+        h.update(f"{path}={digest}".encode())
+
+    for path in STAGE_CONFIG.get(script_name, []):
+        h.update(f"{path}={_file_hash(WORKSPACE / path)}".encode())
+
+    return h.hexdigest()
+
+
+def cache_output(script_name):
+    """Keep a copy of the stage's output for later restores. Returns its hash."""
+    output = STAGE_OUTPUTS.get(script_name)
+    if output is None:
+        return None
+    content = (WORKSPACE / output).read_bytes()
+    _write_atomic(_cached_copy(script_name), content)
+    return hashlib.sha256(content).hexdigest()
+
+
+def restore_output(script_name, entry):
+    """
+    Put a skipped stage's cached output back in place (a later stage may have
+    overwritten the file). Returns (restored, payload).
+    """
+    output = STAGE_OUTPUTS.get(script_name)
+    if output is None:
+        return True, None
+
+    try:
+        content = _cached_copy(script_name).read_bytes()
+    except OSError:
+        return False, None
+    if hashlib.sha256(content).hexdigest() != entry.get("output_hash"):
+        return False, None
+
+    target = WORKSPACE / output
+    if _file_hash(target) != entry["output_hash"]:
+        _write_atomic(target, content)
+    return True, json.loads(content)
+
+
 # ===============================
 # EXECUTION ORDER
 # ===============================
@@ -122,7 +284,55 @@ STEPS = [
 ]
 
 
+def build_dag(steps):
+    """
+    Derive stage dependencies from STAGE_INPUTS / STAGE_OUTPUTS.
+
+    An input is produced by the latest earlier stage that writes it. A stage
+    that writes a file also waits for earlier stages that read it, so a file
+    is never overwritten while someone still needs the previous version.
+
+    Returns (depends_on, producers): stage -> set of stages, and
+    stage -> {input path: producing stage}.
+    """
+    depends_on = {stage: set() for stage in steps}
+    producers = {stage: {} for stage in steps}
+
+    for i, stage in enumerate(steps):
+        earlier = steps[:i]
+        for path in STAGE_INPUTS.get(stage, []):
+            writers = [s for s in earlier if STAGE_OUTPUTS.get(s) == path]
+            if writers:
+                producers[stage][path] = writers[-1]
+                depends_on[stage].add(writers[-1])
+
+        output = STAGE_OUTPUTS.get(stage)
+        if output:
+            depends_on[stage].update(s for s in earlier if output in STAGE_INPUTS.get(s, []))
+
+    return depends_on, producers
+
+
+def _peak_rss_mb(ru_maxrss):
+    # ru_maxrss is KB on Linux, bytes on macOS
+    return ru_maxrss / (1024 * 1024) if sys.platform == "darwin" else ru_maxrss / 1024
+
+
+def _wait_with_rusage(process, timeout):
+    """Wait for a child like Popen.wait(), returning its own resource usage."""
+    deadline = time.monotonic() + timeout
+    while True:
+        pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+        if pid:
+            process.returncode = os.waitstatus_to_exitcode(status)
+            return usage
+        if time.monotonic() > deadline:
+            raise subprocess.TimeoutExpired(process.args, timeout)
+        time.sleep(0.05)
+
+
 def run_step(script_name):
+    """Run a stage as a subprocess. Returns the child's peak RSS in MB."""
     script_path = SCRIPTS_DIR / script_name
     print(f"\n--- Running {script_name} ---\n")
     
@@ -141,7 +351,7 @@ def run_step(script_name):
             print(line.rstrip())
         
         # Wait for completion with timeout
-        process.wait(timeout=1800)  # 30 minute limit per step
+        usage = _wait_with_rusage(process, timeout=1800)  # 30 minute limit per step
     except subprocess.TimeoutExpired:
         process.kill()
         raise RuntimeError(f"{script_name} exceeded 30 minute timeout")
@@ -149,24 +359,191 @@ def run_step(script_name):
     if process.returncode != 0:
         raise RuntimeError(f"{script_name} failed with exit code {process.returncode}")
 
+    return _peak_rss_mb(usage.ru_maxrss)
+
+
+def run_step_in_process(script_name, payload=None):
+    """
+    Import a stage and call its main(), passing the upstream payload if any.
+    Returns (stage output, process peak RSS in MB).
+    """
+    print(f"\n--- Running {script_name} (in-process) ---\n")
+
+    if str(SCRIPTS_DIR) not in sys.path:
+        sys.path.insert(0, str(SCRIPTS_DIR))
+    module = importlib.import_module(Path(script_name).stem)
+
+    try:
+        output = module.main(payload) if payload is not None else module.main()
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            raise RuntimeError(f"{script_name} failed with exit code {e.code}")
+        output = None
+
+    # Stages share this process, so this is the process-wide high-water mark
+    return output, _peak_rss_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def execute_stage(script_name, payload, in_process):
+    """Run one stage and return (output, seconds, peak RSS MB)."""
+    started = time.perf_counter()
+    if in_process:
+        output, peak_mb = run_step_in_process(script_name, payload)
+    else:
+        output, peak_mb = None, run_step(script_name)
+    return output, time.perf_counter() - started, peak_mb
+
+
+def run_dag(steps=STEPS, in_process=True, selected=None, force=()):
+    """
+    Run stages as their dependencies complete.
+
+    Only `selected` stages run (default: all); the rest are treated as done
+    and their files on disk are used as-is. Stages in `force` ignore the
+    cache. On the first failure no new stages are started; running ones
+    finish and the failure is re-raised. Returns {stage: seconds or "cached"}.
+    """
+    selected = set(steps if selected is None else selected)
+    depends_on, producers = build_dag(steps)
+    manifest = load_manifest()
+    outputs = {}   # stage -> in-memory output (in-process only)
+    timings = {}
+    running = {}
+    fingerprints = {}
+    failure = None
+    done = {stage for stage in steps if stage not in selected}
+
+    with ThreadPoolExecutor(max_workers=len(steps), thread_name_prefix="stage") as pool:
+        while True:
+            if failure is None:
+                for stage in steps:
+                    if stage in done or stage in running.values():
+                        continue
+                    if not depends_on[stage] <= done:
+                        continue
+
+                    fingerprints[stage] = stage_fingerprint(stage, producers, manifest)
+                    entry = manifest.get(stage)
+                    if stage not in force and entry and entry.get("fingerprint") == fingerprints[stage]:
+                        restored, output = restore_output(stage, entry)
+                        if restored:
+                            log(f"SKIP {stage}: inputs unchanged, using cached output")
+                            outputs[stage] = output
+                            timings[stage] = "cached"
+                            done.add(stage)
+                            continue
+
+                    # Inputs from stages outside this run come from their last
+                    # cached output (the file may hold a later stage's output)
+                    inputs = STAGE_INPUTS.get(stage, [])
+                    for path in inputs:
+                        upstream = producers[stage].get(path)
+                        if upstream in selected or upstream in outputs or upstream not in manifest:
+                            continue
+                        restored, outputs[upstream] = restore_output(upstream, manifest[upstream])
+                        if restored:
+                            log(f"Using cached {path} from {upstream}")
+
+                    # Hand over a private copy, as if the stage had read the file
+                    payload = None
+                    if in_process and inputs:
+                        upstream = producers[stage].get(inputs[0])
+                        if outputs.get(upstream) is not None:
+                            payload = copy.deepcopy(outputs[upstream])
+
+                    log(f"START {stage}")
+                    running[pool.submit(execute_stage, stage, payload, in_process)] = stage
+
+            if not running:
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage = running.pop(future)
+                try:
+                    output, seconds, peak_mb = future.result()
+                    validate_output(stage)
+                    output_hash = cache_output(stage)
+                except Exception as e:
+                    log(f"STAGE FAILED {stage}: {e}")
+                    failure = failure or e
+                    manifest.pop(stage, None)
+                    save_manifest(manifest)
+                    continue
+
+                manifest[stage] = {
+                    "fingerprint": fingerprints[stage],
+                    "output_hash": output_hash,
+                    "completed_at": datetime.now().isoformat(timespec="seconds"),
+                    "seconds": round(seconds, 1),
+                }
+                save_manifest(manifest)
+
+                outputs[stage] = output
+                timings[stage] = seconds
+                done.add(stage)
+                log(f"STAGE {stage}: {seconds:.1f}s wall, peak RSS {peak_mb:.0f} MB")
+
+    if failure is not None:
+        raise failure
+
+    return timings
+
 
 # ===============================
 # MAIN
 # ===============================
 
-def main():
+def _stage_name(name):
+    name = name if name.endswith(".py") else f"{name}.py"
+    if name not in STEPS:
+        raise argparse.ArgumentTypeError(f"unknown stage {name!r} (stages: {', '.join(STEPS)})")
+    return name
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the earnings pipeline")
+    parser.add_argument("--from-stage", type=_stage_name,
+                        help="Re-run this stage and everything after it; earlier stages keep their outputs")
+    parser.add_argument("--only", type=_stage_name, action="append",
+                        help="Re-run only this stage (repeatable)")
+    parser.add_argument("--force", action="store_true", help="Ignore the stage cache")
+    parser.add_argument("--isolated", action="store_true", help="Run each stage as a subprocess")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    in_process = not args.isolated
+
+    # Explicitly requested stages always run; the rest may come from cache
+    if args.only:
+        selected = list(args.only)
+        force = set(selected)
+    elif args.from_stage:
+        selected = STEPS[STEPS.index(args.from_stage):]
+        force = set(selected)
+    else:
+        selected = list(STEPS)
+        force = set(STEPS) if args.force else set()
+
     if not acquire_lock():
         sys.exit(1)
     
     try:
-        log("=== PIPELINE START ===")
+        log(f"=== PIPELINE START ({'in-process' if in_process else 'isolated'}) ===")
+        if selected != STEPS:
+            log(f"Stages: {', '.join(selected)}")
 
         try:
-            for step in STEPS:
-                run_step(step)
-                validate_output(step)
-
-            log("SUCCESS - All stages completed")
+            # Stages resolve relative data paths against the workspace
+            os.chdir(WORKSPACE)
+            started = time.perf_counter()
+            timings = run_dag(STEPS, in_process=in_process, selected=selected, force=force)
+
+            cached = sum(1 for t in timings.values() if t == "cached")
+            log(f"SUCCESS - All stages completed in {time.perf_counter() - started:.1f}s "
+                f"({cached} from cache)")
             log("=== PIPELINE END ===")
 
         except Exception as e:
@@ -179,4 +556,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -425,10 +425,14 @@ def send_email(html):
         log(f"Email send failed: {e}")
 
 
-def main():
+def main(analysis=None):
+    """Render and send the report from analysis_raw.json (or the in-memory copy)."""
     log("=== Starting send_email.py ===")
 
-    data, metadata = load_analysis()
+    if analysis is None:
+        data, metadata = load_analysis()
+    else:
+        data, metadata = analysis.get("candidates", []), analysis.get("metadata", {})
 
     if not data:
         log("Zero candidates — sending 'no setups' email")
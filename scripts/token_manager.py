@@ -8,6 +8,7 @@ Handles OAuth token refresh for Schwab API access.
 import os
 import base64
 import logging
+import threading
 import time
 import requests
 from pathlib import Path
@@ -35,6 +36,7 @@ SCHWAB_TOKEN_URL = "https://api.schwabapi.com/v1/oauth/token"
 # Token cache
 _cached_token = None
 _token_expiry = 0
+_token_lock = threading.Lock()
 
 
 def get_access_token() -> str:
@@ -48,6 +50,12 @@ def get_access_token() -> str:
     Raises:
         Exception: If the token refresh fails
     """
+    # Serialize refreshes so concurrent workers share one token
+    with _token_lock:
+        return _get_access_token_locked()
+
+
+def _get_access_token_locked() -> str:
     global _cached_token, _token_expiry
     
     current_time = int(time.time())